@@ -1,11 +1,21 @@
-import smbus2
+from L1.L1_i2c import I2CBus
 
 class ADC:
-    def __init__(self, i2c_address=0x48):
-        self.bus = smbus2.SMBus(1)
+    RANGES = [(0, 2)]
+
+    def __init__(self, i2c_address=0x48, backend=None, bus=None):
+        self.bus = bus or I2CBus.get(1, backend)
         self.address = i2c_address
 
     def read_voltage(self):
         # Read voltage from ADC
-        data = self.bus.read_i2c_block_data(self.address, 0, 2)
-        return (data[0] << 8) | data[1]
\ No newline at end of file
+        return self.decode(self.bus.read_ranges(self.address, self.RANGES))
+
+    @staticmethod
+    def decode(blocks):
+        data = blocks[0]
+        return (data[0] << 8) | data[1]
+
+    def poll(self, rate_hz, name='battery'):
+        """Have the shared bus poll this device in the background"""
+        return self.bus.add_device(name, self.address, self.RANGES, self.decode, rate_hz)
@@ -0,0 +1,73 @@
+"""
+Hardware backend selection for the L1 drivers.
+
+Every L1 driver opens its device through one of the factories below. The
+backend is chosen per call (``backend='fake'``) or process-wide through the
+SCUTTLE_BACKEND environment variable; 'hardware' is the default. The fake
+backend returns in-process stand-ins from L1_fake with the same interfaces,
+all driven by one shared simulated World.
+"""
+import os
+from utils.constants import BACKEND_ENV
+
+BACKENDS = ('hardware', 'fake')
+
+
+def resolve_backend(backend=None):
+    """Return the backend name to use, honouring SCUTTLE_BACKEND"""
+    backend = backend or os.environ.get(BACKEND_ENV, 'hardware')
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    return backend
+
+
+def is_fake(backend=None):
+    return resolve_backend(backend) == 'fake'
+
+
+def open_smbus(bus=1, backend=None):
+    """I2C bus handle (smbus2.SMBus or FakeSMBus)"""
+    if is_fake(backend):
+        from L1.L1_fake import FakeSMBus, get_world
+        return FakeSMBus(bus, get_world())
+    import smbus2
+    return smbus2.SMBus(bus)
+
+
+def open_rplidar(port, backend=None):
+    """RPLidar device (rplidar.RPLidar or FakeRPLidar)"""
+    if is_fake(backend):
+        from L1.L1_fake import FakeRPLidar, get_world
+        return FakeRPLidar(get_world())
+    from rplidar import RPLidar
+    return RPLidar(port)
+
+
+def open_video_capture(index=0, backend=None):
+    """Video source (cv2.VideoCapture or FakeVideoCapture)"""
+    if is_fake(backend):
+        from L1.L1_fake import FakeVideoCapture, get_world
+        return FakeVideoCapture(index, get_world())
+    import cv2
+    return cv2.VideoCapture(index)
+
+
+def open_pwm_outputs(pins, frequency, backend=None):
+    """One PWM output per pin (gpiozero on pigpio, or FakePWMOutputDevice)"""
+    if is_fake(backend):
+        from L1.L1_fake import FakePWMOutputDevice, get_world
+        world = get_world()
+        return [
+            FakePWMOutputDevice(pin, frequency, world, channel)
+            for channel, pin in enumerate(pins)
+        ]
+    import gpiozero
+    from gpiozero.pins.pigpio import PiGPIOFactory
+    gpiozero.Device.pin_factory = PiGPIOFactory()
+    return [
+        gpiozero.PWMOutputDevice(
+            pin=pin,
+            frequency=frequency,
+            initial_value=0
+        ) for pin in pins
+    ]
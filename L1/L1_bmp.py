@@ -1,12 +1,21 @@
-import smbus2
+from L1.L1_i2c import I2CBus
 
 class BMP280:
-    def __init__(self, i2c_address=0x76):
-        self.bus = smbus2.SMBus(1)
+    # Pressure (0xF7-0xF9) and temperature (0xFA-0xFC) are read in one burst
+    RANGES = [(0xFA, 3), (0xF7, 3)]
+
+    def __init__(self, i2c_address=0x76, backend=None, bus=None):
+        self.bus = bus or I2CBus.get(1, backend)
         self.address = i2c_address
 
     def read_data(self):
         # Read temperature and pressure data
-        temp_data = self.bus.read_i2c_block_data(self.address, 0xFA, 3)
-        press_data = self.bus.read_i2c_block_data(self.address, 0xF7, 3)
-        return temp_data, press_data
\ No newline at end of file
+        return self.decode(self.bus.read_ranges(self.address, self.RANGES))
+
+    @staticmethod
+    def decode(blocks):
+        return blocks[0xFA], blocks[0xF7]
+
+    def poll(self, rate_hz, name='environment'):
+        """Have the shared bus poll this device in the background"""
+        return self.bus.add_device(name, self.address, self.RANGES, self.decode, rate_hz)
@@ -1,9 +1,214 @@
-import cv2
+import logging
+import threading
+import time
+from typing import NamedTuple
+import numpy as np
+from L1.L1_backend import open_video_capture
+from utils import metrics
+
+FRAMES = metrics.counter('camera_frames_total', 'Frames captured')
+DROPPED_FRAMES = metrics.counter('camera_dropped_frames_total', 'Grabbed frames replaced before any reader saw them')
+READ_FAILURES = metrics.counter('camera_read_failures_total', 'Failed camera reads')
+
+# cv2.CAP_PROP_* ids, so configuring does not need cv2 itself
+CAP_PROP_FRAME_WIDTH = 3
+CAP_PROP_FRAME_HEIGHT = 4
+CAP_PROP_FPS = 5
+
+
+class Frame(NamedTuple):
+    """One grabbed camera frame"""
+    image: np.ndarray   # read-only view of a grabber buffer
+    timestamp: float    # time.monotonic() when the read returned
+    seq: int
+
+
+def crop_and_scale(image, roi=None, scale=1, out=None):
+    """
+    Copy a region of interest, optionally downscaled, into out
+
+    Args:
+        image: Source image
+        roi: (x, y, width, height) in pixels, or None for the whole image
+        scale: Integer downscale factor (nearest pixel)
+        out: Destination array of the right shape to reuse, if any
+
+    Returns:
+        The copy (out if given)
+    """
+    if roi is not None:
+        x, y, width, height = roi
+        image = image[max(0, y):y + height, max(0, x):x + width]
+    if scale > 1:
+        image = image[::scale, ::scale]
+    if out is None or out.shape != image.shape:
+        return image.copy()
+    np.copyto(out, image)
+    return out
+
 
 class Camera:
-    def __init__(self):
-        self.cap = cv2.VideoCapture(0)
+    def __init__(self, backend=None, capture=None, width=None, height=None, fps=None,
+                 grab=False, buffers=3):
+        """
+        Args:
+            backend: 'hardware' or 'fake', see L1_backend
+            capture: VideoCapture-compatible object to use instead of
+                opening camera 0 (e.g. a session replay)
+            width, height, fps: Requested capture format (driver defaults if omitted)
+            grab: Start the background grabber immediately
+            buffers: Frame buffers reused round-robin by the grabber; a
+                Frame stays valid for buffers - 1 further grabs, so copy
+                (or crop_and_scale) anything kept longer
+        """
+        self.logger = logging.getLogger('camera')
+        self.cap = capture if capture is not None else open_video_capture(0, backend)
+        self.configure(width, height, fps)
+        self.read_failures = 0
+
+        # Grabber state
+        self._buffers = [None] * max(2, buffers)
+        self._next_buffer = 0
+        self._latest = None
+        self._cond = threading.Condition()
+        self._grab_thread = None
+        self._grabbing = False
+        self._seq = 0
+        self._last_read_seq = 0
+        self.dropped_frames = 0
+
+        if grab:
+            self.start_grabber()
+
+    def configure(self, width=None, height=None, fps=None):
+        """Request a capture resolution and/or frame rate"""
+        for prop, value in ((CAP_PROP_FRAME_WIDTH, width), (CAP_PROP_FRAME_HEIGHT, height),
+                            (CAP_PROP_FPS, fps)):
+            if value is not None and not self.cap.set(prop, value):
+                self.logger.warning(f"Camera property {prop} could not be set to {value}")
 
     def capture_frame(self):
+        """Newest frame image (grabber) or one synchronous read; None on failure"""
+        if self._grabbing:
+            frame = self.latest()
+            return frame.image if frame else None
         ret, frame = self.cap.read()
-        return frame
\ No newline at end of file
+        if not ret:
+            self.read_failures += 1
+            READ_FAILURES.inc()
+            return None
+        FRAMES.inc()
+        return frame
+
+    # -- grabber -----------------------------------------------------------
+
+    def start_grabber(self):
+        """Start the background thread that keeps only the newest frame"""
+        if self._grabbing:
+            return
+        self._grabbing = True
+        self._grab_thread = threading.Thread(target=self._grab_loop, name="CameraGrab", daemon=True)
+        self._grab_thread.start()
+        self.logger.info("Camera grabber started")
+
+    def stop_grabber(self, timeout=1.0):
+        if not self._grabbing:
+            return
+        self._grabbing = False
+        with self._cond:
+            self._cond.notify_all()
+        self._grab_thread.join(timeout=timeout)
+        self._grab_thread = None
+
+    @property
+    def grabbing(self):
+        return self._grabbing
+
+    def _grab_loop(self):
+        while self._grabbing:
+            index = self._next_buffer
+            buffer = self._buffers[index]
+            try:
+                ret, image = self.cap.read(buffer) if buffer is not None else self.cap.read()
+            except Exception as e:
+                self.logger.error(f"Camera read failed: {e}")
+                ret, image = False, None
+            if not ret or image is None:
+                self.read_failures += 1
+                READ_FAILURES.inc()
+                time.sleep(0.01)
+                continue
+            timestamp = time.monotonic()
+            FRAMES.inc()
+            # Keep whatever array the driver filled (it reallocates on a format change)
+            self._buffers[index] = image
+            self._next_buffer = (index + 1) % len(self._buffers)
+            view = image.view()
+            view.flags.writeable = False
+            with self._cond:
+                self._seq += 1
+                if self._latest is not None and self._latest.seq > self._last_read_seq:
+                    self.dropped_frames += 1
+                    DROPPED_FRAMES.inc()
+                self._latest = Frame(view, timestamp, self._seq)
+                self._cond.notify_all()
+        with self._cond:
+            self._cond.notify_all()
+
+    def latest(self):
+        """Newest Frame without blocking (None before the first grab)"""
+        with self._cond:
+            frame = self._latest
+            if frame is not None:
+                self._last_read_seq = max(self._last_read_seq, frame.seq)
+            return frame
+
+    def wait_for_frame(self, newer_than=0, timeout=None):
+        """
+        Block until a frame with seq > newer_than is available
+
+        Args:
+            newer_than: Sequence number (or a Frame) already seen
+            timeout: Seconds to wait, None to wait forever
+
+        Returns:
+            The newest Frame, or None on timeout or grabber shutdown
+        """
+        if isinstance(newer_than, Frame):
+            newer_than = newer_than.seq
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._latest is None or self._latest.seq <= newer_than:
+                if not self._grabbing:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            frame = self._latest
+            self._last_read_seq = max(self._last_read_seq, frame.seq)
+            return frame
+
+    def grab_stats(self):
+        """Counters for the grabber
+
+        dropped counts frames replaced before any reader saw a frame that new.
+        """
+        return {
+            "frames": self._seq,
+            "dropped": self.dropped_frames,
+            "read_failures": self.read_failures,
+        }
+
+    def stop(self):
+        """Stop grabbing and release the device"""
+        self.stop_grabber()
+        release = getattr(self.cap, 'release', None)
+        if release is not None:
+            release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -1,23 +1,35 @@
-import smbus2
+from L1.L1_i2c import I2CBus
 import logging
 
-# Configure logging for debugging
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
 
 class Encoder:
-    def __init__(self, i2c_address):
-        self.bus = smbus2.SMBus(1)
+    RANGES = [(0, 2)]
+
+    def __init__(self, i2c_address, backend=None, bus=None):
+        self.bus = bus or I2CBus.get(1, backend)
         self.address = i2c_address
 
     def read_position(self):
         """
-        Read the encoder position from I2C.
+        Read the raw 16-bit encoder position from I2C.
+
+        The count wraps around once per wheel revolution; see L2_odometry
+        for unwrapping.
         """
         try:
-            data = self.bus.read_i2c_block_data(self.address, 0, 2)
-            position = (data[0] << 8) | data[1]
-            logging.debug(f"Encoder position: {position}")
-            return position
+            data = self.bus.read_block(self.address, 0, 2)
+            return (data[0] << 8) | data[1]
         except Exception as e:
-            logging.error(f"An error occurred while reading encoder position: {e}")
-            raise
\ No newline at end of file
+            logger.error(f"An error occurred while reading encoder position: {e}")
+            raise
+
+    @staticmethod
+    def decode(blocks):
+        data = blocks[0]
+        return (data[0] << 8) | data[1]
+
+    def poll(self, rate_hz, name=None):
+        """Have the shared bus poll this device in the background"""
+        name = name or f"encoder_{self.address:02x}"
+        return self.bus.add_device(name, self.address, self.RANGES, self.decode, rate_hz)
@@ -0,0 +1,466 @@
+"""
+In-process fake hardware for the L1 drivers.
+
+All fakes share one World: a 2-D kinematic model of a differential-drive
+robot among line-segment walls. Motor duty cycles set the wheel speeds, the
+pose is integrated from them, and the lidar, encoders, IMU and camera are
+synthesised from the current state.
+
+World time either follows the wall clock scaled by ``time_scale`` (1.0 is
+real time, 10.0 is ten times faster) or, with ``time_scale=None``, only
+advances when ``step()`` is called, which makes a run fully deterministic.
+"""
+import math
+import threading
+import time
+import numpy as np
+from utils.constants import (
+    WHEELBASE, MAX_SPEED, WHEEL_RADIUS, ENCODER_ADDRESSES, ENCODER_RESOLUTION
+)
+
+# 4 m x 3 m room with a box in it, as ((x1, y1), (x2, y2)) segments
+DEFAULT_WALLS = [
+    ((-2.0, -1.5), (2.0, -1.5)),
+    ((2.0, -1.5), (2.0, 1.5)),
+    ((2.0, 1.5), (-2.0, 1.5)),
+    ((-2.0, 1.5), (-2.0, -1.5)),
+    ((1.0, -0.3), (1.3, -0.3)),
+    ((1.3, -0.3), (1.3, 0.3)),
+    ((1.3, 0.3), (1.0, 0.3)),
+    ((1.0, 0.3), (1.0, -0.3)),
+]
+
+
+class World:
+    """Deterministic 2-D kinematic world shared by all fake devices"""
+
+    def __init__(self, walls=None, pose=(0.0, 0.0, 0.0), time_scale=1.0,
+                 motor_tau=0.05, robot_radius=0.2, target=(1.8, 0.6),
+                 battery_voltage=12.0, seed=0):
+        """
+        Args:
+            walls: List of ((x1, y1), (x2, y2)) wall segments in meters
+            pose: Initial (x, y, theta) of the robot
+            time_scale: Sim seconds per wall second, or None for lock-step
+                mode where time only advances through step()
+            motor_tau: First-order motor time constant in seconds
+            robot_radius: Collision radius in meters
+            target: (x, y) of the coloured target seen by the camera
+            battery_voltage: Initial battery voltage
+            seed: Seed for sensor noise
+        """
+        walls = DEFAULT_WALLS if walls is None else walls
+        self.walls = np.asarray(walls, dtype=np.float64).reshape(-1, 2, 2)
+        self.time_scale = time_scale
+        self.motor_tau = motor_tau
+        self.robot_radius = robot_radius
+        self.target = target
+        self.battery_voltage = battery_voltage
+        self.rng = np.random.default_rng(seed)
+
+        self.x, self.y, self.theta = pose
+        self.duty = [0.0, 0.0]           # commanded left/right duty cycle
+        self.wheel_speed = [0.0, 0.0]    # actual left/right rim speed (m/s)
+        self.wheel_angle = [0.0, 0.0]    # accumulated wheel angle (rad)
+        self.collisions = 0
+        self.gamepad_axes = [0.0] * 6
+        self.gamepad_buttons = [0] * 13
+
+        self.time = 0.0
+        self._wall_start = time.monotonic()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    # -- time -----------------------------------------------------------
+
+    @property
+    def lockstep(self):
+        return self.time_scale is None
+
+    def now(self):
+        """Current simulation time, advancing the model to it"""
+        with self._cond:
+            if not self.lockstep:
+                target = (time.monotonic() - self._wall_start) * self.time_scale
+                self._advance(target)
+            return self.time
+
+    def step(self, dt):
+        """Advance lock-step simulation time by dt seconds"""
+        with self._cond:
+            self._advance(self.time + dt)
+            self._cond.notify_all()
+        return self.time
+
+    def wait_until(self, t):
+        """Block until simulation time reaches t; False if the world closed"""
+        if self.lockstep:
+            with self._cond:
+                while self.time < t and not self._closed:
+                    self._cond.wait(0.1)
+                return not self._closed
+        while not self._closed:
+            remaining = (t - self.now()) / self.time_scale
+            if remaining <= 0:
+                return True
+            time.sleep(remaining)
+        return False
+
+    def close(self):
+        """Release every fake blocked in wait_until()"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    # -- dynamics -------------------------------------------------------
+
+    def set_duty(self, channel, value):
+        """Motor PWM write; even channels drive the left wheel, odd the right"""
+        with self._cond:
+            if not self.lockstep:
+                self._advance((time.monotonic() - self._wall_start) * self.time_scale)
+            self.duty[channel % 2] = max(-1.0, min(1.0, value))
+
+    def _advance(self, t, max_dt=0.005):
+        while self.time < t:
+            dt = min(max_dt, t - self.time)
+            self._integrate(dt)
+            self.time += dt
+
+    def _integrate(self, dt):
+        alpha = 1.0 if self.motor_tau <= 0 else 1.0 - math.exp(-dt / self.motor_tau)
+        for i in (0, 1):
+            self.wheel_speed[i] += (self.duty[i] * MAX_SPEED - self.wheel_speed[i]) * alpha
+            self.wheel_angle[i] += self.wheel_speed[i] / WHEEL_RADIUS * dt
+        v = (self.wheel_speed[0] + self.wheel_speed[1]) / 2
+        w = (self.wheel_speed[1] - self.wheel_speed[0]) / WHEELBASE
+        theta = self.theta + w * dt
+        x = self.x + v * dt * math.cos(self.theta + w * dt / 2)
+        y = self.y + v * dt * math.sin(self.theta + w * dt / 2)
+        if self._clearance(x, y) < self.robot_radius and v != 0:
+            # Blocked by a wall: the wheels slip, the chassis only rotates
+            self.collisions += 1
+            x, y = self.x, self.y
+        self.x, self.y, self.theta = x, y, math.atan2(math.sin(theta), math.cos(theta))
+
+    def _clearance(self, x, y):
+        """Distance from (x, y) to the nearest wall"""
+        a, b = self.walls[:, 0], self.walls[:, 1]
+        ab = b - a
+        t = np.clip(((x - a[:, 0]) * ab[:, 0] + (y - a[:, 1]) * ab[:, 1])
+                    / np.maximum((ab ** 2).sum(axis=1), 1e-12), 0.0, 1.0)
+        px = a[:, 0] + t * ab[:, 0] - x
+        py = a[:, 1] + t * ab[:, 1] - y
+        return float(np.sqrt(px * px + py * py).min())
+
+    @property
+    def pose(self):
+        self.now()
+        return self.x, self.y, self.theta
+
+    @property
+    def twist(self):
+        """(linear m/s, angular rad/s) of the chassis"""
+        self.now()
+        v = (self.wheel_speed[0] + self.wheel_speed[1]) / 2
+        w = (self.wheel_speed[1] - self.wheel_speed[0]) / WHEELBASE
+        return v, w
+
+    # -- sensing --------------------------------------------------------
+
+    def raycast(self, bearings, max_range=12.0):
+        """
+        Distance along each world-frame bearing from the robot to the walls
+
+        Returns:
+            Array of ranges in meters, inf where nothing is hit
+        """
+        ox, oy = self.x, self.y
+        dx, dy = np.cos(bearings)[:, None], np.sin(bearings)[:, None]
+        a, b = self.walls[:, 0], self.walls[:, 1]
+        ex, ey = (b - a)[:, 0][None, :], (b - a)[:, 1][None, :]
+        qx, qy = (a[:, 0] - ox)[None, :], (a[:, 1] - oy)[None, :]
+        denom = dx * ey - dy * ex
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (qx * ey - qy * ex) / denom
+            u = (qx * dy - qy * dx) / denom
+        hit = (np.abs(denom) > 1e-12) & (t > 0) & (u >= 0) & (u <= 1)
+        t = np.where(hit, t, np.inf).min(axis=1)
+        t[t > max_range] = np.inf
+        return t
+
+
+_world = None
+_world_lock = threading.Lock()
+
+
+def get_world():
+    """The process-wide World used by fakes created through L1_backend"""
+    global _world
+    with _world_lock:
+        if _world is None:
+            _world = World()
+        return _world
+
+
+def set_world(world):
+    """Install the World used by subsequently created fakes"""
+    global _world
+    with _world_lock:
+        _world = world
+    return world
+
+
+class FakePWMOutputDevice:
+    """Stand-in for gpiozero.PWMOutputDevice that drives a World wheel"""
+
+    def __init__(self, pin, frequency, world, channel):
+        self.pin = pin
+        self.frequency = frequency
+        self.world = world
+        self.channel = channel
+        self._value = 0.0
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        self.world.set_duty(self.channel, value)
+
+    def close(self):
+        self.value = 0
+
+
+class FakeRPLidar:
+    """Stand-in for rplidar.RPLidar producing ray-cast scans of the World"""
+
+    def __init__(self, world, scan_rate=10.0, points_per_scan=360, noise=0.005):
+        self.world = world
+        self.scan_rate = scan_rate
+        self.angles = np.linspace(0.0, 360.0, points_per_scan, endpoint=False)
+        self.noise = noise
+        self._running = False
+
+    def iter_scans(self, max_buf_meas=500, min_len=5):
+        """Yield lists of (quality, angle_deg, distance_mm), one per revolution"""
+        self._running = True
+        next_time = self.world.now()
+        while self._running:
+            next_time += 1.0 / self.scan_rate
+            if not self.world.wait_until(next_time):
+                return
+            yield self.scan()
+
+    def scan(self):
+        """One scan of the current World state"""
+        x, y, theta = self.world.pose
+        # RPLIDAR angles increase clockwise, 0° straight ahead
+        ranges = self.world.raycast(theta - np.radians(self.angles))
+        hit = np.isfinite(ranges)
+        ranges = ranges[hit] * (1.0 + self.noise * self.world.rng.standard_normal(hit.sum()))
+        return [(15, float(a), float(r * 1000.0)) for a, r in zip(self.angles[hit], ranges)]
+
+    def stop(self):
+        self._running = False
+
+    def stop_motor(self):
+        pass
+
+    def start_motor(self):
+        pass
+
+    def disconnect(self):
+        self._running = False
+
+    def get_info(self):
+        return {'model': 0, 'firmware': (1, 0), 'hardware': 0, 'serialnumber': 'FAKE'}
+
+    def get_health(self):
+        return ('Good', 0)
+
+
+class FakeSMBus:
+    """
+    Stand-in for smbus2.SMBus with register maps for the robot's I2C devices
+
+    Devices: wheel encoders (ENCODER_ADDRESSES), ADC (0x48), BMP280 (0x76)
+    and MPU9250 (0x68). Registers are refreshed from the World on each read.
+    """
+
+    def __init__(self, bus, world):
+        self.bus = bus
+        self.world = world
+        self.transactions = 0
+        self._devices = {
+            ENCODER_ADDRESSES[0]: lambda: self._encoder_regs(0),
+            ENCODER_ADDRESSES[1]: lambda: self._encoder_regs(1),
+            0x48: self._adc_regs,
+            0x76: self._bmp_regs,
+            0x68: self._mpu_regs,
+        }
+
+    def _registers(self, address):
+        try:
+            refresh = self._devices[address]
+        except KeyError:
+            raise OSError(121, f"Remote I/O error (no device at 0x{address:02x})")
+        self.transactions += 1
+        return refresh()
+
+    def read_i2c_block_data(self, i2c_addr, register, length, force=None):
+        regs = self._registers(i2c_addr)
+        return list(regs[register:register + length])
+
+    def read_byte_data(self, i2c_addr, register, force=None):
+        return self._registers(i2c_addr)[register]
+
+    def write_byte_data(self, i2c_addr, register, value, force=None):
+        self._registers(i2c_addr)
+
+    def write_i2c_block_data(self, i2c_addr, register, data, force=None):
+        self._registers(i2c_addr)
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def _put16(regs, register, value):
+        value = int(value) & 0xFFFF
+        regs[register] = value >> 8
+        regs[register + 1] = value & 0xFF
+
+    def _encoder_regs(self, wheel):
+        self.world.now()
+        regs = bytearray(256)
+        angle = self.world.wheel_angle[wheel]
+        self._put16(regs, 0, round(angle / (2 * math.pi) * ENCODER_RESOLUTION))
+        return regs
+
+    def _adc_regs(self):
+        regs = bytearray(256)
+        self._put16(regs, 0, self.world.battery_voltage * 1000)  # mV
+        return regs
+
+    def _bmp_regs(self):
+        regs = bytearray(256)
+        regs[0xD0] = 0x58  # chip id
+        regs[0xF7:0xFD] = bytes((0x65, 0x5A, 0xC0, 0x7E, 0xED, 0x00))  # press, temp
+        return regs
+
+    def _mpu_regs(self):
+        v, w = self.world.twist
+        noise = self.world.rng.integers(-8, 9, size=7)
+        regs = bytearray(256)
+        self._put16(regs, 0x3B, noise[0])                 # accel x
+        self._put16(regs, 0x3D, noise[1])                 # accel y
+        self._put16(regs, 0x3F, 16384 + noise[2])         # accel z, 1 g at ±2 g
+        self._put16(regs, 0x41, 3000 + noise[3])          # temperature
+        self._put16(regs, 0x43, noise[4])                 # gyro x
+        self._put16(regs, 0x45, noise[5])                 # gyro y
+        self._put16(regs, 0x47, math.degrees(w) * 131 + noise[6])  # gyro z, ±250 °/s
+        regs[0x75] = 0x71  # WHO_AM_I
+        return regs
+
+
+class FakeVideoCapture:
+    """Stand-in for cv2.VideoCapture rendering the World target as a coloured disc"""
+
+    CAP_PROP_FRAME_WIDTH = 3
+    CAP_PROP_FRAME_HEIGHT = 4
+    CAP_PROP_FPS = 5
+
+    def __init__(self, index, world, width=640, height=480, fps=30.0, fov_deg=60.0):
+        self.index = index
+        self.world = world
+        self.fov = math.radians(fov_deg)
+        self.props = {
+            self.CAP_PROP_FRAME_WIDTH: float(width),
+            self.CAP_PROP_FRAME_HEIGHT: float(height),
+            self.CAP_PROP_FPS: float(fps),
+        }
+        self._next_time = None
+        self._opened = True
+
+    def isOpened(self):
+        return self._opened
+
+    def get(self, prop):
+        return self.props.get(prop, 0.0)
+
+    def set(self, prop, value):
+        if prop not in self.props:
+            return False
+        self.props[prop] = float(value)
+        return True
+
+    def read(self, image=None):
+        if not self._opened:
+            return False, None
+        now = self.world.now()
+        if self._next_time is None:
+            self._next_time = now
+        self._next_time = max(self._next_time + 1.0 / self.get(self.CAP_PROP_FPS), now)
+        if not self.world.wait_until(self._next_time):
+            return False, None
+        width = int(self.get(self.CAP_PROP_FRAME_WIDTH))
+        height = int(self.get(self.CAP_PROP_FRAME_HEIGHT))
+        if image is None or image.shape != (height, width, 3):
+            image = np.empty((height, width, 3), dtype=np.uint8)
+        self.render(image)
+        return True, image
+
+    def render(self, image):
+        """Draw the current view of the World into a BGR image"""
+        height, width = image.shape[:2]
+        image[:] = (90, 90, 90)
+        x, y, theta = self.world.pose
+        tx, ty = self.world.target
+        bearing = math.atan2(ty - y, tx - x) - theta
+        bearing = math.atan2(math.sin(bearing), math.cos(bearing))
+        if abs(bearing) > self.fov / 2:
+            return image
+        distance = max(math.hypot(tx - x, ty - y), 0.1)
+        cx = int(width / 2 - bearing / (self.fov / 2) * width / 2)
+        cy = height // 2
+        radius = max(2, int(0.1 * width / distance))
+        x0, x1 = max(cx - radius, 0), min(cx + radius + 1, width)
+        y0, y1 = max(cy - radius, 0), min(cy + radius + 1, height)
+        yy, xx = np.ogrid[y0:y1, x0:x1]
+        disc = (xx - cx) ** 2 + (yy - cy) ** 2 <= radius ** 2
+        image[y0:y1, x0:x1][disc] = (0, 80, 255)  # orange in BGR
+        return image
+
+    def release(self):
+        self._opened = False
+
+
+class FakeJoystick:
+    """Stand-in for pygame.joystick.Joystick reading World gamepad state"""
+
+    def __init__(self, world, index=0):
+        self.world = world
+        self.index = index
+
+    def init(self):
+        pass
+
+    def quit(self):
+        pass
+
+    def get_name(self):
+        return "Fake Gamepad"
+
+    def get_numaxes(self):
+        return len(self.world.gamepad_axes)
+
+    def get_numbuttons(self):
+        return len(self.world.gamepad_buttons)
+
+    def get_axis(self, axis):
+        return self.world.gamepad_axes[axis]
+
+    def get_button(self, button):
+        return self.world.gamepad_buttons[button]
@@ -1,71 +1,360 @@
-import pygame
 import logging
+import os
+import threading
 import time
-from typing import Tuple, Optional
+from collections import deque
+from typing import Tuple, Optional, FrozenSet, NamedTuple
+import numpy as np
+from L1.L1_backend import is_fake
+from utils import metrics
+
+INPUT_LATENCY = metrics.histogram('gamepad_input_latency_seconds', 'Gamepad input change to drive command')
+
+# pygame button / axis numbers of a DualShock 4 on Linux
+BUTTONS = {
+    'cross': 0, 'circle': 1, 'triangle': 2, 'square': 3,
+    'l1': 4, 'r1': 5, 'l2': 6, 'r2': 7,
+    'share': 8, 'options': 9, 'ps': 10, 'l3': 11, 'r3': 12,
+}
+AXES = {'left_x': 0, 'left_y': 1, 'l2': 2, 'right_x': 3, 'right_y': 4, 'r2': 5}
+
+
+class GamepadState(NamedTuple):
+    """Snapshot of the gamepad; axes already have the deadzone applied"""
+    timestamp: float               # time.monotonic() of the snapshot
+    seq: int                       # increments with every input change
+    changed_at: float              # time.monotonic() of the latest input change
+    axes: Tuple[float, ...]
+    buttons: Tuple[bool, ...]
+    pressed: FrozenSet[int]        # buttons pressed since the previous read()
+    released: FrozenSet[int]       # buttons released since the previous read()
+    connected: bool
+
+    def axis(self, name):
+        index = AXES.get(name, name)
+        return self.axes[index] if index < len(self.axes) else 0.0
+
+    def button(self, name):
+        index = BUTTONS.get(name, name)
+        return index < len(self.buttons) and self.buttons[index]
+
+    def was_pressed(self, name):
+        return BUTTONS.get(name, name) in self.pressed
+
+    def was_released(self, name):
+        return BUTTONS.get(name, name) in self.released
+
+    @property
+    def left_x(self):
+        return self.axis('left_x')
+
+    @property
+    def left_y(self):
+        """Left stick up is positive"""
+        return -self.axis('left_y')
+
 
 class Gamepad:
-    def __init__(self, retry_interval=1, max_retries=5):
+    def __init__(self, retry_interval=1, max_retries=5, backend=None, deadzone=0.1,
+                 poll_rate=200):
+        """
+        Args:
+            retry_interval, max_retries: Wait for a gamepad to appear at startup
+            backend: 'hardware' or 'fake', see L1_backend
+            deadzone: Stick values below this read as 0; the rest of the
+                range is rescaled to stay continuous
+            poll_rate: Sampling rate (Hz) for backends without input events
+        """
         self.logger = logging.getLogger('gamepad')
         self.joystick = None
+        self.backend = backend
+        self._pygame = None
         self.retry_interval = retry_interval
         self.max_retries = max_retries
+        self.deadzone = deadzone
+        self.poll_rate = poll_rate
+
+        self._cond = threading.Condition()
+        self._axes = []
+        self._buttons = []
+        self._pressed = set()
+        self._released = set()
+        self._seq = 0
+        self._changed_at = time.monotonic()
+        self._connected = False
+        self._latencies = deque(maxlen=1000)
+        self._latency_seq = 0
+        self._thread = None
+        self._running = False
+        self._sdl = not is_fake(backend)
+        self._opened = threading.Event()
+        self._open_error = None
         self._initialize()
 
     def _initialize(self):
         """Initialize with comprehensive diagnostics"""
-        pygame.init()
+        if not self._sdl:
+            from L1.L1_fake import FakeJoystick, get_world
+            self._attach(FakeJoystick(get_world()))
+            return
+
+        # SDL only pumps events on the thread that initialised its video
+        # subsystem, so the reader thread opens the gamepad itself and
+        # runs from construction on; a missing gamepad still raises here
+        self.start()
+        self._opened.wait()
+        if self._open_error is not None:
+            self.stop()
+            raise self._open_error
+
+    def _open_sdl(self):
+        """Initialise pygame and open the first gamepad (on the reader thread)"""
+        os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+        # pygame only delivers events with a video driver initialised; the
+        # dummy driver opens no window. Audio and the rest stay off.
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        import pygame
+        self._pygame = pygame
+        pygame.display.init()
         pygame.joystick.init()
-        
+
         for attempt in range(1, self.max_retries + 1):
             try:
                 count = pygame.joystick.get_count()
                 self.logger.info(f"Detected {count} gamepad(s)")
-                
+
                 if count > 0:
-                    self.joystick = pygame.joystick.Joystick(0)
-                    self.joystick.init()
-                    
-                    # Print gamepad info
-                    self.logger.info(
-                        f"Connected: {self.joystick.get_name()}\n"
-                        f"Axes: {self.joystick.get_numaxes()}\n"
-                        f"Buttons: {self.joystick.get_numbuttons()}"
-                    )
-                    
-                    # Test axis response
-                    pygame.event.pump()
-                    self.logger.debug("Initial axis values:")
-                    for i in range(self.joystick.get_numaxes()):
-                        self.logger.debug(f"Axis {i}: {self.joystick.get_axis(i):.2f}")
+                    joystick = pygame.joystick.Joystick(0)
+                    joystick.init()
+                    self._attach(joystick)
                     return
-                
+
             except Exception as e:
                 self.logger.error(f"Init error (attempt {attempt}): {str(e)}")
-            
+
             time.sleep(self.retry_interval)
-        
+
         raise RuntimeError("Gamepad not found")
 
+    def _close_sdl(self):
+        """Release the gamepad and pygame (on the thread that opened them)"""
+        pygame = self._pygame
+        if self.joystick is not None:
+            self.joystick.quit()
+            self.joystick = None
+        pygame.joystick.quit()
+        pygame.display.quit()
+
+    def _attach(self, joystick):
+        self.joystick = joystick
+        with self._cond:
+            self._axes = [self._filter_axis(joystick.get_axis(i)) for i in range(joystick.get_numaxes())]
+            self._buttons = [bool(joystick.get_button(i)) for i in range(joystick.get_numbuttons())]
+            self._connected = True
+            self._changed()
+            self._latency_seq = self._seq
+        self.logger.info(
+            f"Connected: {joystick.get_name()}\n"
+            f"Axes: {len(self._axes)}\n"
+            f"Buttons: {len(self._buttons)}"
+        )
+
+    # -- reader thread -----------------------------------------------------
+
+    def start(self):
+        """Start draining input events on a background thread
+
+        A hardware gamepad's thread already runs from construction (it owns
+        SDL); after stop() this opens the gamepad again on a new thread.
+        """
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="Gamepad", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self):
+        if self._sdl:
+            try:
+                self._open_sdl()
+            except Exception as e:
+                self._open_error = e
+                self._running = False
+                self.logger.error(f"Gamepad open failed: {e}")
+            finally:
+                self._opened.set()
+        try:
+            while self._running:
+                try:
+                    self._drain(wait=True)
+                except Exception as e:
+                    self.logger.error(f"Gamepad read failed: {e}")
+                    time.sleep(self.retry_interval)
+        finally:
+            if self._pygame is not None:
+                self._close_sdl()
+
+    def _drain(self, wait=False):
+        """Apply all pending input; with wait, block briefly for the first event"""
+        if self._pygame is None:
+            if wait:
+                time.sleep(1.0 / self.poll_rate)
+            self._poll_changes()
+            return
+        pygame = self._pygame
+        events = []
+        if wait:
+            event = pygame.event.wait(50)
+            if event.type != pygame.NOEVENT:
+                events.append(event)
+        events.extend(pygame.event.get())
+        if events:
+            self._apply_events(events)
+
+    def _apply_events(self, events):
+        pygame = self._pygame
+        added = None
+        with self._cond:
+            changed = False
+            for event in events:
+                if event.type == pygame.JOYAXISMOTION:
+                    value = self._filter_axis(event.value)
+                    if event.axis < len(self._axes) and value != self._axes[event.axis]:
+                        self._axes[event.axis] = value
+                        changed = True
+                elif event.type in (pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP):
+                    changed |= self._set_button(event.button, event.type == pygame.JOYBUTTONDOWN)
+                elif event.type == getattr(pygame, 'JOYDEVICEREMOVED', None):
+                    self._disconnected()
+                    changed = True
+                elif event.type == getattr(pygame, 'JOYDEVICEADDED', None) and not self._connected:
+                    added = event.device_index
+            if changed:
+                self._changed()
+        if added is not None:
+            joystick = pygame.joystick.Joystick(added)
+            joystick.init()
+            self._attach(joystick)
+
+    def _poll_changes(self):
+        """Sample a joystick without an event queue and record what changed"""
+        joystick = self.joystick
+        axes = [self._filter_axis(joystick.get_axis(i)) for i in range(len(self._axes))]
+        buttons = [bool(joystick.get_button(i)) for i in range(len(self._buttons))]
+        with self._cond:
+            changed = axes != self._axes
+            self._axes = axes
+            for i, down in enumerate(buttons):
+                changed |= self._set_button(i, down)
+            if changed:
+                self._changed()
+
+    def _set_button(self, button, down):
+        if button >= len(self._buttons) or self._buttons[button] == down:
+            return False
+        self._buttons[button] = down
+        (self._pressed if down else self._released).add(button)
+        return True
+
+    def _disconnected(self):
+        """Sticks read zero and buttons up while the gamepad is gone"""
+        self.logger.warning("Gamepad disconnected")
+        self._connected = False
+        self._axes = [0.0] * len(self._axes)
+        for i in range(len(self._buttons)):
+            self._set_button(i, False)
+
+    def _changed(self):
+        self._seq += 1
+        self._changed_at = time.monotonic()
+        self._cond.notify_all()
+
+    # -- reading -----------------------------------------------------------
+
+    def state(self) -> GamepadState:
+        """Latest snapshot without consuming the button edges"""
+        if not self._running and not self._sdl:
+            self._drain()
+        with self._cond:
+            return self._snapshot(frozenset(self._pressed), frozenset(self._released))
+
+    def read(self) -> GamepadState:
+        """Latest snapshot; its pressed/released edges are cleared for the next read()"""
+        if not self._running and not self._sdl:
+            self._drain()
+        with self._cond:
+            state = self._snapshot(frozenset(self._pressed), frozenset(self._released))
+            self._pressed.clear()
+            self._released.clear()
+            return state
+
+    def wait_for_input(self, newer_than=0, timeout=None) -> Optional[GamepadState]:
+        """Block until the input changes after seq newer_than (None on timeout)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._seq <= newer_than:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return self._snapshot(frozenset(self._pressed), frozenset(self._released))
+
+    def _snapshot(self, pressed, released):
+        return GamepadState(time.monotonic(), self._seq, self._changed_at, tuple(self._axes),
+                            tuple(self._buttons), pressed, released, self._connected)
+
     def get_input(self) -> Tuple[float, float]:
         """Get normalized (x,y) input from left stick"""
         if not self.joystick:
             raise RuntimeError("Gamepad not initialized")
-        
-        pygame.event.pump()
-        
-        # Common mappings - may need adjustment for your gamepad
-        left_x = self._filter_axis(self.joystick.get_axis(0))  # Left stick X
-        left_y = -self._filter_axis(self.joystick.get_axis(1)) # Left stick Y (inverted)
-        
-        return left_x, left_y
-
-    def _filter_axis(self, value: float, deadzone: float = 0.1) -> float:
-        """Apply deadzone and scale output"""
-        if abs(value) < deadzone:
+        state = self.state()
+        return state.left_x, state.left_y
+
+    def _filter_axis(self, value: float) -> float:
+        """Apply deadzone and rescale the rest of the range"""
+        magnitude = abs(value)
+        if magnitude < self.deadzone:
             return 0.0
-        return value * 1.0  # Remove this multiplier if too sensitive
+        return (magnitude - self.deadzone) / (1.0 - self.deadzone) * (1.0 if value > 0 else -1.0)
+
+    # -- latency -----------------------------------------------------------
+
+    def record_latency(self, state: GamepadState, timestamp=None):
+        """
+        Record input-to-command latency once per input change
+
+        Args:
+            state: Snapshot a command was derived from
+            timestamp: When the command took effect (default now)
+        """
+        if state.seq <= self._latency_seq:
+            return
+        self._latency_seq = state.seq
+        latency = (time.monotonic() if timestamp is None else timestamp) - state.changed_at
+        self._latencies.append(latency)
+        INPUT_LATENCY.observe(latency)
+
+    def latency_stats(self):
+        """Input-to-command latency over the recent input changes (ms)"""
+        values = np.array(self._latencies) * 1e3
+        if not values.size:
+            return {"count": 0}
+        return {
+            "count": int(values.size),
+            "mean": float(values.mean()),
+            "p50": float(np.percentile(values, 50)),
+            "p99": float(np.percentile(values, 99)),
+            "max": float(values.max()),
+        }
 
     def __del__(self):
-        if self.joystick:
+        # pygame is shut down by the reader thread as it exits
+        self._running = False
+        if self.joystick and not self._sdl:
             self.joystick.quit()
-        pygame.quit()
\ No newline at end of file
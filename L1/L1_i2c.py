@@ -0,0 +1,277 @@
+"""
+Shared I2C bus manager.
+
+One I2CBus owns the single SMBus handle for a bus number and serialises
+every transaction on it, so drivers on different threads cannot interleave
+partial transfers. Register ranges requested together are merged into as
+few block reads as possible, and devices can be polled on their own
+schedules from one background thread that publishes decoded samples.
+"""
+import heapq
+import logging
+import threading
+import time
+from typing import Any, NamedTuple
+from L1.L1_backend import open_smbus, resolve_backend
+from utils import metrics
+
+TRANSACTION_TIME = metrics.histogram('i2c_transaction_seconds', 'Duration of single I2C transactions',
+                                     buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025))
+TRANSACTION_ERRORS = metrics.counter('i2c_errors_total', 'Failed I2C transactions')
+
+logger = logging.getLogger(__name__)
+
+MAX_BLOCK = 32  # SMBus block transfer limit in bytes
+
+
+class I2CSample(NamedTuple):
+    """Decoded reading from a polled device"""
+    name: str
+    timestamp: float
+    value: Any
+
+
+def merge_ranges(ranges, max_gap=0, max_length=MAX_BLOCK):
+    """
+    Merge register ranges into burst reads
+
+    Args:
+        ranges: Iterable of (start_register, length)
+        max_gap: Largest run of unrequested registers to read through
+        max_length: Longest single transfer
+
+    Returns:
+        List of (start, length) transfers covering every requested range
+    """
+    merged = []
+    for start, length in sorted(ranges):
+        if merged:
+            m_start, m_length = merged[-1]
+            end = max(m_start + m_length, start + length)
+            if start <= m_start + m_length + max_gap and end - m_start <= max_length:
+                merged[-1] = (m_start, end - m_start)
+                continue
+        merged.append((start, length))
+    return merged
+
+
+class PolledDevice:
+    """A device read by the bus poller at a fixed rate"""
+
+    def __init__(self, name, address, ranges, decode, rate_hz):
+        self.name = name
+        self.address = address
+        self.ranges = list(ranges)
+        self.transfers = merge_ranges(self.ranges)
+        self.decode = decode
+        self.period = 1.0 / rate_hz
+        self.next_due = 0.0
+        self.reads = 0
+        self.errors = 0
+        self.late = 0
+
+
+class I2CBus:
+    """Single, thread-safe owner of one I2C bus"""
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, bus=1, backend=None):
+        """Process-wide shared manager for a bus number"""
+        key = (bus, resolve_backend(backend))
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(bus, backend)
+            return cls._instances[key]
+
+    def __init__(self, bus=1, backend=None):
+        self.bus_number = bus
+        self.handle = open_smbus(bus, backend)
+        self._lock = threading.RLock()
+        self.transactions = 0
+        self.errors = 0
+        self._busy_time = 0.0
+        self._max_transaction = 0.0
+
+        # Polling
+        self._devices = {}
+        self._latest = {}
+        self._listeners = []
+        self._poll_thread = None
+        self._stop_event = threading.Event()
+        self._queue = []                  # (due, order, PolledDevice) heap, under _lock
+        self._order = 0                   # heap tie-break
+        self._wake = threading.Event()    # set when the queue changes or polling stops
+
+    # -- transactions ---------------------------------------------------
+
+    def read_block(self, address, register, length):
+        """One block read, serialised with every other transaction on the bus"""
+        with self._lock:
+            started = time.perf_counter()
+            try:
+                return self.handle.read_i2c_block_data(address, register, length)
+            except Exception:
+                self.errors += 1
+                TRANSACTION_ERRORS.inc()
+                raise
+            finally:
+                self._account(time.perf_counter() - started)
+
+    def write_byte(self, address, register, value):
+        with self._lock:
+            started = time.perf_counter()
+            try:
+                self.handle.write_byte_data(address, register, value)
+            except Exception:
+                self.errors += 1
+                TRANSACTION_ERRORS.inc()
+                raise
+            finally:
+                self._account(time.perf_counter() - started)
+
+    def _account(self, elapsed):
+        TRANSACTION_TIME.observe(elapsed)
+        self.transactions += 1
+        self._busy_time += elapsed
+        if elapsed > self._max_transaction:
+            self._max_transaction = elapsed
+
+    def read_ranges(self, address, ranges, transfers=None):
+        """
+        Read several register ranges using merged burst reads
+
+        Args:
+            address: Device address
+            ranges: Iterable of (start_register, length)
+            transfers: Precomputed merge_ranges(ranges), if available
+
+        Returns:
+            Dict mapping each requested start register to its list of bytes
+        """
+        transfers = transfers or merge_ranges(ranges)
+        blocks = [(start, self.read_block(address, start, length)) for start, length in transfers]
+        result = {}
+        for start, length in ranges:
+            for block_start, data in blocks:
+                offset = start - block_start
+                if 0 <= offset and offset + length <= len(data):
+                    result[start] = data[offset:offset + length]
+                    break
+        return result
+
+    # -- polling --------------------------------------------------------
+
+    def add_device(self, name, address, ranges, decode, rate_hz):
+        """
+        Poll a device in the background
+
+        Args:
+            name: Sample name, e.g. 'imu'
+            address: Device address
+            ranges: Register ranges to read each poll
+            decode: Callable mapping read_ranges() output to a value
+            rate_hz: Polling rate
+        """
+        device = PolledDevice(name, address, ranges, decode, rate_hz)
+        with self._lock:
+            self._devices[name] = device
+            if self._poll_thread is not None:
+                self._schedule(device, time.monotonic())
+        self._wake.set()
+        return device
+
+    def _schedule(self, device, due):
+        """Queue device's next poll (caller holds _lock)"""
+        device.next_due = due
+        self._order += 1
+        heapq.heappush(self._queue, (due, self._order, device))
+
+    def add_listener(self, callback):
+        """Call callback(I2CSample) for every polled sample"""
+        self._listeners.append(callback)
+
+    def latest(self, name):
+        """Most recent I2CSample for a polled device (None if none yet)"""
+        return self._latest.get(name)
+
+    def start(self):
+        with self._lock:
+            if self._poll_thread is not None:
+                return
+            self._stop_event.clear()
+            self._queue = []
+            now = time.monotonic()
+            for device in self._devices.values():
+                self._schedule(device, now)
+            self._poll_thread = threading.Thread(target=self._poll_loop, name="I2CPoller", daemon=True)
+            self._poll_thread.start()
+        logger.info(f"I2C bus {self.bus_number} polling: {list(self._devices)}")
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        self._wake.set()
+        thread = self._poll_thread
+        if thread is not None:
+            thread.join(timeout=timeout)
+            self._poll_thread = None
+
+    def _poll_loop(self):
+        try:
+            while not self._stop_event.is_set():
+                # Cleared before looking at the queue, so a device added
+                # after the look still wakes the wait below
+                self._wake.clear()
+                with self._lock:
+                    if self._queue and self._queue[0][0] <= time.monotonic():
+                        due, _, device = heapq.heappop(self._queue)
+                    else:
+                        due, device = (self._queue[0][0] if self._queue else None), None
+                if device is None:
+                    # Nothing due: sleep until the next poll (or forever when
+                    # no devices are registered) unless the queue changes
+                    self._wake.wait(None if due is None else due - time.monotonic())
+                    continue
+                if self._devices.get(device.name) is not device:
+                    continue   # replaced by a later add_device()
+                self._poll(device)
+                # Stay on the device's grid; skip missed slots instead of bursting
+                next_due = due + device.period
+                now = time.monotonic()
+                if next_due < now:
+                    device.late += 1
+                    next_due += ((now - next_due) // device.period + 1) * device.period
+                with self._lock:
+                    self._schedule(device, next_due)
+        finally:
+            with self._lock:
+                if self._poll_thread is threading.current_thread():
+                    self._poll_thread = None
+
+    def _poll(self, device):
+        try:
+            blocks = self.read_ranges(device.address, device.ranges, device.transfers)
+            sample = I2CSample(device.name, time.monotonic(), device.decode(blocks))
+        except Exception as e:
+            device.errors += 1
+            logger.error(f"I2C poll of {device.name} failed: {e}")
+            return
+        device.reads += 1
+        self._latest[device.name] = sample
+        for callback in self._listeners:
+            callback(sample)
+
+    def stats(self):
+        return {
+            "transactions": self.transactions,
+            "errors": self.errors,
+            "mean_transaction_ms": self._busy_time / self.transactions * 1e3 if self.transactions else 0.0,
+            "max_transaction_ms": self._max_transaction * 1e3,
+            "devices": {
+                name: {"reads": d.reads, "errors": d.errors, "late": d.late,
+                       "transfers": len(d.transfers)}
+                for name, d in self._devices.items()
+            },
+        }
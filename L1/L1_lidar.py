@@ -1,36 +1,224 @@
 import logging
-from rplidar import RPLidar
+import threading
+import time
+from collections import deque
 from utils.logger import setup_logger
+from utils.lidar_scan import LidarScan
+from L1.L1_backend import open_rplidar
+from utils import metrics
+
+SCANS = metrics.counter('lidar_scans_total', 'Scans received from the lidar stream')
+LATE_SCANS = metrics.counter('lidar_late_scans_total', 'Scans arriving more than 1.5 periods after the previous one')
+DROPPED_SCANS = metrics.counter('lidar_dropped_scans_total', 'Scans evicted from the ring before being read')
+STREAM_ERRORS = metrics.counter('lidar_stream_errors_total', 'Lidar stream failures')
+SCAN_INTERVAL = metrics.histogram('lidar_scan_interval_seconds', 'Time between consecutive scans',
+                                  buckets=(0.05, 0.075, 0.09, 0.1, 0.11, 0.125, 0.15, 0.2, 0.3, 0.5, 1.0))
 
 class Lidar:
-    def __init__(self, port='/dev/ttyUSB0'):
+    def __init__(self, port='/dev/ttyUSB0', stream=False, buffer_size=8,
+                 max_scan_points=500, scan_period=0.1, device=None, backend=None):
+        """
+        Args:
+            port: Serial port of the RPLIDAR
+            stream: Start the background reader immediately
+            buffer_size: Number of scans kept in the streaming ring
+            max_scan_points: Maximum buffered measurements for rplidar
+            scan_period: Nominal time between scans; a scan arriving more
+                than 1.5 periods after the previous one is counted as late
+            device: RPLidar-compatible object to use instead of opening
+                the serial port (e.g. a fake source for testing)
+            backend: 'hardware' or 'fake', see L1_backend
+        """
         setup_logger()
         self.logger = logging.getLogger('lidar')
         self.port = port
-        self.lidar = None
-        self.connect()
+        self.lidar = device
+        self.backend = backend
+        self.max_scan_points = max_scan_points
+        self.scan_period = scan_period
+        self._scan_seq = 0
+
+        # Streaming state
+        self._ring = deque(maxlen=buffer_size)
+        self._ring_cond = threading.Condition()
+        self._stream_thread = None
+        self._streaming = False
+        self._last_read_seq = 0
+        self._last_get_seq = 0
+        self.dropped_scans = 0
+        self.late_scans = 0
+        self.stream_errors = 0
+
+        if self.lidar is None:
+            self.connect()
+        if stream:
+            self.start_stream()
 
     def connect(self):
         """Initialize connection to RPLIDAR"""
         try:
-            self.lidar = RPLidar(self.port)
+            self.lidar = open_rplidar(self.port, self.backend)
             self.logger.info(f"Connected to RPLIDAR on {self.port}")
         except Exception as e:
             self.logger.error(f"Connection failed: {str(e)}")
             raise
 
-    def get_scan(self, max_scan_points=500):
-        """Get one full 360° scan"""
+    def get_scan(self, max_scan_points=None, as_array=False):
+        """Get one full 360° scan
+
+        In streaming mode this returns the next scan newer than the one
+        returned by the previous call, without restarting the device.
+
+        Args:
+            max_scan_points: Maximum buffered measurements for rplidar
+            as_array: Return a LidarScan instead of a list of
+                (quality, angle, distance) tuples
+        """
+        if self._streaming:
+            scan = self.wait_for_scan(newer_than=self._last_get_seq,
+                                      timeout=10 * self.scan_period)
+            if scan is None:
+                return None
+            self._last_get_seq = scan.seq
+            return scan if as_array else scan.to_points()
+
+        max_scan_points = max_scan_points or self.max_scan_points
         try:
             for scan in self.lidar.iter_scans(max_buf_meas=max_scan_points):
+                if as_array:
+                    self._scan_seq += 1
+                    return LidarScan.from_points(scan, time.monotonic(), self._scan_seq)
                 return scan
         except Exception as e:
             self.logger.error(f"Scan error: {str(e)}")
             self.stop()
             raise
 
+    def start_stream(self):
+        """Start the background reader that drains the device continuously"""
+        if self._streaming:
+            return
+        self._streaming = True
+        self._stream_thread = threading.Thread(
+            target=self._stream_loop,
+            name="LidarStream",
+            daemon=True
+        )
+        self._stream_thread.start()
+        self.logger.info("Lidar streaming started")
+
+    def stop_stream(self, timeout=1.0):
+        """Stop the background reader"""
+        if not self._streaming:
+            return
+        self._streaming = False
+        with self._ring_cond:
+            self._ring_cond.notify_all()
+        if self._stream_thread is not threading.current_thread():
+            self._stream_thread.join(timeout=timeout)
+        self._stream_thread = None
+        self.logger.info("Lidar streaming stopped")
+
+    @property
+    def streaming(self):
+        return self._streaming
+
+    def _stream_loop(self):
+        """Reader thread: one long-lived iter_scans() feeding the ring"""
+        last_arrival = None
+        while self._streaming:
+            try:
+                for points in self.lidar.iter_scans(max_buf_meas=self.max_scan_points):
+                    now = time.monotonic()
+                    SCANS.inc()
+                    if last_arrival is not None:
+                        SCAN_INTERVAL.observe(now - last_arrival)
+                        if now - last_arrival > 1.5 * self.scan_period:
+                            self.late_scans += 1
+                            LATE_SCANS.inc()
+                    last_arrival = now
+                    self._publish(LidarScan.from_points(points, now, self._scan_seq + 1))
+                    if not self._streaming:
+                        break
+                else:
+                    # Source ended without error (e.g. a finite fake source)
+                    self._streaming = False
+            except Exception as e:
+                self.stream_errors += 1
+                STREAM_ERRORS.inc()
+                self.logger.error(f"Stream error: {str(e)}")
+                last_arrival = None
+                try:
+                    self.lidar.stop()
+                except Exception:
+                    pass
+                time.sleep(self.scan_period)
+        with self._ring_cond:
+            self._ring_cond.notify_all()
+
+    def _publish(self, scan):
+        with self._ring_cond:
+            self._scan_seq = scan.seq
+            if len(self._ring) == self._ring.maxlen:
+                evicted = self._ring[0]
+                if evicted.seq > self._last_read_seq:
+                    self.dropped_scans += 1
+                    DROPPED_SCANS.inc()
+            self._ring.append(scan)
+            self._ring_cond.notify_all()
+
+    def latest_scan(self):
+        """Return the newest buffered LidarScan without blocking (None if none yet)"""
+        with self._ring_cond:
+            if not self._ring:
+                return None
+            scan = self._ring[-1]
+            self._last_read_seq = max(self._last_read_seq, scan.seq)
+            return scan
+
+    def wait_for_scan(self, newer_than=0, timeout=None):
+        """
+        Block until a scan with seq > newer_than is available
+
+        Args:
+            newer_than: Sequence number (or a LidarScan) already seen
+            timeout: Seconds to wait, None to wait forever
+
+        Returns:
+            The newest LidarScan, or None on timeout or stream shutdown
+        """
+        if isinstance(newer_than, LidarScan):
+            newer_than = newer_than.seq
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._ring_cond:
+            while not self._ring or self._ring[-1].seq <= newer_than:
+                if not self._streaming:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._ring_cond.wait(remaining)
+            scan = self._ring[-1]
+            self._last_read_seq = max(self._last_read_seq, scan.seq)
+            return scan
+
+    def stream_stats(self):
+        """Counters for the streaming reader
+
+        dropped counts scans evicted from the ring before any reader had
+        seen a scan that new; late counts gaps longer than 1.5 scan periods.
+        """
+        return {
+            "scans": self._scan_seq,
+            "dropped": self.dropped_scans,
+            "late": self.late_scans,
+            "errors": self.stream_errors,
+            "buffered": len(self._ring),
+        }
+
     def stop(self):
         """Clean shutdown"""
+        self.stop_stream()
         if self.lidar:
             self.lidar.stop()
             self.lidar.disconnect()
@@ -40,4 +228,4 @@ class Lidar:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.stop()
\ No newline at end of file
+        self.stop()
@@ -1,47 +1,144 @@
-import gpiozero
-from gpiozero.pins.pigpio import PiGPIOFactory
+from L1.L1_backend import open_pwm_outputs
 from utils.constants import MOTOR_PINS, PWM_FREQUENCY
+from utils import metrics, tracing
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Duty cycles are compared at this resolution; smaller changes are not written
+DUTY_RESOLUTION = 1e-4
+
+PIN_WRITES = metrics.counter('motor_pin_writes_total', 'PWM duty cycle writes issued')
+SKIPPED_WRITES = metrics.counter('motor_skipped_writes_total', 'PWM writes avoided because the duty cycle was unchanged')
+WRITE_TIME = metrics.histogram('motor_write_seconds', 'Duration of one batch of PWM writes',
+                               buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005))
+STOPS = metrics.counter('motor_stops_total', 'Motor stops', {'kind': 'normal'})
+EMERGENCY_STOPS = metrics.counter('motor_stops_total', 'Motor stops', {'kind': 'emergency'})
+TRIPS = metrics.counter('motor_trips_total', 'Safety trips latching the motors off')
+TRIP_TIME = metrics.histogram('motor_trip_seconds', 'Safety trip call to every pin at zero',
+                              buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005))
+BLOCKED_WRITES = metrics.counter('motor_blocked_writes_total', 'set_speed calls refused while tripped')
+
 class MotorController:
-    def __init__(self):
-        """Initialize with pigpio for hardware PWM"""
-        gpiozero.Device.pin_factory = PiGPIOFactory()
-        self.motors = [
-            gpiozero.PWMOutputDevice(
-                pin=pin,
-                frequency=PWM_FREQUENCY,
-                initial_value=0
-            ) for pin in MOTOR_PINS
-        ]
+    def __init__(self, backend=None):
+        """Initialize with pigpio for hardware PWM (or fake outputs, see L1_backend)"""
+        self.motors = open_pwm_outputs(MOTOR_PINS, PWM_FREQUENCY, backend)
         logger.info(f"Motors ready on pins: {MOTOR_PINS}")
         self._is_emergency_stopped = False
+        self._tripped = False     # safety latch, see trip()
+
+        # Last duty cycle written to each pin, for dirty tracking
+        self._values = [0.0] * len(self.motors)
+        self.write_count = 0      # individual pin writes issued
+        self.skipped_writes = 0   # pin writes avoided because nothing changed
+        self.batch_count = 0      # set_speed calls that wrote at least one pin
+        self._write_time = 0.0
+        self._max_write_time = 0.0
 
     def set_speed(self, speeds):
-        """Set speeds between -1.0 (full reverse) and 1.0 (full forward)"""
-        for motor, speed in zip(self.motors, speeds):
-            motor.value = max(-1.0, min(1.0, speed))
-        logger.debug(f"Motor speeds set: {speeds}")
+        """Set speeds between -1.0 (full reverse) and 1.0 (full forward)
+
+        Only pins whose duty cycle changed are written, back to back.
+        """
+        if self._tripped:
+            BLOCKED_WRITES.inc()
+            return
+        values = self._values
+        dirty = []
+        for i, speed in enumerate(speeds[:len(values)]):
+            value = round(max(-1.0, min(1.0, speed)) / DUTY_RESOLUTION) * DUTY_RESOLUTION
+            if value != values[i]:
+                dirty.append((i, value))
+        skipped = min(len(speeds), len(values)) - len(dirty)
+        self.skipped_writes += skipped
+        SKIPPED_WRITES.inc(skipped)
+        if not dirty:
+            return
+
+        started = time.perf_counter()
+        motors = self.motors
+        for i, value in dirty:
+            motors[i].value = value
+            values[i] = value
+        elapsed = time.perf_counter() - started
+        if self._tripped:
+            # Tripped while these writes were in flight: they must not stick
+            self._zero_pins()
+
+        self.write_count += len(dirty)
+        self.batch_count += 1
+        PIN_WRITES.inc(len(dirty))
+        WRITE_TIME.observe(elapsed)
+        self._write_time += elapsed
+        if elapsed > self._max_write_time:
+            self._max_write_time = elapsed
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Motor speeds set: %s", values)
 
     def stop(self, emergency=False):
-        
+
         """Stop all motors
         Args:
             emergency: If True, logs as warning (for unexpected stops)
         """
         self._is_emergency_stopped = emergency
-
-        for motor in self.motors:
-            motor.value = 0
+        self._zero_pins()
+        tracing.hop('motor_stop')
+        (EMERGENCY_STOPS if emergency else STOPS).inc()
         if emergency:
             logger.warning("Motors forcefully stopped")
         else:
             logger.info("Motors stopped normally")
-            
+
+    def _zero_pins(self):
+        # Always write every pin: a stop must not depend on cached state
+        for i, motor in enumerate(self.motors):
+            motor.value = 0
+            self._values[i] = 0.0
+        self.write_count += len(self.motors)
+        PIN_WRITES.inc(len(self.motors))
+
+    def trip(self):
+        """Zero every pin now and latch motion off until clear_trip()
+
+        Safe to call from any thread without a lock, including while
+        another thread is inside set_speed: set_speed checks the latch
+        before writing, and re-zeroes the pins if it tripped meanwhile.
+        """
+        started = time.perf_counter()
+        self._tripped = True
+        self._is_emergency_stopped = True
+        self._zero_pins()
+        TRIP_TIME.observe(time.perf_counter() - started)
+        tracing.hop('motor_stop')
+        TRIPS.inc()
+
+    def clear_trip(self):
+        """Release the safety latch; the motors stay at zero until the next set_speed"""
+        if self._tripped:
+            self._tripped = False
+            self._is_emergency_stopped = False
+            logger.warning("Motor safety latch cleared")
+
+    @property
+    def tripped(self):
+        return self._tripped
+
+    def write_stats(self):
+        """Counters for pin writes, to confirm the reduced pigpio traffic"""
+        return {
+            "writes": self.write_count,
+            "skipped": self.skipped_writes,
+            "batches": self.batch_count,
+            "mean_batch_ms": self._write_time / self.batch_count * 1e3 if self.batch_count else 0.0,
+            "max_batch_ms": self._max_write_time * 1e3,
+        }
+
     def status(self):
         return {
             "emergency_stop": self._is_emergency_stopped,
-            "speeds": [m.value for m in self.motors]
-        }
\ No newline at end of file
+            "tripped": self._tripped,
+            "speeds": [m.value for m in self.motors],
+            "writes": self.write_stats(),
+        }
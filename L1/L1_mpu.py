@@ -1,13 +1,22 @@
-import smbus2
+from L1.L1_i2c import I2CBus
 
 class MPU9250:
-    def __init__(self, i2c_address=0x68):
-        self.bus = smbus2.SMBus(1)
+    # Accel (0x3B), temperature (0x41) and gyro (0x43) are contiguous and
+    # read as one 14-byte burst; the magnetometer block is separate
+    RANGES = [(0x3B, 6), (0x41, 2), (0x43, 6), (0x03, 6)]
+
+    def __init__(self, i2c_address=0x68, backend=None, bus=None):
+        self.bus = bus or I2CBus.get(1, backend)
         self.address = i2c_address
 
     def read_data(self):
         # Read accelerometer, gyroscope, and magnetometer data
-        accel_data = self.bus.read_i2c_block_data(self.address, 0x3B, 6)
-        gyro_data = self.bus.read_i2c_block_data(self.address, 0x43, 6)
-        mag_data = self.bus.read_i2c_block_data(self.address, 0x03, 6)
-        return accel_data, gyro_data, mag_data
\ No newline at end of file
+        return self.decode(self.bus.read_ranges(self.address, self.RANGES))
+
+    @staticmethod
+    def decode(blocks):
+        return blocks[0x3B], blocks[0x43], blocks[0x03]
+
+    def poll(self, rate_hz, name='imu'):
+        """Have the shared bus poll this device in the background"""
+        return self.bus.add_device(name, self.address, self.RANGES, self.decode, rate_hz)
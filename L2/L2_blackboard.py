@@ -0,0 +1,135 @@
+"""
+Versioned robot-state blackboard.
+
+One place for the state other components want to read: pose, measured and
+commanded velocity, control mode, the latest scan summary and the battery
+voltage. Writers publish changed keys and the blackboard replaces its
+immutable BoardSnapshot with a new version, so a reader gets a consistent
+view of every key with a single attribute access, never taking a lock or
+waiting for a writer. Writers are serialized by a short lock that is never
+held across I/O.
+
+Each snapshot records the version at which every key last changed, so a
+reader can block until particular keys change:
+
+    snapshot = BLACKBOARD.snapshot()
+    x, y, theta = snapshot.pose
+    snapshot = BLACKBOARD.wait_for('mode', since=snapshot.version, timeout=1.0)
+"""
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Mapping, NamedTuple, Optional, Tuple
+
+
+class ScanSummary(NamedTuple):
+    """What the rest of the robot needs from one lidar scan"""
+    seq: int
+    timestamp: float
+    points: int
+    min_distance: float   # m, ahead of the robot (inf when clear)
+
+
+class BoardSnapshot(NamedTuple):
+    """All blackboard keys at one version"""
+    version: int
+    timestamp: float                            # time.monotonic() of the publish
+    versions: Mapping[str, int]                 # key -> version it last changed at
+    pose: Tuple[float, float, float]            # x, y (m), theta (rad) from odometry
+    velocity: Tuple[float, float]               # measured v (m/s), omega (rad/s)
+    command: Tuple[float, float]                # commanded linear, angular
+    mode: Any                                   # ControlMode, None before mission control starts
+    scan: Optional[ScanSummary]
+    battery: Optional[float]                    # V
+
+
+KEYS = ('pose', 'velocity', 'command', 'mode', 'scan', 'battery')
+_KEY_SET = frozenset(KEYS)
+
+
+class Blackboard:
+    def __init__(self):
+        self._snapshot = BoardSnapshot(
+            version=0, timestamp=time.monotonic(), versions=MappingProxyType(dict.fromkeys(KEYS, 0)),
+            pose=(0.0, 0.0, 0.0), velocity=(0.0, 0.0), command=(0.0, 0.0),
+            mode=None, scan=None, battery=None)
+        self._write_lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._waiting = 0   # readers blocked in wait_for()
+
+    def snapshot(self):
+        """Latest BoardSnapshot (never blocks)"""
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def publish(self, **values):
+        """
+        Publish new values for some keys
+
+        Values must be immutable and comparable with ==; keys whose value
+        is unchanged are left alone, and if none changed no new version is
+        made.
+
+        Returns:
+            The current BoardSnapshot
+        """
+        if not _KEY_SET.issuperset(values):
+            unknown = set(values) - _KEY_SET
+            raise ValueError(f"Unknown blackboard keys: {sorted(unknown)}")
+        with self._write_lock:
+            current = self._snapshot
+            changed = {key: value for key, value in values.items() if getattr(current, key) != value}
+            if not changed:
+                return current
+            version = current.version + 1
+            versions = dict(current.versions)
+            versions.update(dict.fromkeys(changed, version))
+            snapshot = current._replace(version=version, timestamp=time.monotonic(),
+                                        versions=MappingProxyType(versions), **changed)
+            self._snapshot = snapshot
+        # A waiter counts itself before checking the snapshot, so if it is
+        # not counted yet it will see this version without being woken
+        if self._waiting:
+            with self._changed:
+                self._changed.notify_all()
+        return snapshot
+
+    def wait_for(self, keys, since=None, timeout=None):
+        """
+        Wait until any of keys changes after version since
+
+        Args:
+            keys: Key name or iterable of key names
+            since: Version to compare against (the current one if omitted)
+            timeout: Seconds to wait, None for no limit
+
+        Returns:
+            The first snapshot with one of keys changed, or None on timeout
+        """
+        keys = (keys,) if isinstance(keys, str) else tuple(keys)
+        if not _KEY_SET.issuperset(keys):
+            unknown = set(keys) - _KEY_SET
+            raise ValueError(f"Unknown blackboard keys: {sorted(unknown)}")
+        snapshot = self._snapshot
+        if since is None:
+            since = snapshot.version
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            self._waiting += 1
+            try:
+                while True:
+                    snapshot = self._snapshot
+                    if any(snapshot.versions[key] > since for key in keys):
+                        return snapshot
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return None
+                    self._changed.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+
+BLACKBOARD = Blackboard()
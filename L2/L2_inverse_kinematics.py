@@ -1,8 +1,4 @@
-class InverseKinematics:
-    def __init__(self, wheelbase):
-        self.wheelbase = wheelbase
+"""Kept for existing imports; InverseKinematics is L2_kinematics.Kinematics"""
+from L2.L2_kinematics import InverseKinematics
 
-    def compute_wheel_speeds(self, x_dot, theta_dot):
-        phiL = x_dot - theta_dot * self.wheelbase / 2
-        phiR = x_dot + theta_dot * self.wheelbase / 2
-        return phiL, phiR
\ No newline at end of file
+__all__ = ['InverseKinematics']
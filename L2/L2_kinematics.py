@@ -1,13 +1,14 @@
-from utils.constants import WHEELBASE
+from utils.constants import WHEELBASE, MAX_SPEED
 import numpy as np
 import logging
 
 logger = logging.getLogger(__name__)
 
 class Kinematics:
-    def __init__(self, wheelbase=WHEELBASE):
-        """Initialize with wheelbase from constants.py"""
+    def __init__(self, wheelbase=WHEELBASE, max_speed=MAX_SPEED):
+        """Initialize with wheelbase and top wheel speed from constants.py"""
         self.wheelbase = wheelbase
+        self.max_speed = max_speed
         logger.info(f"Kinematics initialized with wheelbase: {self.wheelbase}m")
 
     def compute_chassis_speeds(self, phi_l, phi_r):
@@ -18,7 +19,6 @@ class Kinematics:
         """
         x_dot = (phi_l + phi_r) / 2
         theta_dot = (phi_r - phi_l) / self.wheelbase
-        logger.debug(f"Computed chassis speeds: x_dot={x_dot:.2f}m/s, theta_dot={theta_dot:.2f}rad/s")
         return x_dot, theta_dot
 
     def compute_wheel_speeds(self, x_dot, theta_dot):
@@ -28,19 +28,100 @@ class Kinematics:
         theta_dot: desired angular speed (rad/s)
         Returns: [left_speed, right_speed] in rad/s
         """
-        phi_l = x_dot - (theta_dot * self.wheelbase) / 2
-        phi_r = x_dot + (theta_dot * self.wheelbase) / 2
-        logger.debug(f"Computed wheel speeds: left={phi_l:.2f}rad/s, right={phi_r:.2f}rad/s")
-        return [phi_l, phi_r]
+        half_track = theta_dot * self.wheelbase / 2
+        return [x_dot - half_track, x_dot + half_track]
 
     def compute_motor_commands(self, x_dot, theta_dot):
         """
         Directly compute motor duty cycles (-1 to 1)
         Returns: [left_duty, right_duty, left_duty, right_duty]
         """
-        phi_l, phi_r = self.compute_wheel_speeds(x_dot, theta_dot)
-        # Scale to motor duty cycles (assuming MAX_SPEED from constants)
-        from utils.constants import MAX_SPEED
-        left_duty = phi_l / MAX_SPEED
-        right_duty = phi_r / MAX_SPEED
-        return [left_duty, right_duty, left_duty, right_duty]
\ No newline at end of file
+        half_track = theta_dot * self.wheelbase / 2
+        left_duty = (x_dot - half_track) / self.max_speed
+        right_duty = (x_dot + half_track) / self.max_speed
+        return [left_duty, right_duty, left_duty, right_duty]
+
+    # -- batch API: arrays in, arrays out --------------------------------
+
+    def chassis_speeds(self, wheel_speeds):
+        """
+        Vectorized compute_chassis_speeds
+        wheel_speeds: array (..., 2) of [left, right]
+        Returns: array (..., 2) of [x_dot, theta_dot]
+        """
+        wheel_speeds = np.asarray(wheel_speeds, dtype=np.float64)
+        out = np.empty_like(wheel_speeds)
+        phi_l, phi_r = wheel_speeds[..., 0], wheel_speeds[..., 1]
+        np.add(phi_l, phi_r, out=out[..., 0])
+        out[..., 0] /= 2
+        np.subtract(phi_r, phi_l, out=out[..., 1])
+        out[..., 1] /= self.wheelbase
+        return out
+
+    def wheel_speeds(self, x_dot, theta_dot):
+        """
+        Vectorized compute_wheel_speeds
+        x_dot, theta_dot: broadcastable arrays
+        Returns: array (..., 2) of [left, right]
+        """
+        x_dot, theta_dot = np.broadcast_arrays(np.asarray(x_dot, dtype=np.float64),
+                                               np.asarray(theta_dot, dtype=np.float64))
+        half_track = theta_dot * (self.wheelbase / 2)
+        out = np.empty(x_dot.shape + (2,))
+        np.subtract(x_dot, half_track, out=out[..., 0])
+        np.add(x_dot, half_track, out=out[..., 1])
+        return out
+
+    def motor_commands(self, x_dot, theta_dot):
+        """
+        Vectorized compute_motor_commands
+        Returns: array (..., 4) of [left, right, left, right] duty cycles
+        """
+        duties = self.wheel_speeds(x_dot, theta_dot) / self.max_speed
+        return np.concatenate([duties, duties], axis=-1)
+
+    def rollout(self, x_dot, theta_dot, dt, steps=None, pose=(0.0, 0.0, 0.0)):
+        """
+        Forward-simulate N candidate commands over T steps
+
+        Each step moves along the arc given by its command (midpoint
+        heading), matching how L2_odometry integrates encoder motion.
+
+        Args:
+            x_dot, theta_dot: (N,) constant commands, or (N, T) command
+                sequences
+            dt: Step length in seconds
+            steps: T, required when the commands are constant
+            pose: Start (x, y, theta) shared by all candidates
+
+        Returns:
+            array (N, T, 3) of (x, y, theta) after each step
+        """
+        x_dot = np.asarray(x_dot, dtype=np.float64)
+        theta_dot = np.asarray(theta_dot, dtype=np.float64)
+        if x_dot.ndim <= 1 and theta_dot.ndim <= 1:
+            if steps is None:
+                raise ValueError("steps is required for constant commands")
+            x_dot, theta_dot = np.broadcast_arrays(x_dot, theta_dot)
+            x_dot = np.broadcast_to(np.atleast_1d(x_dot)[:, None], (x_dot.size, steps))
+            theta_dot = np.broadcast_to(np.atleast_1d(theta_dot)[:, None], x_dot.shape)
+        else:
+            x_dot, theta_dot = np.broadcast_arrays(np.atleast_2d(x_dot), np.atleast_2d(theta_dot))
+
+        x0, y0, theta0 = pose
+        out = np.empty(x_dot.shape + (3,))
+        dtheta = theta_dot * dt
+        theta = np.cumsum(dtheta, axis=1, out=out[..., 2])
+        theta += theta0
+        heading = theta - dtheta / 2
+        ds = x_dot * dt
+        np.cumsum(ds * np.cos(heading), axis=1, out=out[..., 0])
+        np.cumsum(ds * np.sin(heading), axis=1, out=out[..., 1])
+        out[..., 0] += x0
+        out[..., 1] += y0
+        return out
+
+
+# Inverse kinematics lives in the same implementation; the old name is kept
+# for existing callers
+InverseKinematics = Kinematics
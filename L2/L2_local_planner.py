@@ -0,0 +1,171 @@
+"""
+Dynamic Window Approach local planner.
+
+Each call samples the (v, omega) commands reachable within one window of
+the current velocity, rolls every candidate forward with
+Kinematics.rollout and scores it against the lidar point cloud. The score
+combines three terms: heading towards a goal direction, clearance, and
+speed. All candidates are evaluated together with NumPy: squared distances
+between every checked trajectory pose and every obstacle point come from a
+single matrix product per plan.
+
+Velocities here are physical (m/s, rad/s) in the robot frame: x forward,
+y left, theta counter-clockwise.
+"""
+import time
+from typing import NamedTuple
+import numpy as np
+from L2.L2_kinematics import Kinematics
+from utils.constants import MAX_SPEED, WHEELBASE
+
+
+class PlanResult(NamedTuple):
+    """Outcome of one planning cycle"""
+    v: float               # m/s (0 if nothing admissible)
+    omega: float           # rad/s
+    ok: bool               # an admissible candidate was found
+    clearance: float       # m between robot edge and nearest point along the plan
+    candidates: int
+    admissible: int
+    elapsed: float         # seconds spent planning
+
+
+class DWAPlanner:
+    def __init__(self, kinematics=None, max_speed=MAX_SPEED, min_speed=0.0,
+                 max_yaw_rate=2 * MAX_SPEED / WHEELBASE, max_accel=1.0, max_yaw_accel=5.0,
+                 window_time=0.25, v_samples=15, omega_samples=25, horizon=1.5, dt=0.1,
+                 check_stride=3, robot_radius=0.2, safety_margin=0.03, clearance_cap=0.6,
+                 point_resolution=0.05,
+                 heading_weight=1.0, clearance_weight=1.0, velocity_weight=0.5):
+        """
+        Args:
+            kinematics: Kinematics instance used for rollouts
+            max_speed, min_speed: Speed limits (m/s); a negative min_speed
+                lets the planner back away from obstacles
+            max_yaw_rate: Turn rate limit (rad/s)
+            max_accel, max_yaw_accel: Acceleration limits (m/s², rad/s²)
+            window_time: Seconds of acceleration that bound the dynamic window
+            v_samples, omega_samples: Grid size of the candidate set
+            horizon, dt: Rollout length and step (s)
+            check_stride: Check clearance at every check_stride-th rollout pose
+            robot_radius: Collision radius (m)
+            safety_margin: Clearance a candidate must keep to be admissible (m);
+                also covers contact between two checked poses
+            clearance_cap: Clearance beyond this scores no higher (m)
+            point_resolution: Grid (m) used to merge nearby scan points
+            heading_weight, clearance_weight, velocity_weight: Score weights
+        """
+        self.kinematics = kinematics or Kinematics()
+        self.max_speed = max_speed
+        self.min_speed = min_speed
+        self.max_yaw_rate = max_yaw_rate
+        self.max_accel = max_accel
+        self.max_yaw_accel = max_yaw_accel
+        self.window_time = window_time
+        self.v_samples = v_samples
+        self.omega_samples = omega_samples
+        self.dt = dt
+        self.steps = max(1, int(round(horizon / dt)))
+        self.check_stride = max(1, check_stride)
+        self.robot_radius = robot_radius
+        self.safety_margin = safety_margin
+        self.clearance_cap = clearance_cap
+        self.point_resolution = point_resolution
+        self.weights = np.array([heading_weight, clearance_weight, velocity_weight])
+
+    @property
+    def reach(self):
+        """Farthest a rollout can get, plus the robot radius (m)"""
+        return max(self.max_speed, -self.min_speed) * self.steps * self.dt + self.robot_radius
+
+    def window(self, v, omega):
+        """Candidate (v, omega) arrays reachable from the current velocity"""
+        dv = self.max_accel * self.window_time
+        dw = self.max_yaw_accel * self.window_time
+        v_low = max(self.min_speed, min(self.max_speed, v - dv))
+        v_high = min(self.max_speed, max(self.min_speed, v + dv))
+        w_low = max(-self.max_yaw_rate, omega - dw)
+        w_high = min(self.max_yaw_rate, omega + dw)
+        vs = np.linspace(v_low, v_high, self.v_samples)
+        ws = np.linspace(w_low, w_high, self.omega_samples)
+        vv, ww = np.meshgrid(vs, ws, indexing='ij')
+        return vv.ravel(), ww.ravel()
+
+    def prepare_points(self, points):
+        """Keep points within reach and merge those sharing a grid cell"""
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        reach = self.reach + self.clearance_cap
+        points = points[np.einsum('ij,ij->i', points, points) <= reach * reach]
+        if self.point_resolution and len(points):
+            cells = np.floor(points / self.point_resolution).astype(np.int64)
+            keys = np.unique((cells[:, 0] << 32) + (cells[:, 1] & 0xFFFFFFFF))
+            cells = np.stack([keys >> 32, (keys & 0xFFFFFFFF).astype(np.int32)], axis=1)
+            points = ((cells + 0.5) * self.point_resolution).astype(np.float32)
+        return points
+
+    def clearance(self, trajectories, points):
+        """Distance (m) from the robot edge to the nearest point, per trajectory"""
+        n = trajectories.shape[0]
+        if not len(points):
+            return np.full(n, np.inf)
+        checked = trajectories[:, self.check_stride - 1::self.check_stride, :2]
+        poses = np.ones(checked.shape[:2] + (3,), dtype=np.float32)
+        poses[..., :2] = checked
+        poses = poses.reshape(-1, 3)
+        # |a - b|² = |a|² + (|b|² - 2 a·b); the bracket for all pairs is one
+        # product of [ax, ay, 1] with [-2 bx, -2 by, |b|²]
+        norms = np.einsum('ij,ij->i', points, points)
+        basis = np.empty((3, len(points)), dtype=np.float32)
+        basis[:2] = -2.0 * points.T
+        basis[2] = norms
+        nearest = (poses @ basis).min(axis=1)
+        nearest += np.einsum('ij,ij->i', poses[:, :2], poses[:, :2])
+        nearest = nearest.reshape(n, -1).min(axis=1)
+        return np.sqrt(np.maximum(nearest, 0.0)) - self.robot_radius
+
+    def plan(self, points, velocity=(0.0, 0.0), goal_heading=0.0):
+        """
+        Pick the best command for this cycle
+
+        Args:
+            points: (N, 2) obstacle points in the robot frame (m)
+            velocity: Current (v, omega)
+            goal_heading: Preferred direction of travel in the robot frame (rad)
+
+        Returns:
+            PlanResult
+        """
+        started = time.perf_counter()
+        points = self.prepare_points(points)
+        vs, ws = self.window(*velocity)
+        trajectories = self.kinematics.rollout(vs, ws, self.dt, self.steps)
+        clearance = self.clearance(trajectories, points)
+
+        # Admissible: keeps the safety margin and can brake within it, or
+        # (once already inside the margin) at least gets no closer
+        start = float(np.sqrt(np.einsum('ij,ij->i', points, points).min())) - self.robot_radius \
+            if len(points) else np.inf
+        margin = clearance - self.safety_margin
+        speeds = np.abs(vs)   # braking distance is the same in reverse
+        admissible = (margin > 0) & (speeds <= np.sqrt(2 * self.max_accel * np.maximum(margin, 0)))
+        if start <= self.safety_margin:
+            admissible |= (clearance > 0) & (clearance >= start) & \
+                (speeds <= np.sqrt(2 * self.max_accel * np.maximum(clearance, 0)))
+        count = int(admissible.sum())
+        if not count:
+            return PlanResult(0.0, 0.0, False, float(clearance.max(initial=-np.inf)),
+                              len(vs), 0, time.perf_counter() - started)
+
+        error = np.abs((trajectories[:, -1, 2] - goal_heading + np.pi) % (2 * np.pi) - np.pi)
+        terms = np.stack([
+            np.pi - error,
+            np.minimum(clearance, self.clearance_cap),
+            vs - self.min_speed,
+        ])
+        terms = terms[:, admissible]
+        spans = terms.max(axis=1) - terms.min(axis=1)
+        terms = (terms - terms.min(axis=1, keepdims=True)) / np.where(spans > 0, spans, 1.0)[:, None]
+        scores = self.weights @ terms
+        best = np.flatnonzero(admissible)[int(np.argmax(scores))]
+        return PlanResult(float(vs[best]), float(ws[best]), True, float(clearance[best]),
+                          len(vs), count, time.perf_counter() - started)
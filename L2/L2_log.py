@@ -1,11 +1,290 @@
-import csv
-from datetime import datetime
+"""
+Data logging.
 
-class Logger:
-    def __init__(self, filename="log.csv"):
-        self.filename = filename
+Logger appends CSV rows (see utils.logger). TelemetryLogger records
+high-rate typed samples (encoders, IMU, commands, ...): rows go into
+preallocated NumPy blocks and a background thread appends full blocks to
+disk as fixed-size binary records, so logging a row costs one lock and one
+structured-array assignment. read_telemetry() memory-maps a file back into
+a structured array.
 
-    def log_data(self, data):
-        with open(self.filename, "a") as file:
-            writer = csv.writer(file)
-            writer.writerow([datetime.now()] + data)
\ No newline at end of file
+File format: MAGIC, a little-endian uint32 header length, a JSON header
+(dtype, schema, creation time) padded so records start on a 64-byte
+boundary, then the records back to back.
+"""
+import glob
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from collections import deque
+import numpy as np
+from utils.logger import Logger
+
+__all__ = ['Logger', 'TelemetryLogger', 'read_telemetry', 'read_telemetry_files']
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SCUTTLM1'
+HEADER_ALIGN = 64
+DROP_POLICIES = ('oldest', 'newest')
+
+
+def _write_header(file, dtype, schema):
+    header = json.dumps({
+        "dtype": np.lib.format.dtype_to_descr(dtype),
+        "schema": schema,
+        "created": time.time(),
+    }).encode()
+    prefix = len(MAGIC) + 4
+    padding = -(prefix + len(header)) % HEADER_ALIGN
+    header += b' ' * padding
+    file.write(MAGIC + struct.pack('<I', len(header)) + header)
+    return prefix + len(header)
+
+
+def _read_header(path):
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a telemetry log")
+        (length,) = struct.unpack('<I', file.read(4))
+        header = json.loads(file.read(length))
+    dtype = np.lib.format.descr_to_dtype(
+        [tuple(field) for field in header["dtype"]] if isinstance(header["dtype"], list) else header["dtype"]
+    )
+    return header, dtype, len(MAGIC) + 4 + length
+
+
+def read_telemetry(path):
+    """
+    Memory-map one telemetry file
+
+    Returns:
+        Read-only structured array (one field per schema column plus
+        'timestamp'); a partially written trailing record is ignored
+    """
+    header, dtype, offset = _read_header(path)
+    count = (os.path.getsize(path) - offset) // dtype.itemsize
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+
+def read_telemetry_files(prefix):
+    """Concatenate every rotated file written for prefix, in order"""
+    paths = sorted(glob.glob(f"{prefix}_[0-9][0-9][0-9][0-9].tlm"))
+    if not paths:
+        raise FileNotFoundError(f"No telemetry files for {prefix}")
+    return np.concatenate([read_telemetry(path) for path in paths])
+
+
+class TelemetryLogger:
+    """
+    Buffered binary logger for fixed-schema samples
+
+    Memory is bounded to max_blocks blocks of block_rows rows. When the
+    writer falls that far behind, drop='oldest' recycles the oldest unwritten
+    block (its rows are lost) and drop='newest' discards incoming rows until
+    a block is free; either way the loss is counted in stats().
+
+    Files are named <prefix>_0000.tlm, <prefix>_0001.tlm, ... and rotate
+    when they reach rotate_bytes or are older than rotate_seconds.
+    """
+
+    def __init__(self, prefix, schema, block_rows=1024, max_blocks=16,
+                 flush_interval=0.5, rotate_bytes=64 * 2**20, rotate_seconds=None,
+                 drop='oldest'):
+        """
+        Args:
+            prefix: Output path prefix, e.g. 'logs/drive'
+            schema: List of (name, dtype) columns, e.g. [('left', 'f4'), ('right', 'f4')];
+                a float64 'timestamp' column (time.monotonic) is prepended
+            block_rows: Rows per preallocated block
+            max_blocks: Blocks allocated in total (the memory bound)
+            flush_interval: Longest time a row waits in memory before it is written
+            rotate_bytes: Start a new file beyond this size (None to disable)
+            rotate_seconds: Start a new file after this many seconds (None to disable)
+            drop: 'oldest' or 'newest', see class docstring
+        """
+        if drop not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop}")
+        if max_blocks < 2:
+            raise ValueError("max_blocks must be at least 2")
+        self.prefix = prefix
+        self.schema = [(name, np.dtype(dtype).str) for name, dtype in schema]
+        self.dtype = np.dtype([('timestamp', '<f8')] + self.schema)
+        self.block_rows = block_rows
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.drop = drop
+
+        self._free = deque(np.empty(block_rows, dtype=self.dtype) for _ in range(max_blocks - 1))
+        self._full = deque()      # (block, rows) waiting for the writer
+        self._block = np.empty(block_rows, dtype=self.dtype)
+        self._rows = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+
+        self.files = []
+        self._file = None
+        self._file_bytes = 0
+        self._file_opened = 0.0
+
+        self.rows_logged = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.blocks_written = 0
+        self._settled = 0         # logged rows written or lost after being accepted
+        self._write_time = 0.0
+
+        self._running = True
+        self._thread = threading.Thread(target=self._writer_loop, name="TelemetryWriter", daemon=True)
+        self._thread.start()
+
+    @property
+    def columns(self):
+        return [name for name, _ in self.schema]
+
+    def log(self, *values, timestamp=None):
+        """
+        Append one row
+
+        Args:
+            values: One value per schema column, in schema order
+            timestamp: Sample time (defaults to time.monotonic())
+
+        Returns:
+            False if the row was dropped
+        """
+        row = (time.monotonic() if timestamp is None else timestamp,) + values
+        with self._lock:
+            if self._block is None and not self._next_block():
+                self.rows_dropped += 1
+                return False
+            self._block[self._rows] = row
+            self._rows += 1
+            self.rows_logged += 1
+            if self._rows == self.block_rows:
+                self._retire()
+        return True
+
+    def _retire(self):
+        """Hand the current block to the writer (lock held)"""
+        self._full.append((self._block, self._rows))
+        self._block = None
+        self._rows = 0
+        self._wake.notify()
+        self._next_block()
+
+    def _next_block(self):
+        """Take a free block, applying the drop policy if there is none (lock held)"""
+        if self._free:
+            self._block = self._free.popleft()
+        elif self.drop == 'oldest' and self._full:
+            block, rows = self._full.popleft()
+            self.rows_dropped += rows
+            self._settled += rows
+            self._block = block
+        else:
+            return False
+        self._rows = 0
+        return True
+
+    def flush(self, timeout=5.0):
+        """Write everything logged so far and wait for it to reach the file"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            if self._rows:
+                self._retire()
+            target = self.rows_logged
+            while self._settled < target and time.monotonic() < deadline:
+                self._wake.notify()
+                self._wake.wait(0.05)
+
+    def close(self):
+        """Flush, stop the writer thread and close the current file"""
+        if not self._running:
+            return
+        self.flush()
+        with self._lock:
+            self._running = False
+            self._wake.notify()
+        self._thread.join(timeout=5.0)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _writer_loop(self):
+        while True:
+            with self._lock:
+                if not self._full and self._running:
+                    self._wake.wait(self.flush_interval)
+                    if not self._full and self._rows:
+                        # Bound the age of rows sitting in a partial block
+                        self._retire()
+                if not self._full:
+                    if not self._running:
+                        return
+                    continue
+                block, rows = self._full.popleft()
+            try:
+                self._write(block[:rows])
+            except Exception as e:
+                logger.error(f"Telemetry write failed: {e}")
+                with self._lock:
+                    self.rows_dropped += rows
+                    self._settled += rows
+            else:
+                with self._lock:
+                    self.rows_written += rows
+                    self._settled += rows
+            with self._lock:
+                self._free.append(block)
+                self._wake.notify_all()
+
+    def _write(self, records):
+        if self._file is None or self._should_rotate():
+            self._open_next()
+        started = time.perf_counter()
+        self._file.write(records.tobytes())
+        self._file.flush()
+        self._write_time += time.perf_counter() - started
+        self._file_bytes += records.nbytes
+        self.blocks_written += 1
+
+    def _should_rotate(self):
+        if self.rotate_bytes is not None and self._file_bytes >= self.rotate_bytes:
+            return True
+        return self.rotate_seconds is not None and time.monotonic() - self._file_opened >= self.rotate_seconds
+
+    def _open_next(self):
+        if self._file is not None:
+            self._file.close()
+        path = f"{self.prefix}_{len(self.files):04d}.tlm"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'wb')
+        self._file_bytes = _write_header(self._file, self.dtype, self.schema)
+        self._file_opened = time.monotonic()
+        self.files.append(path)
+        logger.info(f"Telemetry file opened: {path}")
+
+    def stats(self):
+        return {
+            "rows_logged": self.rows_logged,
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "blocks_written": self.blocks_written,
+            "mean_block_write_ms": self._write_time / self.blocks_written * 1e3 if self.blocks_written else 0.0,
+            "files": list(self.files),
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,21 +1,143 @@
 import logging
+import numpy as np
 from utils.logger import setup_logger
+from utils.lidar_scan import LidarScan
+from utils import metrics, tracing
+
+QUERIES = ('front', 'min', 'sectors', 'points')
+QUERY_TIME = {
+    query: metrics.histogram('obstacle_query_seconds', 'Scan processing per obstacle query (cache misses)',
+                             {'query': query})
+    for query in QUERIES
+}
 
 class ObstacleDetector:
-    def __init__(self, lidar):
+    def __init__(self, lidar, min_quality=0):
         setup_logger()
         self.logger = logging.getLogger('obstacle')
         self.lidar = lidar
+        self.min_quality = min_quality
+        # (points, LidarScan) for the last raw point list converted, so
+        # repeated queries on the same rplidar list share one conversion (and
+        # its cached results); one tuple, assigned and read atomically, so a
+        # thread never pairs its points with another thread's scan
+        self._last = (None, None)
+
+    def as_scan(self, scan):
+        """Return scan as a LidarScan, converting rplidar point lists once"""
+        if scan is None or isinstance(scan, LidarScan):
+            return scan
+        points, converted = self._last
+        if points is not scan:
+            converted = LidarScan.from_points(scan)
+            self._last = (scan, converted)
+        return converted
+
+    def _valid_mask(self, scan, min_quality):
+        """Boolean mask of returns with a usable range and quality"""
+        def compute():
+            return (scan.ranges > 0) & (scan.qualities >= min_quality)
+        return scan.memoize(('valid', min_quality), compute)
 
-    def get_front_obstacles(self, scan, cone_angle=45):
-        """Return obstacles in front cone"""
+    @staticmethod
+    def _memoize(scan, key, compute):
+        """scan.memoize, timing the computation into QUERY_TIME[key[0]]"""
+        def timed():
+            with QUERY_TIME[key[0]].time():
+                return compute()
+        return scan.memoize(key, timed)
+
+    def get_front_obstacles(self, scan, cone_angle=45, min_quality=None):
+        """Return obstacles in front cone as an (N, 2) array of (angle_deg, distance_mm)"""
+        scan = self.as_scan(scan)
         if not scan:
             return None
-        return [p for p in scan if -cone_angle <= p[1] <= cone_angle]
+        min_quality = self.min_quality if min_quality is None else min_quality
+
+        def compute():
+            mask = self._valid_mask(scan, min_quality) & (np.abs(scan.angles) <= cone_angle)
+            front = np.stack((scan.angles[mask], scan.ranges[mask]), axis=1)
+            front.flags.writeable = False
+            return front
+        return self._memoize(scan, ('front', cone_angle, min_quality), compute)
 
-    def get_min_distance(self, scan):
+    def get_min_distance(self, scan, cone_angle=45, min_quality=None):
         """Get minimum distance in meters"""
-        front_scan = self.get_front_obstacles(scan)
-        if front_scan:
-            return min(p[2] for p in front_scan) / 1000.0  # mm to m
-        return float('inf')
\ No newline at end of file
+        with tracing.span('get_min_distance'):
+            scan = self.as_scan(scan)
+            if not scan:
+                return float('inf')
+            min_quality = self.min_quality if min_quality is None else min_quality
+
+            def compute():
+                mask = self._valid_mask(scan, min_quality) & (np.abs(scan.angles) <= cone_angle)
+                if not mask.any():
+                    return float('inf')
+                return float(scan.ranges[mask].min()) / 1000.0  # mm to m
+            return self._memoize(scan, ('min', cone_angle, min_quality), compute)
+
+    def get_obstacle_map(self, scan, sectors=8, min_quality=None):
+        """
+        Minimum distance per angular sector
+
+        Sector i is centred on -180 + i * 360 / sectors degrees, so sector
+        sectors // 2 looks straight ahead.
+
+        Args:
+            scan: LidarScan or rplidar point list
+            sectors: Number of equal sectors around the robot
+            min_quality: Ignore returns below this quality
+
+        Returns:
+            numpy array of per-sector minimum distances in meters (inf if empty)
+        """
+        scan = self.as_scan(scan)
+        if not scan:
+            return np.full(sectors, np.inf, dtype=np.float32)
+        min_quality = self.min_quality if min_quality is None else min_quality
+
+        def compute():
+            width = 360.0 / sectors
+            mask = self._valid_mask(scan, min_quality)
+            index = np.floor((scan.angles[mask] + 180.0 + width / 2) / width).astype(np.intp)
+            index %= sectors
+            in_sector = index == np.arange(sectors)[:, None]
+            result = np.where(in_sector, scan.ranges[mask], np.inf).min(axis=1, initial=np.inf)
+            result = (result / 1000.0).astype(np.float32)  # mm to m
+            result.flags.writeable = False
+            return result
+        return self._memoize(scan, ('sectors', sectors, min_quality), compute)
+
+    def get_points(self, scan, max_range=None, min_quality=None):
+        """
+        Valid returns as Cartesian points in the robot frame
+
+        x points forward and y to the left (RPLIDAR angles increase
+        clockwise).
+
+        Args:
+            scan: LidarScan or rplidar point list
+            max_range: Drop returns farther than this, in meters
+            min_quality: Ignore returns below this quality
+
+        Returns:
+            Read-only (N, 2) float32 array of (x, y) in meters
+        """
+        scan = self.as_scan(scan)
+        if not scan:
+            return np.empty((0, 2), dtype=np.float32)
+        min_quality = self.min_quality if min_quality is None else min_quality
+
+        def compute():
+            mask = self._valid_mask(scan, min_quality)
+            ranges = scan.ranges[mask] / 1000.0
+            angles = np.radians(scan.angles[mask])
+            if max_range is not None:
+                near = ranges <= max_range
+                ranges, angles = ranges[near], angles[near]
+            points = np.empty((ranges.size, 2), dtype=np.float32)
+            np.multiply(ranges, np.cos(angles), out=points[:, 0])
+            np.multiply(ranges, -np.sin(angles), out=points[:, 1])
+            points.flags.writeable = False
+            return points
+        return self._memoize(scan, ('points', max_range, min_quality), compute)
@@ -0,0 +1,257 @@
+"""
+Rolling-window occupancy grid.
+
+The grid covers a fixed square window of the odometry frame centred on the
+robot. Cells are stored in a toroidal ring: world cell (i, j) lives at
+slot (i mod N, j mod N), so when the robot moves the window scrolls by
+clearing only the rows and columns that enter it, with no copying or
+reallocation. Memory is fixed at N x N log-odds values.
+
+Each scan is integrated with log-odds updates. Beams are sampled at cell
+spacing for all rays at once to find free cells, and duplicate cells are
+collapsed so a cell is updated at most once per scan. Queries give the
+distance to the nearest occupied cell (a bounded Euclidean distance
+transform, cached until the next update) and an inflated cost derived from
+it, both looked up vectorized by world coordinates.
+"""
+import math
+import threading
+import numpy as np
+
+
+class OccupancyGrid:
+    def __init__(self, size=8.0, resolution=0.05, max_range=6.0, hit_log_odds=0.85,
+                 miss_log_odds=-0.4, min_log_odds=-2.0, max_log_odds=3.5,
+                 occupied_log_odds=0.6, inflation_radius=0.25, max_distance=1.0):
+        """
+        Args:
+            size: Window side length in meters
+            resolution: Cell size in meters
+            max_range: Beams are only traced (and returns only marked) this far (m)
+            hit_log_odds, miss_log_odds: Update for an endpoint / traversed cell
+            min_log_odds, max_log_odds: Clamp, so cells stay responsive to change
+            occupied_log_odds: Cells above this count as occupied
+            inflation_radius: Distance (m) within which the cost is maximal
+            max_distance: Distances are exact up to this bound (m)
+        """
+        self.resolution = resolution
+        self.cells = int(math.ceil(size / resolution))
+        self.max_range = max_range
+        self.hit = np.float32(hit_log_odds)
+        self.miss = np.float32(miss_log_odds)
+        self.min_log_odds = min_log_odds
+        self.max_log_odds = max_log_odds
+        self.occupied_log_odds = occupied_log_odds
+        self.inflation_radius = inflation_radius
+        self.max_distance = max_distance
+
+        n = self.cells
+        self.log_odds = np.zeros((n, n), dtype=np.float32)
+        self.origin = np.array([-(n // 2), -(n // 2)])   # world cell of the window corner
+        self._samples = (np.arange(int(math.ceil(max_range / resolution))) + 0.5) * resolution
+        self._lock = threading.Lock()
+        self._distance = None   # cached (origin, distance map in meters) for this update
+        self.updates = 0
+
+    # -- window ----------------------------------------------------------
+
+    def recenter(self, x, y):
+        """Scroll the window so world point (x, y) is at its centre"""
+        n = self.cells
+        new = np.floor(np.array([x, y]) / self.resolution).astype(np.int64) - n // 2
+        shift = new - self.origin
+        if not shift.any():
+            return
+        for axis in (0, 1):
+            s = int(shift[axis])
+            if s == 0:
+                continue
+            if abs(s) >= n:
+                self.log_odds[...] = 0
+                break
+            # World rows/columns entering the window reuse the slots of those leaving
+            start = self.origin[axis] + n if s > 0 else new[axis]
+            slots = np.arange(start, start + abs(s)) % n
+            if axis == 0:
+                self.log_odds[slots, :] = 0
+            else:
+                self.log_odds[:, slots] = 0
+        self.origin = new
+        self._distance = None
+
+    def _slots(self, ix, iy):
+        """Flat ring indices of world cells, and which of them are inside the window"""
+        n = self.cells
+        inside = ((ix >= self.origin[0]) & (ix < self.origin[0] + n)
+                  & (iy >= self.origin[1]) & (iy < self.origin[1] + n))
+        return (ix % n) * n + (iy % n), inside
+
+    # -- updates -----------------------------------------------------------
+
+    def update(self, points, pose):
+        """
+        Integrate one scan
+
+        Args:
+            points: (M, 2) beam endpoints in the robot frame (m), e.g.
+                ObstacleDetector.get_points(scan)
+            pose: Robot (x, y, theta) in the odometry frame
+        """
+        x, y, theta = pose
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        ranges = np.hypot(points[:, 0], points[:, 1])
+        keep = ranges > 0
+        points, ranges = points[keep], ranges[keep]
+        cos, sin = math.cos(theta), math.sin(theta)
+        dx = (points[:, 0] * cos - points[:, 1] * sin) / np.maximum(ranges, 1e-9)
+        dy = (points[:, 0] * sin + points[:, 1] * cos) / np.maximum(ranges, 1e-9)
+        res = self.resolution
+
+        with self._lock:
+            self.recenter(x, y)
+
+            # Free space: samples along every beam short of its endpoint cell
+            traced = np.minimum(ranges, self.max_range)
+            t = self._samples[:int(math.ceil(traced.max(initial=0.0) / res))]
+            along = t[None, :] < (traced - res)[:, None]
+            fx = np.floor((x + dx[:, None] * t) / res).astype(np.int64)[along]
+            fy = np.floor((y + dy[:, None] * t) / res).astype(np.int64)[along]
+            free, inside = self._slots(fx, fy)
+            free = np.unique(free[inside])
+
+            # Endpoints within range are hits
+            hits = ranges <= self.max_range
+            hx = np.floor((x + dx[hits] * ranges[hits]) / res).astype(np.int64)
+            hy = np.floor((y + dy[hits] * ranges[hits]) / res).astype(np.int64)
+            occupied, inside = self._slots(hx, hy)
+            occupied = np.unique(occupied[inside])
+            free = free[~np.isin(free, occupied, assume_unique=True)]
+
+            flat = self.log_odds.reshape(-1)
+            flat[free] += self.miss
+            flat[occupied] += self.hit
+            np.clip(flat, self.min_log_odds, self.max_log_odds, out=flat)
+            self._distance = None
+            self.updates += 1
+
+    def clear(self):
+        with self._lock:
+            self.log_odds[...] = 0
+            self._distance = None
+            self.updates += 1
+
+    # -- queries -----------------------------------------------------------
+
+    def window(self):
+        """Log-odds in window order (row 0 = smallest x), as a new array"""
+        n = self.cells
+        return np.roll(self.log_odds, (-(self.origin[0] % n), -(self.origin[1] % n)), axis=(0, 1))
+
+    def probability(self):
+        """Occupancy probability in window order"""
+        return 1.0 / (1.0 + np.exp(-self.window()))
+
+    def occupied(self):
+        """Boolean occupied mask in window order"""
+        return self.window() > self.occupied_log_odds
+
+    def occupied_points(self, pose=None, max_range=None):
+        """
+        Centres of occupied cells, e.g. to add remembered obstacles to a
+        planner's point cloud
+
+        Args:
+            pose: If given, return points in this robot frame instead of the odometry frame
+            max_range: Only cells within this distance of the pose (m)
+
+        Returns:
+            (K, 2) float32 array
+        """
+        with self._lock:
+            ix, iy = np.nonzero(self.occupied())
+            origin = self.origin.copy()
+        points = (np.stack([ix, iy], axis=1) + origin + 0.5) * self.resolution
+        if pose is None:
+            return points.astype(np.float32)
+        x, y, theta = pose
+        rel = points - (x, y)
+        if max_range is not None:
+            rel = rel[np.einsum('ij,ij->i', rel, rel) <= max_range * max_range]
+        cos, sin = math.cos(theta), math.sin(theta)
+        local = np.empty(rel.shape, dtype=np.float32)
+        local[:, 0] = rel[:, 0] * cos + rel[:, 1] * sin
+        local[:, 1] = -rel[:, 0] * sin + rel[:, 1] * cos
+        return local
+
+    def distance_map(self):
+        """
+        Distance (m) from each cell to the nearest occupied cell, window order
+
+        Exact up to max_distance and clipped there. Computed once per
+        update: a 1-D nearest-occupied pass along y, then the minimum of
+        dx² + dy² over a bounded band of x offsets.
+        """
+        return self._distance_state()[1]
+
+    def _distance_state(self):
+        with self._lock:
+            if self._distance is not None:
+                return self._distance
+            occupied = self.occupied()
+            origin = self.origin.copy()
+            updates = self.updates
+        n = self.cells
+        bound = int(math.ceil(self.max_distance / self.resolution))
+        big = bound + 1
+
+        # Pass 1: cells to the nearest occupied cell in the same x row
+        index = np.arange(n)
+        last = np.where(occupied, index, -n - big)
+        np.maximum.accumulate(last, axis=1, out=last)
+        following = np.where(occupied, index, 2 * n + big)
+        following = np.minimum.accumulate(following[:, ::-1], axis=1)[:, ::-1]
+        g = np.minimum(np.minimum(index - last, following - index), big).astype(np.float32)
+        g *= g
+
+        # Pass 2: combine rows within the bound
+        padded = np.full((n + 2 * bound, n), np.float32(big * big))
+        padded[bound:bound + n] = g
+        d2 = np.full((n, n), np.float32(big * big))
+        for offset in range(-bound, bound + 1):
+            np.minimum(d2, padded[bound + offset:bound + offset + n] + np.float32(offset * offset), out=d2)
+        distance = np.minimum(np.sqrt(d2) * self.resolution, self.max_distance)
+        distance.flags.writeable = False
+        state = (origin, distance)
+        with self._lock:
+            if self.updates == updates and (self.origin == origin).all():
+                self._distance = state
+        return state
+
+    def inflated_cost(self):
+        """
+        Cost in [0, 1] per cell, window order: 1 within inflation_radius of
+        an occupied cell, decaying linearly to 0 at max_distance
+        """
+        return self._cost(self.distance_map())
+
+    def _cost(self, distance):
+        span = max(self.max_distance - self.inflation_radius, 1e-9)
+        return np.clip((self.max_distance - distance) / span, 0.0, 1.0)
+
+    def _lookup(self, origin, values, xs, ys, outside):
+        ix = np.floor(np.asarray(xs) / self.resolution).astype(np.int64) - origin[0]
+        iy = np.floor(np.asarray(ys) / self.resolution).astype(np.int64) - origin[1]
+        inside = (ix >= 0) & (ix < self.cells) & (iy >= 0) & (iy < self.cells)
+        result = np.full(np.shape(ix), outside, dtype=np.float32)
+        result[inside] = values[ix[inside], iy[inside]]
+        return result
+
+    def distance_at(self, xs, ys):
+        """Distance (m) to the nearest occupied cell at odometry-frame points"""
+        origin, distance = self._distance_state()
+        return self._lookup(origin, distance, xs, ys, self.max_distance)
+
+    def cost_at(self, xs, ys):
+        """Inflated cost at odometry-frame points (0 outside the window)"""
+        origin, distance = self._distance_state()
+        return self._lookup(origin, self._cost(distance), xs, ys, 0.0)
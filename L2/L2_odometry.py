@@ -0,0 +1,286 @@
+"""
+Wheel-encoder odometry.
+
+OdometryService samples both wheel encoders at a fixed rate, unwraps the
+16-bit counts, estimates wheel velocities by a least-squares fit over a
+short window of samples (robust to count quantisation, unlike differencing
+two samples) and integrates the pose through Kinematics. Each update
+replaces one immutable OdometrySnapshot, so reading the latest pose and
+twist is a single attribute access.
+
+integrate_counts() does the same computation for a whole recorded array of
+counts in one vectorized call.
+"""
+import logging
+import math
+import threading
+import time
+from typing import NamedTuple
+import numpy as np
+from L1.L1_encoder import Encoder
+from L2.L2_blackboard import BLACKBOARD
+from L2.L2_kinematics import Kinematics
+from utils.constants import ENCODER_ADDRESSES, ENCODER_RESOLUTION, WHEEL_RADIUS
+from utils.scheduler import Rate
+
+logger = logging.getLogger(__name__)
+
+
+class OdometrySnapshot(NamedTuple):
+    """Pose and twist at one instant"""
+    timestamp: float
+    seq: int
+    x: float            # m
+    y: float            # m
+    theta: float        # rad, wrapped to [-pi, pi)
+    v: float            # m/s
+    omega: float        # rad/s
+    left_speed: float   # wheel surface speed, m/s
+    right_speed: float  # m/s
+
+
+def unwrap_counts(counts, resolution=ENCODER_RESOLUTION, axis=0):
+    """
+    Unwrap modular encoder counts into a continuous count
+
+    Consecutive samples must be less than half a revolution apart.
+
+    Args:
+        counts: Raw counts, sampled in order along axis
+        resolution: Counts per revolution (the wrap modulus)
+
+    Returns:
+        int64 array of unwrapped counts starting at the first raw count
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    steps = np.diff(counts, axis=axis)
+    half = resolution // 2
+    steps = (steps + half) % resolution - half
+    first = np.take(counts, [0], axis=axis)
+    return np.concatenate([first, first + np.cumsum(steps, axis=axis)], axis=axis)
+
+
+def regression_slope(t, y):
+    """Least-squares slope of y over t along the last axis"""
+    t = t - t.mean(axis=-1, keepdims=True)
+    y = y - y.mean(axis=-1, keepdims=True)
+    num = (t * y).sum(axis=-1)
+    denom = np.broadcast_to((t * t).sum(axis=-1), num.shape)
+    return np.divide(num, denom, out=np.zeros(num.shape), where=denom > 0)
+
+
+def wrap_angle(theta):
+    """Wrap radians to [-pi, pi)"""
+    return (theta + np.pi) % (2 * np.pi) - np.pi
+
+
+def integrate_counts(timestamps, counts, pose=(0.0, 0.0, 0.0), window=5,
+                     kinematics=None, resolution=ENCODER_RESOLUTION,
+                     wheel_radius=WHEEL_RADIUS, directions=(1, 1)):
+    """
+    Turn a recording of raw encoder counts into a trajectory
+
+    Args:
+        timestamps: (T,) sample times in seconds
+        counts: (T, 2) raw left/right counts
+        pose: Initial (x, y, theta)
+        window: Samples per velocity fit (as OdometryService)
+        kinematics: Kinematics instance (default wheelbase if omitted)
+        directions: Sign of each encoder for forward wheel motion
+
+    Returns:
+        Dict of (T,) arrays: timestamp, x, y, theta, v, omega,
+        left_speed, right_speed
+    """
+    kinematics = kinematics or Kinematics()
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    meters = unwrap_counts(counts, resolution, axis=0) * (
+        np.asarray(directions) * 2 * np.pi * wheel_radius / resolution)
+
+    # Pose: midpoint-heading integration of each step's travel
+    steps = np.diff(meters, axis=0)
+    ds, dtheta = kinematics.chassis_speeds(steps).T
+    theta = pose[2] + np.concatenate([[0.0], np.cumsum(dtheta)])
+    heading = theta[:-1] + dtheta / 2
+    x = pose[0] + np.concatenate([[0.0], np.cumsum(ds * np.cos(heading))])
+    y = pose[1] + np.concatenate([[0.0], np.cumsum(ds * np.sin(heading))])
+
+    # Wheel speeds: trailing-window regression, as computed online
+    speeds = np.zeros_like(meters)
+    count = len(timestamps)
+    if count >= 2:
+        w = min(window, count)
+        t_windows = np.lib.stride_tricks.sliding_window_view(timestamps, w)
+        for wheel in range(2):
+            m_windows = np.lib.stride_tricks.sliding_window_view(meters[:, wheel], w)
+            speeds[w - 1:, wheel] = regression_slope(t_windows, m_windows)
+            for i in range(1, w - 1):
+                speeds[i, wheel] = regression_slope(timestamps[:i + 1], meters[:i + 1, wheel])
+    v, omega = kinematics.chassis_speeds(speeds).T
+
+    return {
+        "timestamp": timestamps,
+        "x": x,
+        "y": y,
+        "theta": wrap_angle(theta),
+        "v": v,
+        "omega": omega,
+        "left_speed": speeds[:, 0],
+        "right_speed": speeds[:, 1],
+    }
+
+
+class OdometryService:
+    """Background encoder sampling and pose integration"""
+
+    def __init__(self, rate_hz=100, window=5, encoders=None, kinematics=None,
+                 sensor_hub=None, topic='odometry', directions=(1, 1), backend=None,
+                 blackboard=BLACKBOARD):
+        """
+        Args:
+            rate_hz: Encoder sampling rate; must exceed two samples per
+                wheel revolution at top speed for unwrapping to hold
+            window: Samples per velocity fit (longer is smoother but lags more)
+            encoders: (left, right) Encoder objects (opened from
+                ENCODER_ADDRESSES if omitted)
+            kinematics: Kinematics instance
+            sensor_hub: Optional SensorHub to publish snapshots to
+            topic: Hub topic for the snapshots
+            directions: Sign of each encoder for forward wheel motion
+            backend: 'hardware' or 'fake', see L1_backend
+            blackboard: Blackboard to publish pose and velocity to (None for none)
+        """
+        self.rate_hz = rate_hz
+        self.window = max(2, window)
+        self.encoders = encoders or [Encoder(address, backend) for address in ENCODER_ADDRESSES]
+        self.kinematics = kinematics or Kinematics()
+        self.sensor_hub = sensor_hub
+        self.topic = topic
+        self.blackboard = blackboard
+        self._scale = np.asarray(directions) * 2 * math.pi * WHEEL_RADIUS / ENCODER_RESOLUTION
+        self._half = ENCODER_RESOLUTION // 2
+
+        self._times = np.zeros(self.window)
+        self._meters = np.zeros((2, self.window))
+        self._filled = 0
+        self._raw = None
+        self._position = np.zeros(2, dtype=np.int64)   # unwrapped counts
+        self._pose = (0.0, 0.0, 0.0)
+        self._seq = 0
+        self._snapshot = OdometrySnapshot(time.monotonic(), 0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+        self._update_lock = threading.Lock()
+
+        self.read_errors = 0
+        self._thread = None
+        self._running = False
+
+    def snapshot(self):
+        """Latest OdometrySnapshot (never blocks)"""
+        return self._snapshot
+
+    @property
+    def pose(self):
+        s = self._snapshot
+        return s.x, s.y, s.theta
+
+    def reset(self, pose=(0.0, 0.0, 0.0)):
+        """Restart integration from pose"""
+        with self._update_lock:
+            self._pose = tuple(pose)
+            self._filled = 0
+            self._raw = None
+            s = self._snapshot
+            self._snapshot = s._replace(x=pose[0], y=pose[1], theta=pose[2],
+                                        v=0.0, omega=0.0, left_speed=0.0, right_speed=0.0)
+            if self.blackboard is not None:
+                self.blackboard.publish(pose=tuple(pose), velocity=(0.0, 0.0))
+
+    def sample(self):
+        """Read both encoders once and update the estimate"""
+        started = time.monotonic()
+        counts = (self.encoders[0].read_position(), self.encoders[1].read_position())
+        return self.update((started + time.monotonic()) / 2, counts)
+
+    def update(self, timestamp, counts):
+        """
+        Feed one pair of raw counts
+
+        Args:
+            timestamp: Sample time (time.monotonic)
+            counts: (left, right) raw 16-bit counts
+
+        Returns:
+            The new OdometrySnapshot
+        """
+        with self._update_lock:
+            raw = np.asarray(counts, dtype=np.int64)
+            if self._raw is None:
+                self._raw = raw
+                self._position = np.zeros(2, dtype=np.int64)
+                steps = np.zeros(2, dtype=np.int64)
+            else:
+                steps = (raw - self._raw + self._half) % ENCODER_RESOLUTION - self._half
+                self._raw = raw
+                self._position += steps
+            meters = self._position * self._scale
+
+            # Pose update from this step's travel
+            dl, dr = (steps * self._scale).tolist()
+            ds, dtheta = self.kinematics.compute_chassis_speeds(dl, dr)
+            x, y, theta = self._pose
+            heading = theta + dtheta / 2
+            x += ds * math.cos(heading)
+            y += ds * math.sin(heading)
+            theta = (theta + dtheta + math.pi) % (2 * math.pi) - math.pi
+            self._pose = (x, y, theta)
+
+            # Velocity: regression over the last window samples, kept in a
+            # ring (the fit does not depend on sample order)
+            slot = self._filled % self.window
+            self._times[slot] = timestamp
+            self._meters[:, slot] = meters
+            self._filled += 1
+            n = min(self._filled, self.window)
+            left, right = regression_slope(self._times[:n], self._meters[:, :n]) if n > 1 else (0.0, 0.0)
+            v, omega = self.kinematics.compute_chassis_speeds(float(left), float(right))
+
+            self._seq += 1
+            snapshot = OdometrySnapshot(timestamp, self._seq, x, y, theta, v, omega,
+                                        float(left), float(right))
+            self._snapshot = snapshot
+        if self.blackboard is not None:
+            self.blackboard.publish(pose=(x, y, theta), velocity=(v, omega))
+        if self.sensor_hub is not None:
+            self.sensor_hub.publish(self.topic, snapshot, timestamp, snapshot.seq)
+        return snapshot
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="Odometry", daemon=True)
+        self._thread.start()
+        logger.info(f"Odometry running at {self.rate_hz} Hz")
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self):
+        rate = Rate(self.rate_hz, name="Odometry")
+        while self._running:
+            try:
+                self.sample()
+            except Exception as e:
+                self.read_errors += 1
+                logger.error(f"Encoder read failed: {e}")
+            rate.sleep()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
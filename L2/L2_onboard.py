@@ -1,6 +1,12 @@
+from L2.L2_blackboard import BLACKBOARD
+
+
 class OnboardSystem:
-    def __init__(self):
+    def __init__(self, blackboard=BLACKBOARD):
         self.battery_voltage = 0.0
+        self.blackboard = blackboard
 
     def update_battery_status(self, voltage):
-        self.battery_voltage = voltage
\ No newline at end of file
+        self.battery_voltage = voltage
+        if self.blackboard is not None:
+            self.blackboard.publish(battery=voltage)
@@ -0,0 +1,254 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, NamedTuple
+import numpy as np
+from utils.logger import setup_logger
+from utils.scheduler import Rate
+
+
+class Sample(NamedTuple):
+    """One published sensor reading"""
+    topic: str
+    seq: int
+    timestamp: float
+    value: Any
+
+
+class Subscription:
+    """
+    Delivery endpoint for one subscriber of a topic
+
+    mode='latest' keeps only the newest sample (a slow reader just skips
+    ahead); mode='queue' keeps up to maxsize samples in order and counts
+    the ones it had to drop.
+    """
+
+    def __init__(self, hub, topic, mode='latest', maxsize=16):
+        if mode not in ('latest', 'queue'):
+            raise ValueError(f"Unknown delivery mode: {mode}")
+        self.hub = hub
+        self.topic = topic
+        self.mode = mode
+        self.dropped = 0
+        self._queue = deque(maxlen=maxsize if mode == 'queue' else 1)
+        self._cond = threading.Condition()
+        self._last_seq = 0
+        self._closed = False
+
+    def _deliver(self, sample):
+        with self._cond:
+            if len(self._queue) == self._queue.maxlen and self.mode == 'queue':
+                self.dropped += 1
+            self._queue.append(sample)
+            self._cond.notify_all()
+
+    def latest(self):
+        """Newest delivered sample without blocking (None if nothing yet)"""
+        with self._cond:
+            return self._queue[-1] if self._queue else None
+
+    def get(self, timeout=None):
+        """
+        Wait for the next sample
+
+        In latest mode this returns the newest sample not yet returned by
+        get(); in queue mode it pops the oldest queued sample.
+
+        Returns:
+            Sample, or None on timeout or after close()
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._has_new():
+                if self._closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            if self.mode == 'queue':
+                sample = self._queue.popleft()
+            else:
+                sample = self._queue[-1]
+            self._last_seq = sample.seq
+            return sample
+
+    def _has_new(self):
+        if self.mode == 'queue':
+            return bool(self._queue)
+        return bool(self._queue) and self._queue[-1].seq > self._last_seq
+
+    def close(self):
+        """Unsubscribe and wake any waiting reader"""
+        self.hub.unsubscribe(self)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class SensorHub:
+    """
+    Owns each L1 device once and fans its samples out to subscribers
+
+    Published values are marked read-only and handed to every subscriber
+    as the same object, so consumers share buffers without copying. Topics
+    whose source recycles its buffers (the camera grabber) are the
+    exception: queue subscribers, which may hold a sample for many
+    grabs, get one shared copy instead.
+    """
+
+    def __init__(self):
+        setup_logger()
+        self.logger = logging.getLogger('sensor_hub')
+        self._lock = threading.Lock()
+        self._subscribers = {}   # topic -> tuple of Subscription (copy-on-write)
+        self._seq = {}
+        self._recycled = set()   # topics whose values are views of reused buffers
+        self._sources = []       # (topic, thread target)
+        self._i2c_buses = []
+        self._threads = []
+        self._running = False
+
+    def subscribe(self, topic, mode='latest', maxsize=16):
+        """Subscribe to a topic; see Subscription for delivery modes"""
+        sub = Subscription(self, topic, mode, maxsize)
+        with self._lock:
+            self._subscribers[topic] = self._subscribers.get(topic, ()) + (sub,)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.topic, ())
+            self._subscribers[sub.topic] = tuple(s for s in subs if s is not sub)
+
+    def publish(self, topic, value, timestamp=None, seq=None):
+        """Publish a sample to every subscriber of topic"""
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+        with self._lock:
+            if seq is None:
+                seq = self._seq.get(topic, 0) + 1
+            self._seq[topic] = seq
+            subs = self._subscribers.get(topic, ())
+        sample = Sample(topic, seq, time.monotonic() if timestamp is None else timestamp, value)
+        kept = None
+        for sub in subs:
+            if sub.mode == 'queue' and topic in self._recycled:
+                if kept is None:
+                    copy = value.copy()
+                    copy.flags.writeable = False
+                    kept = sample._replace(value=copy)
+                sub._deliver(kept)
+            else:
+                sub._deliver(sample)
+        return sample
+
+    def add_lidar(self, lidar, topic='lidar'):
+        """Publish every scan from a (streaming) Lidar"""
+        self._add_source(topic, lambda: self._lidar_loop(lidar, topic))
+
+    def add_camera(self, camera, topic='camera'):
+        """Publish every frame grabbed by a Camera (starting its grabber)"""
+        self._recycled.add(topic)
+        self._add_source(topic, lambda: self._camera_loop(camera, topic))
+
+    def add_i2c(self, bus):
+        """
+        Publish every sample polled by an I2CBus under the device's name
+
+        The bus keeps its own polling thread; the hub starts and stops it.
+        """
+        bus.add_listener(lambda sample: self.publish(sample.name, sample.value, sample.timestamp))
+        self._i2c_buses.append(bus)
+        if self._running:
+            bus.start()
+
+    def add_source(self, topic, read_fn, rate_hz):
+        """
+        Poll read_fn at rate_hz and publish its results
+
+        Args:
+            topic: Topic name, e.g. 'camera', 'imu', 'battery'
+            read_fn: Callable returning the sample value (None to skip)
+            rate_hz: Polling rate
+        """
+        self._add_source(topic, lambda: self._poll_loop(topic, read_fn, rate_hz))
+
+    def _add_source(self, topic, target):
+        self._sources.append((topic, target))
+        if self._running:
+            self._start_source(topic, target)
+
+    def _start_source(self, topic, target):
+        thread = threading.Thread(target=target, name=f"Hub-{topic}", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _lidar_loop(self, lidar, topic):
+        if not lidar.streaming:
+            lidar.start_stream()
+        last_seq = 0
+        while self._running:
+            scan = lidar.wait_for_scan(newer_than=last_seq, timeout=0.5)
+            if scan is None:
+                continue
+            last_seq = scan.seq
+            self.publish(topic, scan, scan.timestamp, scan.seq)
+
+    def _camera_loop(self, camera, topic):
+        if not camera.grabbing:
+            camera.start_grabber()
+        last_seq = 0
+        while self._running:
+            frame = camera.wait_for_frame(newer_than=last_seq, timeout=0.5)
+            if frame is None:
+                continue
+            last_seq = frame.seq
+            self.publish(topic, frame.image, frame.timestamp, frame.seq)
+
+    def _poll_loop(self, topic, read_fn, rate_hz):
+        rate = Rate(rate_hz, name=f"Hub-{topic}")
+        while self._running:
+            try:
+                value = read_fn()
+                if value is not None:
+                    self.publish(topic, value)
+            except Exception as e:
+                self.logger.error(f"{topic} read failed: {e}")
+            rate.sleep()
+
+    def start(self):
+        """Start acquisition threads for all registered sources"""
+        if self._running:
+            return
+        self._running = True
+        for topic, target in self._sources:
+            self._start_source(topic, target)
+        for bus in self._i2c_buses:
+            bus.start()
+        self.logger.info(f"Sensor hub started: {[t for t, _ in self._sources]}")
+
+    def stop(self, timeout=1.0):
+        """Stop acquisition and wake all subscribers"""
+        self._running = False
+        for bus in self._i2c_buses:
+            bus.stop(timeout)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        with self._lock:
+            subs = [s for group in self._subscribers.values() for s in group]
+        for sub in subs:
+            with sub._cond:
+                sub._closed = True
+                sub._cond.notify_all()
+        self.logger.info("Sensor hub stopped")
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
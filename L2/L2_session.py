@@ -0,0 +1,480 @@
+"""
+Session recording and replay.
+
+SessionRecorder writes timestamped lidar scans and camera frames to one
+seekable file; SessionReplay plays it back through the normal Lidar and
+Camera drivers (as their device/capture objects) at real time, N times real
+time or as fast as the consumer reads, so ObstacleDetector,
+ObstacleAvoidance and TargetTracker run unchanged on recorded data.
+
+File layout:
+    MAGIC, uint32 header length, JSON header
+    chunks: CHUNK header (kind, seq, timestamp, payload length) + payload
+    index:  INDEX_DTYPE records (kind, seq, timestamp, file offset)
+    footer: FOOTER (index offset, record count, INDEX_MAGIC)
+
+Scan payloads are zlib-compressed delta-coded integer columns (angles in
+1/64 degree, ranges in 1/4 mm, as the RPLIDAR reports them); frames are
+JPEG (needs OpenCV) or zlib-compressed raw pixels. A file whose recorder
+did not close cleanly has no footer; the reader then rebuilds the index by
+walking the chunks.
+"""
+import json
+import logging
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+from utils.lidar_scan import LidarScan, ANGLE, RANGE, QUALITY
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SCUTSES1'
+INDEX_MAGIC = b'SCUTIDX1'
+CHUNK = struct.Struct('<BIdI')      # kind, seq, timestamp, payload length
+FRAME = struct.Struct('<BHHB')      # codec, height, width, channels
+FOOTER = struct.Struct('<QI8s')     # index offset, record count, INDEX_MAGIC
+INDEX_DTYPE = np.dtype([('kind', 'u1'), ('seq', '<u4'), ('timestamp', '<f8'), ('offset', '<u8')])
+
+SCAN, FRAME_CHUNK = 1, 2
+CODEC_RAW, CODEC_JPEG = 0, 1
+ANGLE_UNIT = 64.0   # counts per degree
+RANGE_UNIT = 4.0    # counts per mm
+
+
+def encode_scan(scan):
+    """Pack a LidarScan into a compressed, delta-coded payload"""
+    angles = np.round(scan.angles * ANGLE_UNIT).astype(np.int32)
+    ranges = np.round(scan.ranges * RANGE_UNIT).astype(np.int32)
+    columns = [
+        np.array([len(scan)], dtype='<u4').tobytes(),
+        np.diff(angles, prepend=0).astype('<i4').tobytes(),
+        np.diff(ranges, prepend=0).astype('<i4').tobytes(),
+        np.clip(scan.qualities, 0, 255).astype(np.uint8).tobytes(),
+    ]
+    return zlib.compress(b''.join(columns), 6)
+
+
+def decode_scan(payload, timestamp, seq):
+    raw = zlib.decompress(payload)
+    count = int(np.frombuffer(raw, '<u4', 1)[0])
+    deltas = np.frombuffer(raw, '<i4', 2 * count, offset=4).reshape(2, count)
+    data = np.empty((3, count), dtype=np.float32)
+    data[ANGLE] = np.cumsum(deltas[0]) / ANGLE_UNIT
+    data[RANGE] = np.cumsum(deltas[1]) / RANGE_UNIT
+    data[QUALITY] = np.frombuffer(raw, np.uint8, count, offset=4 + 8 * count)
+    return LidarScan(data, timestamp, seq)
+
+
+def encode_frame(frame, codec, jpeg_quality=90):
+    """Pack a uint8 image as JPEG or compressed raw pixels"""
+    height, width = frame.shape[:2]
+    channels = 1 if frame.ndim == 2 else frame.shape[2]
+    if codec == CODEC_JPEG:
+        import cv2
+        ok, data = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        data = data.tobytes()
+    else:
+        data = zlib.compress(np.ascontiguousarray(frame, dtype=np.uint8).tobytes(), 1)
+    return FRAME.pack(codec, height, width, channels) + data
+
+
+def decode_frame(payload):
+    codec, height, width, channels = FRAME.unpack_from(payload)
+    data = payload[FRAME.size:]
+    if codec == CODEC_JPEG:
+        import cv2
+        flags = cv2.IMREAD_GRAYSCALE if channels == 1 else cv2.IMREAD_COLOR
+        return cv2.imdecode(np.frombuffer(data, np.uint8), flags)
+    shape = (height, width) if channels == 1 else (height, width, channels)
+    return np.frombuffer(zlib.decompress(data), np.uint8).reshape(shape)
+
+
+class SessionRecorder:
+    """
+    Append-only writer for a session file
+
+    write_scan()/write_frame() may be called from any thread. record(hub)
+    subscribes to a SensorHub and does the encoding on its own thread, so
+    the acquisition threads only pay for a queue append.
+    """
+
+    def __init__(self, path, frame_codec='jpeg', jpeg_quality=90):
+        """
+        Args:
+            path: Output file
+            frame_codec: 'jpeg' (falls back to 'raw' without OpenCV) or 'raw'
+            jpeg_quality: JPEG quality 0-100
+        """
+        if frame_codec not in ('jpeg', 'raw'):
+            raise ValueError(f"Unknown frame codec: {frame_codec}")
+        self.path = path
+        self.codec = CODEC_RAW
+        if frame_codec == 'jpeg':
+            try:
+                import cv2  # noqa: F401
+                self.codec = CODEC_JPEG
+            except ImportError:
+                logger.warning("OpenCV not available, recording raw frames")
+        self.jpeg_quality = jpeg_quality
+        self._file = open(path, 'wb')
+        header = json.dumps({"version": 1, "created": time.time()}).encode()
+        self._file.write(MAGIC + struct.pack('<I', len(header)) + header)
+        self._index = []
+        self._lock = threading.Lock()
+        self._frame_seq = 0
+        self._subscriptions = []
+        self._threads = []
+        self._running = False
+        self.bytes_written = self._file.tell()
+
+    def write_scan(self, scan):
+        """Record a LidarScan (or a list of rplidar points)"""
+        if not isinstance(scan, LidarScan):
+            scan = LidarScan.from_points(scan)
+        self._append(SCAN, scan.seq, scan.timestamp, encode_scan(scan))
+
+    def write_frame(self, frame, timestamp=None, seq=None):
+        """Record a camera frame"""
+        if frame is None:
+            return
+        with self._lock:
+            self._frame_seq = self._frame_seq + 1 if seq is None else seq
+            seq = self._frame_seq
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        self._append(FRAME_CHUNK, seq, timestamp, encode_frame(frame, self.codec, self.jpeg_quality))
+
+    def _append(self, kind, seq, timestamp, payload):
+        with self._lock:
+            if self._file is None:
+                raise ValueError("Recorder is closed")
+            offset = self._file.tell()
+            self._file.write(CHUNK.pack(kind, seq, timestamp, len(payload)))
+            self._file.write(payload)
+            self._index.append((kind, seq, timestamp, offset))
+            self.bytes_written = self._file.tell()
+
+    def record(self, hub, lidar_topic='lidar', camera_topic='camera', maxsize=64):
+        """Record a SensorHub's lidar and camera topics until close()"""
+        self._running = True
+        for topic, write in ((lidar_topic, self._record_scan), (camera_topic, self._record_frame)):
+            if topic is None:
+                continue
+            sub = hub.subscribe(topic, mode='queue', maxsize=maxsize)
+            thread = threading.Thread(target=self._record_loop, args=(sub, write),
+                                      name=f"Record-{topic}", daemon=True)
+            thread.start()
+            self._subscriptions.append(sub)
+            self._threads.append(thread)
+
+    def _record_scan(self, sample):
+        self.write_scan(sample.value)
+
+    def _record_frame(self, sample):
+        self.write_frame(sample.value, sample.timestamp, sample.seq)
+
+    def _record_loop(self, sub, write):
+        while self._running:
+            sample = sub.get(timeout=0.5)
+            if sample is None:
+                continue
+            try:
+                write(sample)
+            except Exception as e:
+                logger.error(f"Recording {sub.topic} failed: {e}")
+
+    def stats(self):
+        kinds = [kind for kind, _, _, _ in self._index]
+        return {
+            "scans": kinds.count(SCAN),
+            "frames": kinds.count(FRAME_CHUNK),
+            "bytes": self.bytes_written,
+            "dropped": sum(sub.dropped for sub in self._subscriptions),
+        }
+
+    def close(self):
+        """Stop recording and write the index and footer"""
+        self._running = False
+        for sub in self._subscriptions:
+            sub.close()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        with self._lock:
+            if self._file is None:
+                return
+            index_offset = self._file.tell()
+            self._file.write(np.array(self._index, dtype=INDEX_DTYPE).tobytes())
+            self._file.write(FOOTER.pack(index_offset, len(self._index), INDEX_MAGIC))
+            self._file.close()
+            self._file = None
+        logger.info(f"Session saved to {self.path}: {self.stats()}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class SessionReader:
+    """Random access to a session file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        if self._file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a session file")
+        (length,) = struct.unpack('<I', self._file.read(4))
+        self.header = json.loads(self._file.read(length))
+        self._data_start = self._file.tell()
+        self._lock = threading.Lock()
+        self.index = self._load_index()
+        self.scans = self.index[self.index['kind'] == SCAN]
+        self.frames = self.index[self.index['kind'] == FRAME_CHUNK]
+
+    def _load_index(self):
+        self._file.seek(0, 2)
+        size = self._file.tell()
+        if size - self._data_start >= FOOTER.size:
+            self._file.seek(size - FOOTER.size)
+            index_offset, count, magic = FOOTER.unpack(self._file.read(FOOTER.size))
+            if magic == INDEX_MAGIC:
+                self._file.seek(index_offset)
+                return np.frombuffer(self._file.read(count * INDEX_DTYPE.itemsize), INDEX_DTYPE)
+        logger.warning(f"{self.path} has no index (recording interrupted?), rebuilding")
+        return self._rebuild_index(size)
+
+    def _rebuild_index(self, size):
+        records = []
+        offset = self._data_start
+        while offset + CHUNK.size <= size:
+            self._file.seek(offset)
+            kind, seq, timestamp, length = CHUNK.unpack(self._file.read(CHUNK.size))
+            if kind not in (SCAN, FRAME_CHUNK) or offset + CHUNK.size + length > size:
+                break
+            records.append((kind, seq, timestamp, offset))
+            offset += CHUNK.size + length
+        return np.array(records, dtype=INDEX_DTYPE)
+
+    @property
+    def start_time(self):
+        return float(self.index['timestamp'].min()) if len(self.index) else 0.0
+
+    @property
+    def duration(self):
+        if not len(self.index):
+            return 0.0
+        return float(self.index['timestamp'].max()) - self.start_time
+
+    def read(self, record):
+        """Decode one index record into a LidarScan or a frame"""
+        with self._lock:
+            self._file.seek(int(record['offset']))
+            kind, seq, timestamp, length = CHUNK.unpack(self._file.read(CHUNK.size))
+            payload = self._file.read(length)
+        if kind == SCAN:
+            return decode_scan(payload, timestamp, seq)
+        return decode_frame(payload)
+
+    def seek(self, records, timestamp):
+        """Position of the first record at or after timestamp"""
+        return int(np.searchsorted(records['timestamp'], timestamp))
+
+    def iter_scans(self, start=None):
+        """Yield recorded LidarScans in order, optionally from a timestamp"""
+        first = 0 if start is None else self.seek(self.scans, start)
+        for record in self.scans[first:]:
+            yield self.read(record)
+
+    def iter_frames(self, start=None):
+        """Yield (timestamp, frame) in order, optionally from a timestamp"""
+        first = 0 if start is None else self.seek(self.frames, start)
+        for record in self.frames[first:]:
+            yield float(record['timestamp']), self.read(record)
+
+    def close(self):
+        self._file.close()
+
+
+class ReplayClock:
+    """
+    Maps recorded time onto the wall clock
+
+    speed=1.0 is real time, 4.0 four times faster; speed=None never waits,
+    so each source runs as fast as it is read. A looping source rebases
+    its timestamps with rewind() each time it wraps, so later passes play
+    at the same speed as the first.
+    """
+
+    def __init__(self, start_time, speed=1.0):
+        self.start_time = start_time
+        self.speed = speed
+        self._wall_start = None
+        self._lock = threading.Lock()
+
+    def _started(self):
+        with self._lock:
+            if self._wall_start is None:
+                self._wall_start = time.monotonic()
+            return self._wall_start
+
+    def now(self):
+        """Recorded time the replay has reached"""
+        if self.speed is None:
+            return self.start_time
+        return self.start_time + (time.monotonic() - self._started()) * self.speed
+
+    def rewind(self, timestamp):
+        """
+        Offset to add to a source's timestamps so that its record at
+        timestamp plays now, e.g. the first record again after a wrap
+
+        Each source keeps its own offset, so one source looping does not
+        shift the others sharing the clock.
+        """
+        return self.now() - timestamp
+
+    def wait_until(self, timestamp):
+        if self.speed is None:
+            return
+        delay = self._started() + (timestamp - self.start_time) / self.speed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ReplayRPLidar:
+    """
+    RPLidar-compatible device replaying recorded scans, for Lidar(device=...)
+
+    Successive iter_scans() calls continue where the previous one stopped,
+    so Lidar.get_scan() in polling mode returns every scan exactly once.
+    """
+
+    def __init__(self, reader, clock, loop=False):
+        self.reader = reader
+        self.clock = clock
+        self.loop = loop
+        self._position = 0
+        self._offset = 0.0   # added to recorded timestamps after a wrap
+        self._running = False
+
+    def iter_scans(self, max_buf_meas=500, min_len=5):
+        self._running = True
+        records = self.reader.scans
+        while self._running:
+            if self._position >= len(records):
+                if not self.loop or not len(records):
+                    return
+                self._position = 0
+                self._offset = self.clock.rewind(float(records[0]['timestamp']))
+            record = records[self._position]
+            self._position += 1
+            self.clock.wait_until(float(record['timestamp']) + self._offset)
+            yield self.reader.read(record).to_points()
+
+    def stop(self):
+        self._running = False
+
+    def stop_motor(self):
+        pass
+
+    def start_motor(self):
+        pass
+
+    def disconnect(self):
+        self._running = False
+
+    def get_info(self):
+        return {'model': 0, 'firmware': (1, 0), 'hardware': 0, 'serialnumber': 'REPLAY'}
+
+    def get_health(self):
+        return ('Good', 0)
+
+
+class ReplayVideoCapture:
+    """cv2.VideoCapture-compatible source replaying recorded frames, for Camera(capture=...)"""
+
+    def __init__(self, reader, clock, loop=False):
+        self.reader = reader
+        self.clock = clock
+        self.loop = loop
+        self._position = 0
+        self._offset = 0.0   # added to recorded timestamps after a wrap
+        self._opened = True
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self, image=None):
+        records = self.reader.frames
+        if not self._opened or not len(records):
+            return False, None
+        if self._position >= len(records):
+            if not self.loop:
+                return False, None
+            self._position = 0
+            self._offset = self.clock.rewind(float(records[0]['timestamp']))
+        record = records[self._position]
+        self._position += 1
+        self.clock.wait_until(float(record['timestamp']) + self._offset)
+        frame = self.reader.read(record)
+        if image is not None and image.shape == frame.shape:
+            image[...] = frame
+            return True, image
+        return True, frame
+
+    def get(self, prop):
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self._opened = False
+
+
+class SessionReplay:
+    """
+    Replays a session file through the Lidar and Camera drivers
+
+    Both sources share one ReplayClock, so at 1x or Nx they stay in step
+    with each other as recorded.
+
+    Example:
+        replay = SessionReplay('incident.ses', speed=4.0)
+        lidar = replay.lidar(stream=True)
+        camera = replay.camera()
+    """
+
+    def __init__(self, path, speed=1.0, loop=False):
+        """
+        Args:
+            path: Session file
+            speed: Playback speed factor, or None for as fast as possible
+            loop: Restart from the beginning at the end of the recording
+        """
+        self.reader = SessionReader(path)
+        self.clock = ReplayClock(self.reader.start_time, speed)
+        self.loop = loop
+
+    def lidar(self, **kwargs):
+        """Lidar driver fed from the recording (kwargs as for Lidar)"""
+        from L1.L1_lidar import Lidar
+        return Lidar(device=ReplayRPLidar(self.reader, self.clock, self.loop), **kwargs)
+
+    def camera(self, **kwargs):
+        """Camera driver fed from the recording (kwargs as for Camera)"""
+        from L1.L1_camera import Camera
+        return Camera(capture=ReplayVideoCapture(self.reader, self.clock, self.loop), **kwargs)
+
+    def close(self):
+        self.reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
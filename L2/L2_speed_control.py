@@ -1,28 +1,132 @@
+"""
+Closed-loop wheel speed control.
+
+SpeedControl turns target wheel speeds (m/s, e.g. from Kinematics) into
+motor duty cycles for MotorController, correcting them with the wheel
+speeds measured by the encoders (L2_odometry). Both wheels are computed
+together in one step of array arithmetic:
+
+    duty = kf * setpoint + kp * error + ki * integral(error) - kd * d(measured)/dt
+
+The setpoint is slew-limited to max_accel, so a step command becomes a
+ramp the wheels can follow; the derivative acts on the measurement, so
+setpoint changes do not kick it; and the integral is frozen while the
+output is saturated in the direction of the error (anti-windup). A wheel
+whose target and setpoint are both zero gets zero output and a cleared
+integral, so a stopped robot is not servoed around zero.
+"""
 import logging
+import numpy as np
+from utils.constants import MAX_SPEED
+
+logger = logging.getLogger(__name__)
 
-# Configure logging for debugging
-logging.basicConfig(level=logging.DEBUG)
 
 class SpeedControl:
-    def __init__(self):
-        self.target_speed = 0.0
+    def __init__(self, kp=2.0, ki=5.0, kd=0.0, kf=1.0 / MAX_SPEED, max_accel=2.0,
+                 rate_hz=50, output_limit=1.0, wheels=2):
+        """
+        Args:
+            kp, ki, kd: PID gains (duty per m/s, per m, per m/s²)
+            kf: Feedforward gain (duty per m/s of setpoint)
+            max_accel: Setpoint slew limit (m/s²), None for no limit
+            rate_hz: Nominal update rate; update() uses 1 / rate_hz as dt
+                unless told otherwise
+            output_limit: Duty cycle magnitude limit
+            wheels: Number of wheels controlled together
+        """
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.kf = kf
+        self.max_accel = max_accel
+        self.rate_hz = rate_hz
+        self.output_limit = output_limit
+        self.target = np.zeros(wheels)     # requested speeds (m/s)
+        self.setpoint = np.zeros(wheels)   # slew-limited speeds being tracked
+        self.integral = np.zeros(wheels)
+        self.output = np.zeros(wheels)
+        self._last_measured = None
+
+    @property
+    def target_speed(self):
+        return self.target
 
     def set_target_speed(self, speed):
         """
-        Set the target speed for the robot.
+        Set the target speed for the wheels (m/s)
+
+        Args:
+            speed: One speed for all wheels, or one per wheel
+        """
+        self.target = np.broadcast_to(np.asarray(speed, dtype=np.float64), self.target.shape).copy()
+
+    def reset(self, measured=None):
+        """Clear the controller state, e.g. after an emergency stop
+
+        Args:
+            measured: Current wheel speeds to start the setpoint ramp from
+        """
+        start = np.zeros_like(self.setpoint) if measured is None else np.asarray(measured, dtype=np.float64)
+        self.setpoint[:] = start
+        self.integral[:] = 0.0
+        self.output[:] = 0.0
+        self._last_measured = None
+
+    def update(self, measured, target=None, dt=None):
+        """
+        One control step
+
+        Args:
+            measured: Measured wheel speeds (m/s), or None to run on
+                feedforward only (e.g. stale encoder data); the integral
+                is held
+            target: New target speeds (m/s), as for set_target_speed
+            dt: Seconds since the last step (default 1 / rate_hz)
+
+        Returns:
+            List of duty cycles, one per wheel, within +-output_limit
         """
-        self.target_speed = speed
-        logging.debug(f"Target speed set to: {speed}")
+        if target is not None:
+            self.set_target_speed(target)
+        dt = 1.0 / self.rate_hz if dt is None or dt <= 0 else dt
+
+        if self.max_accel is None:
+            self.setpoint[:] = self.target
+        else:
+            step = self.max_accel * dt
+            self.setpoint += np.clip(self.target - self.setpoint, -step, step)
+
+        output = self.kf * self.setpoint
+        if measured is not None:
+            measured = np.asarray(measured, dtype=np.float64)
+            error = self.setpoint - measured
+            output = output + self.kp * error + self.ki * self.integral
+            if self.kd and self._last_measured is not None:
+                output -= self.kd * (measured - self._last_measured) / dt
+            self._last_measured = measured
+
+            # Anti-windup: integrate unless saturated and the error pushes further out
+            saturated = np.abs(output) >= self.output_limit
+            pushing = np.sign(error) == np.sign(output)
+            integrate = ~(saturated & pushing)
+            increment = np.where(integrate, error * dt, 0.0)
+            self.integral += increment
+            output += self.ki * increment
+        else:
+            output = output + self.ki * self.integral
+            self._last_measured = None
+
+        idle = (self.target == 0) & (self.setpoint == 0)
+        if idle.any():
+            output = np.where(idle, 0.0, output)
+            self.integral[idle] = 0.0
+        np.clip(output, -self.output_limit, self.output_limit, out=self.output)
+        return self.output.tolist()
 
     def compute_duty_cycle(self, current_speed):
         """
         Compute the duty cycle based on the current speed.
         """
-        try:
-            error = self.target_speed - current_speed
-            duty_cycle = error * 0.5  # Proportional gain
-            logging.debug(f"Duty cycle computed: {duty_cycle}")
-            return duty_cycle
-        except Exception as e:
-            logging.error(f"An error occurred while computing duty cycle: {e}")
-            raise
\ No newline at end of file
+        duties = self.update(np.broadcast_to(np.asarray(current_speed, dtype=np.float64), self.target.shape))
+        return duties[0] if np.ndim(current_speed) == 0 else duties
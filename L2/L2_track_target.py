@@ -1,8 +1,186 @@
+"""
+Colour-blob target tracker.
+
+Each frame is thresholded in HSV on a strided (downsampled) copy and the
+largest connected blob of the target colour is taken as the target. Once
+the target has been found, later frames only search a region of interest
+around the position predicted from its last motion, which is a small
+fraction of the image; when the target is not found there the tracker
+falls back to a full-frame search.
+
+A per-frame time budget bounds the work: if the region search has already
+used too much of it the full-frame search is deferred to the next frame,
+and full-frame searches that overrun the budget make later ones coarser.
+"""
+import logging
+import time
+from typing import NamedTuple
+import numpy as np
+from utils.lazy_import import lazy_import
+
+cv2 = lazy_import('cv2')   # only needed once frames are tracked
+
+
+class TrackResult(NamedTuple):
+    """Target found in one frame"""
+    x: float                # blob centroid in full-frame pixels
+    y: float
+    size: float             # blob area in full-frame pixels
+    confidence: float       # 0..1, how compact and dominant the blob is
+    processing_time: float  # seconds spent on this frame
+
+
 class TargetTracker:
-    def __init__(self):
-        self.target_position = (0, 0)
+    def __init__(self, lower_hsv=(5, 120, 100), upper_hsv=(25, 255, 255), scale=4,
+                 max_scale=16, min_area=4, roi_margin=2.0, min_roi=48, time_budget=0.015):
+        """
+        Args:
+            lower_hsv, upper_hsv: Target colour range (OpenCV HSV, hue 0-179);
+                a lower hue above the upper one wraps through red
+            scale: Downsampling stride for the search
+            max_scale: Coarsest stride full-frame searches may fall back to
+            min_area: Smallest blob accepted, in downsampled pixels
+            roi_margin: Region half-size in blob radii around the prediction
+            min_roi: Smallest region half-size (full-frame pixels)
+            time_budget: Seconds of processing allowed per frame
+        """
+        self.logger = logging.getLogger('track_target')
+        self.lower = np.array(lower_hsv, dtype=np.uint8)
+        self.upper = np.array(upper_hsv, dtype=np.uint8)
+        self.scale = scale
+        self.max_scale = max_scale
+        self.min_area = min_area
+        self.roi_margin = roi_margin
+        self.min_roi = min_roi
+        self.time_budget = time_budget
+
+        self.full_scale = scale       # stride of full-frame searches, adapted to the budget
+        self.target_position = None   # (x, y) in pixels once a target is found
+        self.last_result = None
+        self._velocity = (0.0, 0.0)   # pixels per second
+        self._last_time = None
+        self._full_time = 0.0         # duration of the last full-frame search
+        self.roi_searches = 0
+        self.full_searches = 0
+        self.deferred_searches = 0
+
+    def reset(self):
+        """Forget the target so the next frame is searched in full"""
+        self.target_position = None
+        self.last_result = None
+        self._velocity = (0.0, 0.0)
+        self._last_time = None
 
     def track_target(self, frame):
-        # Simple target tracking (e.g., color-based)
-        # Placeholder for actual tracking logic
-        return self.target_position
\ No newline at end of file
+        """
+        Track the target in a BGR frame
+
+        Returns:
+            (x, y) of the target in pixels, or None if it is not visible
+        """
+        self.track(frame)
+        return self.target_position
+
+    def track(self, frame, timestamp=None):
+        """
+        Track the target in a BGR frame
+
+        Args:
+            frame: BGR image
+            timestamp: Capture time (s) for motion prediction; defaults to now
+
+        Returns:
+            TrackResult, or None if the target is not visible
+        """
+        started = time.perf_counter()
+        now = time.monotonic() if timestamp is None else timestamp
+        height, width = frame.shape[:2]
+
+        found = None
+        if self.target_position is not None:
+            self.roi_searches += 1
+            found = self._search(frame, self._predicted_roi(now, width, height), self.scale)
+        if found is None:
+            # A region search that used up its share of the budget leaves
+            # the full-frame search for the next frame
+            spent = time.perf_counter() - started
+            if self.target_position is not None and spent + self._full_time > self.time_budget:
+                self.deferred_searches += 1
+                self.target_position = None
+            else:
+                found = self._full_search(frame, width, height)
+
+        elapsed = time.perf_counter() - started
+        if found is None:
+            self.reset()
+            return None
+        x, y, size, confidence = found
+        if self.target_position is not None and self._last_time is not None and now > self._last_time:
+            dt = now - self._last_time
+            self._velocity = ((x - self.target_position[0]) / dt, (y - self.target_position[1]) / dt)
+        self.target_position = (x, y)
+        self._last_time = now
+        self.last_result = TrackResult(x, y, size, confidence, elapsed)
+        return self.last_result
+
+    def _full_search(self, frame, width, height):
+        self.full_searches += 1
+        started = time.perf_counter()
+        found = self._search(frame, (0, 0, width, height), self.full_scale)
+        self._full_time = time.perf_counter() - started
+        if self._full_time > self.time_budget and self.full_scale < self.max_scale:
+            self.full_scale = min(self.full_scale * 2, self.max_scale)
+            self.logger.warning(f"Full-frame search over budget, stride now {self.full_scale}")
+        elif self._full_time < self.time_budget / 8 and self.full_scale > self.scale:
+            self.full_scale //= 2
+        return found
+
+    def _predicted_roi(self, now, width, height):
+        """(x0, y0, x1, y1) around where the target should be now"""
+        x, y = self.target_position
+        if self._last_time is not None:
+            dt = now - self._last_time
+            x += self._velocity[0] * dt
+            y += self._velocity[1] * dt
+        radius = np.sqrt(self.last_result.size / np.pi) if self.last_result else 0.0
+        half = max(self.min_roi, self.roi_margin * radius)
+        x0 = int(np.clip(x - half, 0, width - 1))
+        y0 = int(np.clip(y - half, 0, height - 1))
+        x1 = int(np.clip(x + half + 1, x0 + 1, width))
+        y1 = int(np.clip(y + half + 1, y0 + 1, height))
+        return x0, y0, x1, y1
+
+    def _mask(self, image):
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        if self.lower[0] <= self.upper[0]:
+            return cv2.inRange(hsv, self.lower, self.upper)
+        # Hue range wrapping through 0 (reds)
+        low = cv2.inRange(hsv, self.lower, np.array([179, self.upper[1], self.upper[2]], np.uint8))
+        high = cv2.inRange(hsv, np.array([0, self.lower[1], self.lower[2]], np.uint8), self.upper)
+        return cv2.bitwise_or(low, high)
+
+    def _search(self, frame, roi, scale):
+        """
+        Largest blob of the target colour inside roi
+
+        Returns:
+            (x, y, size, confidence) in full-frame pixels, or None
+        """
+        x0, y0, x1, y1 = roi
+        small = np.ascontiguousarray(frame[y0:y1:scale, x0:x1:scale])
+        mask = self._mask(small)
+        count, _, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        if count < 2:
+            return None
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        best = int(np.argmax(areas))
+        area = int(areas[best])
+        if area < self.min_area:
+            return None
+        # Compact (disc-like) blobs that hold most of the matching pixels score highest
+        box = stats[1 + best, cv2.CC_STAT_WIDTH] * stats[1 + best, cv2.CC_STAT_HEIGHT]
+        fill = min(1.0, area / box / (np.pi / 4))
+        dominance = area / float(areas.sum())
+        cx, cy = centroids[1 + best]
+        return (float(x0 + cx * scale), float(y0 + cy * scale), float(area * scale * scale),
+                float(fill * dominance))
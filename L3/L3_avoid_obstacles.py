@@ -1,29 +1,67 @@
 import time
 import numpy as np
 from L2.L2_obstacle import ObstacleDetector
+from L2.L2_local_planner import DWAPlanner
+from L2.L2_occupancy_grid import OccupancyGrid
 from L1.L1_lidar import Lidar
 from utils.logger import setup_logger
+from utils.scheduler import Rate
+from L3.L3_behavior import Behavior, Maneuver, RobotState, Command
+from utils.constants import MAX_SPEED
 import logging
 
-class ObstacleAvoidance:
-    def __init__(self, drive_system):
+class ObstacleAvoidance(Behavior):
+    name = 'avoidance'
+
+    def __init__(self, drive_system, sensor_hub=None, odometry=None):
         """
         Enhanced obstacle avoidance system for SCUTTLE robot
         
         Args:
             drive_system: Initialized drive system from L3 layer
+            sensor_hub: SensorHub publishing a 'lidar' topic; if omitted the
+                avoidance system opens its own Lidar
+            odometry: OdometryService giving the pose that scans are mapped
+                at (the drive system's, if it has one); without a pose
+                there is no obstacle memory
         """
         setup_logger()
         self.logger = logging.getLogger('avoidance')
-        self.lidar = Lidar()
+        if sensor_hub is not None:
+            self.lidar = None
+            self.scans = sensor_hub.subscribe('lidar', mode='latest')
+        else:
+            self.lidar = Lidar(stream=True)
+            self.scans = None
         self.obstacle_detector = ObstacleDetector(self.lidar)
         self.drive_system = drive_system
+        self.odometry = odometry if odometry is not None else getattr(drive_system, 'odometry', None)
         
         # Configuration parameters
         self.safety_distance = 0.5  # meters
         self.escape_angle = 30      # degrees
         self.escape_speed = 0.3     # 0-1 (percentage of max speed)
         self.scan_sectors = 8       # For environment analysis
+        self.loop_rate = 10         # Hz (standalone loop only)
+        self.maneuver_time = 1.0    # seconds per escape turn
+        self.hold_time = 2.0        # seconds to stand still with no clear path
+        self._maneuver = None
+        
+        # Local planner: streams a fresh DWA command every tick while an
+        # obstacle is near, instead of fixed escape turns; it may reverse
+        # slowly to back out when no forward path is admissible
+        self.planner = DWAPlanner(min_speed=-0.15)
+        self.use_planner = True
+        self.release_distance = 0.75  # meters of forward clearance to hand back control
+        self._planning = False
+        self.last_plan = None
+
+        # Obstacle memory: scans are mapped into a rolling occupancy grid at
+        # the odometry pose, so obstacles that drop out of the lidar's view
+        # (behind the robot, in blind spots) still block paths and planning
+        self.grid = OccupancyGrid()
+        self.max_pose_age = 0.25      # seconds before the odometry pose counts as stale
+        self._mapped_scan = None
 
     def get_safest_direction(self, sector_distances):
         """
@@ -53,71 +91,169 @@ class ObstacleAvoidance:
         best_sector = max(safe_sectors, key=lambda x: scoring_func(x[0], x[1]))
         return sector_angles[best_sector[0]], best_sector[1]
 
-    def execute_avoidance_maneuver(self, obstacle_direction):
+    def execute_avoidance_maneuver(self, obstacle_direction, now=None):
         """
-        Perform evasive action based on obstacle position
+        Start evasive action based on obstacle position
+
+        The turn runs for maneuver_time seconds as a Maneuver advanced by
+        tick(); this call does not block.
         
         Args:
             obstacle_direction: Angle to obstacle (degrees)
+            now: Current time (time.monotonic), defaults to now
         """
-        try:
-            # Simple avoidance strategy - turn away from obstacle
-            if obstacle_direction > 0:
-                # Obstacle on right, turn left
-                self.logger.info("Obstacle on right, turning left")
-                self.drive_system.set_velocity(
-                    linear=self.escape_speed * 0.5,
-                    angular=self.escape_speed
-                )
-            else:
-                # Obstacle on left, turn right
-                self.logger.info("Obstacle on left, turning right")
-                self.drive_system.set_velocity(
-                    linear=self.escape_speed * 0.5,
-                    angular=-self.escape_speed
-                )
-                
-            time.sleep(1)  # Execute maneuver for 1 second
-            self.drive_system.stop()
-            
-        except Exception as e:
-            self.logger.error(f"Avoidance maneuver failed: {str(e)}")
-            self.drive_system.emergency_stop()
+        # Simple avoidance strategy - turn away from obstacle
+        if obstacle_direction > 0:
+            # Obstacle on right, turn left
+            self.logger.info("Obstacle on right, turning left")
+            angular = self.escape_speed
+        else:
+            # Obstacle on left, turn right
+            self.logger.info("Obstacle on left, turning right")
+            angular = -self.escape_speed
+        self._maneuver = Maneuver(
+            [(self.maneuver_time, self.escape_speed * 0.5, angular)],
+            source=self.name
+        )
+        self._maneuver.start(time.monotonic() if now is None else now)
+        return self._maneuver
+
+    def _hold(self, now):
+        """Stand still for hold_time seconds before rechecking"""
+        self._maneuver = Maneuver([(self.hold_time, 0.0, 0.0)], source=self.name)
+        self._maneuver.start(now)
+        return self._maneuver
+
+    def latest_scan(self):
+        """Newest LidarScan from the shared hub or our own streaming Lidar (non-blocking)"""
+        if self.scans is not None:
+            sample = self.scans.latest()
+            return sample.value if sample else None
+        return self.lidar.latest_scan()
+
+    def tick(self, state):
+        """
+        One non-blocking avoidance step
+
+        Returns:
+            Command while avoiding (or holding), None when the path is clear
+        """
+        if self._maneuver is not None:
+            command = self._maneuver.tick(state.time)
+            if command is not None:
+                return command
+            self._maneuver = None
+
+        scan = state.scan if state.scan is not None else self.latest_scan()
+        if scan is None:
+            return None
+        pose = self._pose()
+        if pose is not None:
+            self._map_scan(scan, pose)
+        sector_distances = self.obstacle_detector.get_obstacle_map(scan, self.scan_sectors)
+        
+        # Check forward path (the sector centred on 0°), including
+        # remembered obstacles the current scan no longer shows
+        forward_distance = sector_distances[self.scan_sectors // 2]
+        if pose is not None:
+            forward_distance = min(forward_distance, self._remembered_forward(pose))
+        if self._planning and forward_distance >= self.release_distance:
+            self.logger.info("Path clear, releasing control")
+            self._planning = False
+        if not self._planning and forward_distance >= self.safety_distance:
+            return None
+        if not self._planning:
+            self.logger.warning(f"Obstacle detected at {forward_distance:.2f}m")
+        
+        # Find safest escape direction
+        escape_info = self.get_safest_direction(sector_distances)
+        
+        if self.use_planner:
+            return self._plan(state, scan, escape_info)
+        
+        if escape_info:
+            escape_angle, escape_dist = escape_info
+            self.logger.info(f"Escape direction found: {escape_angle:.0f}° ({escape_dist:.2f}m clear)")
+            maneuver = self.execute_avoidance_maneuver(escape_angle, state.time)
+        else:
+            self.logger.warning("No clear path found - stopping")
+            maneuver = self._hold(state.time)
+        return maneuver.tick(state.time)
+
+    def _plan(self, state, scan, escape_info):
+        """One DWA cycle towards the escape direction (or straight on)"""
+        reach = self.planner.reach + self.planner.clearance_cap
+        points = self.obstacle_detector.get_points(scan, max_range=reach)
+        pose = self._pose()
+        if pose is not None:
+            points = np.concatenate([points, self.grid.occupied_points(pose, max_range=reach)])
+        # Drive commands are fractions of MAX_SPEED; the planner works in m/s
+        velocity = state.velocity
+        current = (velocity.linear * MAX_SPEED, velocity.angular * MAX_SPEED) if velocity else (0.0, 0.0)
+        # RPLIDAR angles are clockwise, the planner's heading counter-clockwise
+        goal_heading = -np.radians(escape_info[0]) if escape_info else 0.0
+        plan = self.planner.plan(points, current, goal_heading)
+        self.last_plan = plan
+        if not plan.ok:
+            self.logger.warning("No admissible trajectory - stopping")
+            self._planning = False
+            return self._hold(state.time).tick(state.time)
+        self._planning = True
+        return Command(plan.v / MAX_SPEED, plan.omega / MAX_SPEED, self.name)
+
+    def _pose(self):
+        """Current odometry pose, or None without a fresh one"""
+        if self.odometry is None:
+            return None
+        snapshot = self.odometry.snapshot()
+        if time.monotonic() - snapshot.timestamp > self.max_pose_age:
+            return None
+        return snapshot.x, snapshot.y, snapshot.theta
+
+    def _map_scan(self, scan, pose):
+        """Integrate each new scan into the occupancy grid once"""
+        scan = self.obstacle_detector.as_scan(scan)
+        if scan is self._mapped_scan:
+            return
+        self._mapped_scan = scan
+        self.grid.update(self.obstacle_detector.get_points(scan, max_range=self.grid.max_range), pose)
+
+    def _remembered_forward(self, pose, samples=16):
+        """
+        Distance ahead (m) at which the robot would touch an occupied grid
+        cell, inf if nothing within release_distance
+        """
+        x, y, theta = pose
+        ahead = np.linspace(self.grid.resolution, self.release_distance, samples)
+        clearance = self.grid.distance_at(x + ahead * np.cos(theta), y + ahead * np.sin(theta))
+        blocked = clearance < self.planner.robot_radius
+        return float(ahead[np.argmax(blocked)]) if blocked.any() else float('inf')
+
+    def reset(self):
+        """Abort any maneuver in progress"""
+        self._maneuver = None
+        self._planning = False
 
     def avoid_obstacles(self):
-        """Main obstacle avoidance loop"""
+        """Standalone obstacle avoidance loop, for use without MissionControl"""
         self.logger.info("Starting obstacle avoidance system")
+        rate = Rate(self.loop_rate, name="AvoidObstacles")
         
         try:
+            command = None
             while True:
-                # Get environment data
-                scan = self.lidar.get_scan()
-                sector_distances = self.obstacle_detector.get_obstacle_map(scan, self.scan_sectors)
-                
-                # Check forward path
-                if sector_distances[0] < self.safety_distance:
-                    self.logger.warning(f"Obstacle detected at {sector_distances[0]:.2f}m")
-                    
-                    # Find safest escape direction
-                    escape_info = self.get_safest_direction(sector_distances)
-                    
-                    if escape_info:
-                        escape_angle, escape_dist = escape_info
-                        self.logger.info(f"Escape direction found: {escape_angle:.0f}° ({escape_dist:.2f}m clear)")
-                        self.execute_avoidance_maneuver(escape_angle)
-                    else:
-                        self.logger.warning("No clear path found - stopping")
-                        self.drive_system.emergency_stop()
-                        time.sleep(2)  # Wait before rechecking
-                
-                time.sleep(0.1)  # Main loop rate
+                command = self.tick(RobotState(scan=self.latest_scan(), velocity=command))
+                if command is not None:
+                    self.drive_system.set_velocity(linear=command.linear, angular=command.angular)
+                rate.sleep()  # Main loop rate
                 
         except KeyboardInterrupt:
             self.logger.info("Obstacle avoidance stopped by user")
         except Exception as e:
             self.logger.critical(f"Fatal error in avoidance: {str(e)}")
         finally:
-            self.lidar.stop()
+            if self.lidar is not None:
+                self.lidar.stop()
             self.drive_system.stop()
 
     def update_parameters(self, safety_dist=None, escape_angle=None, escape_speed=None):
@@ -0,0 +1,145 @@
+"""
+Cooperative, tick-driven behaviour engine.
+
+Behaviours never block: each control cycle the arbiter builds one
+RobotState, asks every behaviour for a Command in priority order and sends
+the first one it gets to the drive system. Timed manoeuvres are Maneuver
+state machines advanced by the state's timestamp instead of sleeps.
+"""
+import logging
+import time
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Command(NamedTuple):
+    """Velocity command produced by a behaviour"""
+    linear: float
+    angular: float
+    source: str = ''
+
+
+def _now():
+    return time.monotonic()
+
+
+class RobotState:
+    """Snapshot of everything the behaviours may look at during one tick"""
+
+    __slots__ = ('time', 'mode', 'scan', 'frame', 'manual_command', 'velocity')
+
+    def __init__(self, time=None, mode=None, scan=None, frame=None, manual_command=None,
+                 velocity=None):
+        self.time = time if time is not None else _now()
+        self.mode = mode
+        self.scan = scan
+        self.frame = frame
+        self.manual_command = manual_command
+        self.velocity = velocity  # last Command sent to the drive system
+
+
+class Behavior:
+    """Base class: tick(state) returns a Command, or None to pass"""
+
+    name = 'behavior'
+
+    def tick(self, state) -> Optional[Command]:
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget any internal state (e.g. on a mode change)"""
+
+
+class Maneuver:
+    """
+    Time-based sequence of fixed velocity steps
+
+    Args:
+        steps: List of (duration_s, linear, angular)
+        source: Name attached to the produced commands
+    """
+
+    def __init__(self, steps, source='maneuver'):
+        self.steps = list(steps)
+        self.source = source
+        self._started = None
+
+    @property
+    def active(self):
+        return self._started is not None
+
+    def start(self, now):
+        self._started = now
+
+    def cancel(self):
+        self._started = None
+
+    def tick(self, now) -> Optional[Command]:
+        """Command for the step active at now, or None once finished"""
+        if self._started is None:
+            return None
+        elapsed = now - self._started
+        for duration, linear, angular in self.steps:
+            if elapsed < duration:
+                return Command(linear, angular, self.source)
+            elapsed -= duration
+        self._started = None
+        return None
+
+
+class ManualControl(Behavior):
+    """Passes the latest gamepad command through"""
+
+    name = 'manual'
+
+    def tick(self, state):
+        return state.manual_command
+
+
+class PriorityArbiter:
+    """
+    Decides which behaviour drives the robot each cycle
+
+    Behaviours are consulted highest priority first (in the order they were
+    added), skipping those not enabled in the current mode; the first
+    Command wins. If none produces one, the idle command (stop) is sent so
+    the drive watchdog keeps being fed.
+    """
+
+    def __init__(self, drive_system, idle=Command(0.0, 0.0, 'idle')):
+        self.drive_system = drive_system
+        self.behaviors = []   # (behavior, modes or None for all modes)
+        self.idle = idle
+        self.active = None
+        self.last_command = None
+
+    def add(self, behavior, modes=None):
+        """Append a behaviour below those already added"""
+        self.behaviors.append((behavior, None if modes is None else frozenset(modes)))
+        return behavior
+
+    def tick(self, state) -> Command:
+        command = None
+        for behavior, modes in self.behaviors:
+            if modes is not None and state.mode not in modes:
+                continue
+            try:
+                command = behavior.tick(state)
+            except Exception as e:
+                logger.error(f"Behavior {behavior.name} failed: {e}")
+                command = None
+            if command is not None:
+                break
+        command = command or self.idle
+        if command.source != self.active:
+            logger.info(f"Active behavior: {command.source}")
+            self.active = command.source
+        self.drive_system.set_velocity(linear=command.linear, angular=command.angular)
+        self.last_command = command
+        return command
+
+    def reset(self):
+        for behavior, _ in self.behaviors:
+            behavior.reset()
+        self.active = None
@@ -1,6 +1,10 @@
 from L1.L1_motor import MotorController
+from L2.L2_blackboard import BLACKBOARD
 from L2.L2_kinematics import Kinematics
+from L2.L2_speed_control import SpeedControl
 from utils.constants import WHEELBASE
+from utils.scheduler import Rate, set_thread_priority
+from utils import metrics, tracing
 import logging
 import time
 import threading
@@ -8,37 +12,106 @@ from typing import Tuple
 
 logger = logging.getLogger(__name__)
 
+CONTROL_TICKS = metrics.counter('drive_control_ticks_total', 'Drive control loop iterations')
+COMMAND_LATENCY = metrics.histogram('drive_command_latency_seconds', 'Velocity command to motor write')
+COMMAND_TIMEOUTS = metrics.counter('drive_command_timeouts_total', 'Stops because no command arrived in time')
+EMERGENCY_STOPS = metrics.counter('drive_emergency_stops_total', 'Drive controller emergency stops')
+TRIPS = metrics.counter('drive_safety_trips_total', 'Safety trips latching the drive off')
+
 class DriveController:
-    def __init__(self):
+    def __init__(self, control_rate=50, priority=None, odometry=None, speed_control=None,
+                 blackboard=BLACKBOARD):
+        """
+        Args:
+            control_rate: Control loop rate in Hz
+            priority: Optional SCHED_FIFO priority for the control thread
+            odometry: OdometryService measuring the wheel speeds; when given,
+                wheel speeds are closed-loop controlled, otherwise duty
+                cycles are sent open loop
+            speed_control: SpeedControl to use (one for control_rate by default)
+            blackboard: Blackboard the commanded velocity is published to
+        """
         self.motor = MotorController()
         self.kinematics = Kinematics(WHEELBASE)
         self._running = False
-        self._last_update = 0
+        self._last_update = 0.0
         self._command_timeout = 0.5  # seconds
         self._lock = threading.Lock()
         self._current_velocity = (0.0, 0.0)  # (linear, angular)
+        self.blackboard = blackboard
+        self._command_event = threading.Event()  # set by every new command
+        self.control_rate = control_rate
+        self.priority = priority
+        self.rate = Rate(control_rate, name="DriveControl")
+        self.odometry = odometry
+        self.speed_control = None
+        if odometry is not None:
+            self.speed_control = speed_control or SpeedControl(rate_hz=control_rate)
+        self.max_measurement_age = 0.1  # seconds before wheel speeds count as stale
+        self._reset_control = True
+        self._last_control = None
         logger.info("Drive controller initialized")
 
     def driving_thread(self):
-        """Main control loop with safety checks"""
+        """Main control loop with safety checks
+
+        Wakes immediately when a command arrives; the fixed-rate tick is
+        kept as a fallback so the command timeout is still enforced.
+        """
         self._running = True
+        if self.priority is not None:
+            set_thread_priority(self.priority)
+        self.rate.reset()
+        timed_out = False
+        last_command = None
+        speeds = [0.0, 0.0]
         try:
             while self._running:
+                # Clear before reading so a command arriving after the read
+                # wakes the next wait
+                self._command_event.clear()
+                CONTROL_TICKS.inc()
+
                 # Safety timeout check
-                if time.time() - self._last_update > self._command_timeout:
-                    self._emergency_stop()
-                    time.sleep(0.1)
+                if time.monotonic() - self._last_update > self._command_timeout:
+                    if not timed_out:
+                        COMMAND_TIMEOUTS.inc()
+                        self._emergency_stop()
+                        timed_out = True
+                        last_command = None
+                    self.rate.wait(self._command_event)
+                    continue
+                timed_out = False
+                if self.motor.tripped:
+                    # Latched off: hold the controller in reset until cleared
+                    self._reset_control = True
+                    self.rate.wait(self._command_event)
                     continue
+                if self._reset_control:
+                    self._reset_control = False
+                    self._last_control = None
+                    if self.speed_control is not None:
+                        self.speed_control.reset()
                 
                 # Get current velocity command
                 with self._lock:
-                    linear, angular = self._current_velocity
+                    command = self._current_velocity
+                    commanded_at = self._last_update
                 
-                # Compute and execute wheel speeds
-                speeds = self.kinematics.compute_wheel_speeds(linear, angular)
-                self.motor.set_speed(speeds)
+                # Compute wheel speeds only when the command changed; the
+                # motor controller skips pins whose duty cycle is unchanged
+                changed = command != last_command
+                if changed:
+                    speeds = self.kinematics.compute_wheel_speeds(*command)
+                    last_command = command
+                if self.speed_control is not None:
+                    self.motor.set_speed(self._closed_loop(speeds))
+                else:
+                    self.motor.set_speed(speeds)
+                if changed:
+                    COMMAND_LATENCY.observe(time.monotonic() - commanded_at)
                 
-                time.sleep(0.02)  # 50Hz control loop
+                self.rate.wait(self._command_event)
                                 
         except Exception as e:
             logger.error(f"Control error: {e}", exc_info=True)
@@ -47,17 +120,39 @@ class DriveController:
         finally:
             self._emergency_stop()
         
+    def _closed_loop(self, speeds):
+        """Duty cycles for wheel speed commands (fractions of max_speed) from the speed controller"""
+        now = time.monotonic()
+        snapshot = self.odometry.snapshot()
+        measured = None
+        if now - snapshot.timestamp <= self.max_measurement_age:
+            measured = (snapshot.left_speed, snapshot.right_speed)
+        dt = None
+        if self._last_control is not None:
+            dt = min(now - self._last_control, 2.0 / self.control_rate)
+        self._last_control = now
+        max_speed = self.kinematics.max_speed
+        return self.speed_control.update(measured, [s * max_speed for s in speeds], dt)
+
     def set_velocity(self, linear: float, angular: float):
         """Thread-safe velocity command"""
         with self._lock:
             self._current_velocity = (linear, angular)
-            self._last_update = time.time()
+            self._last_update = time.monotonic()
+            self._publish_command()
+        self._command_event.set()
 
     def stop(self):
         """Normal stop procedure"""
         with self._lock:
             self._current_velocity = (0.0, 0.0)
-            self._last_update = time.time()
+            self._last_update = time.monotonic()
+            self._publish_command()
+        self._command_event.set()
+
+    def _publish_command(self):
+        if self.blackboard is not None:
+            self.blackboard.publish(command=self._current_velocity)
 
     def emergency_stop(self):
         """Immediate halt"""
@@ -65,14 +160,56 @@ class DriveController:
 
     def _emergency_stop(self):
         """Internal emergency stop"""
+        tracing.hop('emergency_stop')
+        EMERGENCY_STOPS.inc()
         with self._lock:
             self._current_velocity = (0.0, 0.0)
-            self.motor.stop(emergency=True)
+            self._reset_control = True
+            self._publish_command()
+        # Motor I/O outside the lock, so a stop never waits behind a command writer
+        self.motor.stop(emergency=True)
+
+    def trip(self, reason="safety trip"):
+        """
+        Safety fast path: zero the motors from the calling thread and latch
+        motion off until clear_trip()
+
+        Takes no lock, so the stop does not wait for the control loop or a
+        command writer; commands sent while tripped are ignored.
+        """
+        tracing.hop('trip')
+        already = self.motor.tripped
+        self.motor.trip()
+        self._current_velocity = (0.0, 0.0)
+        self._reset_control = True
+        self._publish_command()   # the pins are already zero
+        if not already:
+            TRIPS.inc()
+            logger.warning(f"Drive tripped: {reason}")
+
+    def clear_trip(self):
+        """Release the safety latch; the robot stays still until the next command"""
+        with self._lock:
+            self._current_velocity = (0.0, 0.0)
+            self._last_update = time.monotonic()
+            self._reset_control = True
+            self._publish_command()
+        self.motor.clear_trip()
+        self._command_event.set()
+
+    @property
+    def tripped(self):
+        return self.motor.tripped
 
 
 class DriveSystem:
-    def __init__(self):
-        self.controller = DriveController()
+    def __init__(self, odometry=None):
+        """
+        Args:
+            odometry: OdometryService for closed-loop wheel speed control
+        """
+        self.odometry = odometry
+        self.controller = DriveController(odometry=odometry)
         self.control_thread = threading.Thread(
             target=self.controller.driving_thread,
             daemon=True
@@ -94,4 +231,15 @@ class DriveSystem:
 
     def emergency_stop(self):
         """Immediate emergency stop"""
-        self.controller.emergency_stop()
\ No newline at end of file
+        self.controller.emergency_stop()
+
+    def trip(self, reason="safety trip"):
+        """Zero the motors now and latch them off until clear_trip()"""
+        self.controller.trip(reason)
+
+    def clear_trip(self):
+        self.controller.clear_trip()
+
+    @property
+    def tripped(self):
+        return self.controller.tripped
\ No newline at end of file
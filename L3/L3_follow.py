@@ -1,13 +1,95 @@
 from L2.L2_track_target import TargetTracker
 from L1.L1_camera import Camera
+from L3.L3_behavior import Behavior, Command, RobotState
+from utils.constants import MAX_SPEED
 
-class FollowTarget:
-    def __init__(self):
-        self.camera = Camera()
+class FollowTarget(Behavior):
+    name = 'follow'
+
+    def __init__(self, drive_system=None, sensor_hub=None):
+        """
+        Args:
+            drive_system: Drive system receiving follow commands
+            sensor_hub: SensorHub publishing a 'camera' topic; if omitted
+                the follower opens its own Camera
+        """
+        self.drive_system = drive_system
+        if sensor_hub is not None:
+            self.camera = None
+            self.frames = sensor_hub.subscribe('camera', mode='latest')
+        else:
+            self.camera = Camera(grab=True)
+            self.frames = None
         self.tracker = TargetTracker()
 
+        # Follow parameters
+        self.follow_speed = 0.3   # m/s while the target is centred
+        self.turn_gain = 1.0      # rad/s per unit of horizontal offset
+        self.target_position = None
+        self.last_result = None
+        self._tracked_frame = None
+        self._last_seq = 0
+
+    def latest_frame(self):
+        """Newest camera frame without waiting (hub only; otherwise captures one)"""
+        if self.frames is not None:
+            sample = self.frames.latest()
+            return sample.value if sample else None
+        return self.camera.capture_frame()
+
+    def next_frame(self, timeout=1.0):
+        """Wait for a frame newer than the last one returned (None on timeout)"""
+        if self.frames is not None:
+            sample = self.frames.get(timeout=timeout)
+            return sample.value if sample else None
+        frame = self.camera.wait_for_frame(newer_than=self._last_seq, timeout=timeout)
+        if frame is None:
+            return None
+        self._last_seq = frame.seq
+        return frame.image
+
+    def tick(self, state):
+        """
+        Steer towards the tracked target
+
+        Returns:
+            Command, or None when no target is visible
+        """
+        frame = state.frame
+        if frame is None:
+            return None
+        # The control loop can tick faster than frames arrive; track each frame once
+        if frame is not self._tracked_frame:
+            self._tracked_frame = frame
+            self.last_result = self.tracker.track(frame)
+            self.target_position = self.tracker.target_position
+        if self.target_position is None:
+            return None
+        width = frame.shape[1]
+        offset = (self.target_position[0] - width / 2) / (width / 2)  # -1 (left) .. 1 (right)
+        v = self.follow_speed * (1.0 - abs(offset))
+        omega = -self.turn_gain * offset
+        # Drive commands are fractions of MAX_SPEED
+        return Command(v / MAX_SPEED, omega / MAX_SPEED, self.name)
+
+    def update(self, frame=None):
+        """Track and steer once using frame (default: the newest frame)"""
+        if frame is None:
+            frame = self.latest_frame()
+        command = self.tick(RobotState(frame=frame))
+        if command is not None and self.drive_system is not None:
+            self.drive_system.set_velocity(linear=command.linear, angular=command.angular)
+        return command
+
+    def reset(self):
+        self.target_position = None
+        self.last_result = None
+        self._tracked_frame = None
+        self.tracker.reset()
+
     def follow(self):
+        """Standalone follow loop, one step per new camera frame"""
         while True:
-            frame = self.camera.capture_frame()
-            target_position = self.tracker.track_target(frame)
-            # Add logic to follow the target
\ No newline at end of file
+            frame = self.next_frame()
+            if frame is not None:
+                self.update(frame)
@@ -1,15 +1,21 @@
 from L3.L3_drive_mt import DriveSystem
 from L3.L3_avoid_obstacles import ObstacleAvoidance
 from L3.L3_follow import FollowTarget
-from L1.L1_gamepad import Gamepad
+from L3.L3_behavior import PriorityArbiter, ManualControl, RobotState, Command
+from L1.L1_gamepad import Gamepad, GamepadState
+from L2.L2_blackboard import BLACKBOARD
+from utils.scheduler import RateScheduler
+from utils import metrics, tracing
 import threading
-import time
 import logging
 from enum import Enum, auto
-from typing import Optional, Dict, Tuple
+from typing import Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+SAFETY_HOLDS = metrics.counter('mission_safety_holds_total', 'Safety holds triggered')
+MODE_CHANGES = metrics.counter('mission_mode_changes_total', 'Control mode transitions')
+
 class ControlMode(Enum):
     """Operation mode enumeration"""
     MANUAL = auto()
@@ -17,13 +23,23 @@ class ControlMode(Enum):
     SAFETY_HOLD = auto()
 
 class MissionControl:
-    def __init__(self):
-        """Initialize mission control system with integrated obstacle avoidance"""
+    def __init__(self, drive_system=None, sensor_hub=None, open_gamepad=True, blackboard=BLACKBOARD):
+        """Initialize mission control system with integrated obstacle avoidance
+
+        Args:
+            drive_system: Shared DriveSystem (created if omitted)
+            sensor_hub: SensorHub owning the lidar and camera, so that the
+                behaviours subscribe to it instead of opening devices
+            open_gamepad: Open the gamepad now; if False, manual input is
+                ignored until attach_gamepad() is called
+            blackboard: Blackboard the control mode is published to
+        """
         # Initialize core systems
-        self.drive_system = DriveSystem()
-        self.obstacle_avoidance = ObstacleAvoidance(self.drive_system)
-        self.follow_target = FollowTarget(self.drive_system)
-        self.gamepad = Gamepad()
+        self.drive_system = drive_system or DriveSystem()
+        self.sensor_hub = sensor_hub
+        self.obstacle_avoidance = ObstacleAvoidance(self.drive_system, sensor_hub)
+        self.follow_target = FollowTarget(self.drive_system, sensor_hub)
+        self.gamepad = Gamepad(deadzone=0.1) if open_gamepad else None
         
         # Configure avoidance parameters
         self.obstacle_avoidance.update_parameters(
@@ -31,35 +47,72 @@ class MissionControl:
             escape_speed=0.4  # Slower escape maneuvers
         )
         
+        # One arbiter picks the command that reaches the drive system each
+        # cycle, highest priority first
+        self.arbiter = PriorityArbiter(self.drive_system)
+        self.arbiter.add(self.obstacle_avoidance, modes=(ControlMode.AUTO, ControlMode.MANUAL))
+        self.arbiter.add(ManualControl(), modes=(ControlMode.MANUAL,))
+        self.arbiter.add(self.follow_target, modes=(ControlMode.AUTO,))
+        self._manual_command = None
+        self._manual_input = None   # GamepadState the manual command came from
+        
         # Threading and state management
         self._running = False
-        self._threads = []
+        self.scheduler = None   # built by start_mission() from the rates below
+        self.blackboard = blackboard
         self._mode = ControlMode.AUTO
-        self._mode_lock = threading.Lock()
+        self._mode_lock = threading.Lock()   # serializes mode writers only
+        if blackboard is not None:
+            blackboard.publish(mode=self._mode)
         self._emergency_stop = threading.Event()
+        self._safety_trace = None   # trace id of the hop that triggered the hold
         
         # Control parameters
         self.control_rate = 20  # Hz
-        self.monitor_rate = 10  # Hz
-        self.manual_deadzone = 0.1
+        self.monitor_rate = 20  # Hz, with control_rate: read input just before each control tick
+        self.safety_rate = 2    # Hz
+        self.watchdog_rate = 0.5  # Hz
         self.max_linear_speed = 0.8
         self.max_angular_speed = 0.6
 
+        metrics.gauge('mission_mode', 'Control mode (1 manual, 2 auto, 3 safety hold)').set_function(
+            lambda: self._mode.value)
+
     @property
     def mode(self) -> ControlMode:
-        """Thread-safe mode access"""
-        with self._mode_lock:
-            return self._mode
+        """Current mode (a single attribute read, never blocks)"""
+        return self._mode
 
     @mode.setter
     def mode(self, value: ControlMode):
-        """Thread-safe mode setting"""
+        """Thread-safe mode setting
+
+        The transition is handled after the lock is released, so a slow
+        _on_mode_change (it stops the drive) never blocks other writers.
+        """
         with self._mode_lock:
-            old_mode = self._mode
-            self._mode = value
-            if old_mode != value:
-                logger.info(f"Mode changed from {old_mode.name} to {value.name}")
-                self._on_mode_change(old_mode, value)
+            old_mode = self._swap_mode(value)
+        self._mode_changed(old_mode, value)
+
+    def _swap_mode(self, value: ControlMode) -> ControlMode:
+        """Store a new mode (caller holds _mode_lock); returns the old one"""
+        old_mode = self._mode
+        self._mode = value
+        if old_mode != value and self.blackboard is not None:
+            self.blackboard.publish(mode=value)
+        return old_mode
+
+    def _mode_changed(self, old_mode: ControlMode, new_mode: ControlMode):
+        """Transition handling after _swap_mode, outside _mode_lock"""
+        if old_mode != new_mode:
+            MODE_CHANGES.inc()
+            logger.info(f"Mode changed from {old_mode.name} to {new_mode.name}")
+            self._on_mode_change(old_mode, new_mode)
+
+    @property
+    def in_safety_hold(self) -> bool:
+        """A safety hold is active (until clear_safety_hold())"""
+        return self._emergency_stop.is_set()
 
     def start_mission(self) -> bool:
         """Start all mission systems with obstacle avoidance"""
@@ -71,34 +124,18 @@ class MissionControl:
         self._running = True
         self._emergency_stop.clear()
 
-        # Start component threads
-        threads_to_start = [
-            (self._autonomous_control_loop, "AutonomousControl"),
-            (self._gamepad_monitor, "GamepadMonitor"),
-            (self._safety_monitor, "SafetyMonitor"),
-            (self._obstacle_avoidance_thread, "ObstacleAvoidance")  # New thread
-        ]
+        # Periodic tasks share rate-group threads on one scheduler
+        self.scheduler = RateScheduler("Mission")
+        self.scheduler.add_task(self._gamepad_step, self.monitor_rate, "GamepadMonitor")
+        self.scheduler.add_task(self._control_step, self.control_rate, "BehaviorControl")
+        self.scheduler.add_task(self._safety_step, self.safety_rate, "SafetyMonitor")
+        self.scheduler.add_task(self._watchdog_step, self.watchdog_rate, "Watchdog")
 
         try:
-            for target, name in threads_to_start:
-                thread = threading.Thread(
-                    target=target,
-                    name=name,
-                    daemon=True
-                )
-                thread.start()
-                self._threads.append(thread)
-                logger.info(f"Started {name} thread")
-
-            # Watchdog thread
-            watchdog = threading.Thread(
-                target=self._watchdog,
-                name="Watchdog",
-                daemon=True
-            )
-            watchdog.start()
-            self._threads.append(watchdog)
-
+            if self.gamepad is not None:
+                self.gamepad.start()
+            self.scheduler.start()
+            logger.info(f"Started scheduler threads: {[t.name for t in self.scheduler.threads]}")
             return True
 
         except Exception as e:
@@ -106,118 +143,116 @@ class MissionControl:
             self.stop_mission()
             return False
 
-    def _autonomous_control_loop(self):
-        """Main autonomous control thread with obstacle awareness"""
-        control_interval = 1.0 / self.control_rate
-        next_time = time.time()
+    def attach_gamepad(self, gamepad):
+        """Use a gamepad that came online after construction"""
+        self.gamepad = gamepad
+        if self._running:
+            gamepad.start()
+        logger.info("Gamepad attached")
 
-        while self._running and not self._emergency_stop.is_set():
-            try:
-                if self.mode == ControlMode.AUTO:
-                    self.follow_target.update()
-                
-                # Maintain precise timing
-                next_time += control_interval
-                sleep_time = next_time - time.time()
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-                else:
-                    logger.warning(f"Control loop lagging by {-sleep_time:.3f}s")
-
-            except Exception as e:
-                logger.error(f"Autonomous control error: {e}")
-                self._trigger_safety_hold()
-
-    def _obstacle_avoidance_thread(self):
-        """Dedicated thread for obstacle avoidance"""
-        avoidance_interval = 0.1  # 10Hz
-        
-        while self._running and not self._emergency_stop.is_set():
-            try:
-                if self.mode in [ControlMode.AUTO, ControlMode.MANUAL]:
-                    self.obstacle_avoidance.avoid_obstacles()
-                time.sleep(avoidance_interval)
-                
-            except Exception as e:
-                logger.error(f"Obstacle avoidance error: {e}")
-                self._trigger_safety_hold()
+    def _control_step(self):
+        """Behaviour arbitration tick: one command reaches the drive system"""
+        if self._emergency_stop.is_set():
+            return
+        try:
+            mode = self.mode
+            if mode == ControlMode.SAFETY_HOLD:
+                return
+            state = RobotState(
+                mode=mode,
+                scan=self.obstacle_avoidance.latest_scan(),
+                frame=self.follow_target.latest_frame() if mode == ControlMode.AUTO else None,
+                manual_command=self._manual_command,
+                velocity=self.arbiter.last_command
+            )
+            command = self.arbiter.tick(state)
+            if command is not None and command is self._manual_command and self._manual_input \
+                    and self.gamepad is not None:
+                self.gamepad.record_latency(self._manual_input)
+        except Exception as e:
+            logger.error(f"Behavior control error: {e}")
+            self._trigger_safety_hold("behavior control error")
 
-    def _gamepad_monitor(self):
+    def _gamepad_step(self):
         """Gamepad input handling with mode control"""
-        monitor_interval = 1.0 / self.monitor_rate
-
-        while self._running and not self._emergency_stop.is_set():
-            try:
-                inputs = self.gamepad.get_input()
-                
-                # Mode toggle (using Triangle button as example)
-                if inputs.get('triangle', False):
-                    self._toggle_mode()
-                
-                # Emergency stop (using Circle button as example)
-                if inputs.get('circle', False):
-                    self._trigger_safety_hold()
-                
-                # Manual control
-                if self.mode == ControlMode.MANUAL:
-                    self._handle_manual_input(inputs)
-
-                time.sleep(monitor_interval)
+        if self.gamepad is None:
+            return
+        try:
+            # Edges accumulate between reads, so short presses are not missed
+            inputs = self.gamepad.read()
+
+            # A safety hold is only released by an explicit Options press
+            if self._emergency_stop.is_set():
+                if inputs.was_pressed('options') and self._running:
+                    self.clear_safety_hold()
+                return
+            
+            # Mode toggle (using Triangle button as example)
+            if inputs.was_pressed('triangle'):
+                self._toggle_mode()
+            
+            # Emergency stop (using Circle button as example)
+            if inputs.was_pressed('circle'):
+                self._trigger_safety_hold("gamepad stop button")
+            
+            # Manual control
+            if self.mode == ControlMode.MANUAL:
+                self._handle_manual_input(inputs)
 
-            except Exception as e:
-                logger.error(f"Gamepad monitor error: {e}")
-                time.sleep(1)
+        except Exception as e:
+            logger.error(f"Gamepad monitor error: {e}")
 
-    def _handle_manual_input(self, inputs: Dict[str, float]):
-        """Process manual control inputs with deadzone"""
+    def _handle_manual_input(self, inputs: GamepadState):
+        """Process manual control inputs (the gamepad applies the deadzone)"""
         try:
-            left_x = inputs.get('left_x', 0.0)
-            left_y = inputs.get('left_y', 0.0)
-            
-            # Apply deadzone
-            if abs(left_x) < self.manual_deadzone:
-                left_x = 0.0
-            if abs(left_y) < self.manual_deadzone:
-                left_y = 0.0
+            if not inputs.connected:
+                self._manual_command = None
+                self._manual_input = None
+                return
                 
             # Scale inputs
-            forward = left_y * self.max_linear_speed
-            turn = left_x * self.max_angular_speed
+            forward = inputs.left_y * self.max_linear_speed
+            turn = inputs.left_x * self.max_angular_speed
             
-            self.drive_system.set_velocity(
-                linear=forward,
-                angular=turn
-            )
+            if self._manual_input is None or inputs.seq != self._manual_input.seq:
+                self._manual_command = Command(forward, turn, 'manual')
+                self._manual_input = inputs
 
         except Exception as e:
             logger.error(f"Manual control error: {e}")
-            self.drive_system.stop()
+            self._manual_command = None
 
-    def _safety_monitor(self):
+    def _safety_step(self):
         """System health monitoring"""
-        while self._running:
-            try:
-                if self._emergency_stop.is_set():
-                    self.mode = ControlMode.SAFETY_HOLD
+        try:
+            if self._emergency_stop.is_set():
+                # The trace that triggered the hold continues on this thread
+                trace_id, self._safety_trace = self._safety_trace, None
+                with tracing.activate(trace_id):
+                    tracing.hop('safety_monitor')
+                    # Re-checked under the mode lock: clear_safety_hold()
+                    # may have released the hold since the check above
+                    with self._mode_lock:
+                        if not self._emergency_stop.is_set():
+                            return
+                        old_mode = self._swap_mode(ControlMode.SAFETY_HOLD)
+                    self._mode_changed(old_mode, ControlMode.SAFETY_HOLD)
                     self.drive_system.emergency_stop()
-                    time.sleep(1)
-                    continue
+                return
 
-                # Add additional safety checks here
-                time.sleep(0.5)
+            # Add additional safety checks here
 
-            except Exception as e:
-                logger.error(f"Safety monitor error: {e}")
-                self._trigger_safety_hold()
+        except Exception as e:
+            logger.error(f"Safety monitor error: {e}")
+            self._trigger_safety_hold("safety monitor error")
 
-    def _watchdog(self):
+    def _watchdog_step(self):
         """Thread health monitoring"""
-        while self._running:
-            dead_threads = [t.name for t in self._threads if not t.is_alive()]
-            if dead_threads:
-                logger.error(f"Critical threads dead: {dead_threads}")
-                self._trigger_safety_hold()
-            time.sleep(2)
+        threads = self.scheduler.threads
+        dead_threads = [t.name for t in threads if not t.is_alive()]
+        if dead_threads:
+            logger.error(f"Critical threads dead: {dead_threads}")
+            self._trigger_safety_hold(f"dead threads {dead_threads}")
 
     def _toggle_mode(self):
         """Toggle between AUTO and MANUAL modes"""
@@ -228,19 +263,48 @@ class MissionControl:
         new_mode = ControlMode.MANUAL if self.mode == ControlMode.AUTO else ControlMode.AUTO
         self.mode = new_mode
 
-    def _trigger_safety_hold(self):
-        """Initiate emergency procedures"""
+    def _trigger_safety_hold(self, reason="safety hold"):
+        """Initiate emergency procedures
+
+        The motors are zeroed and latched off right here, on the detecting
+        thread; the safety monitor then moves the mission into SAFETY_HOLD.
+        """
+        tracing.hop('safety_hold')
+        self.drive_system.trip(reason)
+        if self._emergency_stop.is_set():
+            return
+        SAFETY_HOLDS.inc()
+        self._safety_trace = tracing.current()
         self._emergency_stop.set()
         logger.critical("SAFETY HOLD ACTIVATED")
 
+    def clear_safety_hold(self, mode: ControlMode = ControlMode.MANUAL):
+        """Release a safety hold and the motor latch, resuming in mode
+
+        Clearing the hold and leaving SAFETY_HOLD is one step under the
+        mode lock, so the safety monitor cannot re-enter SAFETY_HOLD in
+        between and leave the mission stuck there with the hold cleared.
+        """
+        with self._mode_lock:
+            if not self._emergency_stop.is_set():
+                return
+            self._safety_trace = None
+            self._emergency_stop.clear()
+            old_mode = self._swap_mode(mode)
+        logger.warning(f"Safety hold cleared, resuming in {mode.name}")
+        self.drive_system.clear_trip()
+        self._mode_changed(old_mode, mode)
+
     def _on_mode_change(self, old_mode: ControlMode, new_mode: ControlMode):
         """Handle mode transition logic"""
         self.drive_system.stop()
         
+        self._manual_command = None
+        self._manual_input = None
+        self.arbiter.reset()
+        
         if new_mode == ControlMode.AUTO:
             logger.info("Initializing autonomous systems")
-            self.follow_target.reset()
-            self.obstacle_avoidance.reset()
 
     def stop_mission(self):
         """Graceful shutdown procedure"""
@@ -252,11 +316,9 @@ class MissionControl:
         self._emergency_stop.set()
 
         # Wait for threads to finish
-        for t in self._threads:
-            if t.is_alive():
-                t.join(timeout=1.0)
-                if t.is_alive():
-                    logger.warning(f"Thread {t.name} failed to stop")
+        self.scheduler.stop()
+        if self.gamepad is not None:
+            self.gamepad.stop()
 
         self.drive_system.stop()
         logger.info("Mission stopped cleanly")
@@ -0,0 +1,524 @@
+"""
+Optional multi-process runtime.
+
+With SCUTTLE_MULTIPROCESS=1, main.py splits the robot over four processes
+so perception no longer competes with the drive loop for one GIL:
+
+    control  drive loop, odometry and motors; executes velocity commands
+    lidar    lidar stream and obstacle check; trips the motors on obstacles
+    vision   camera capture and target tracking
+    main     mission control (behaviours, gamepad) and the supervisor
+
+Scans, frames, tracking results and velocity commands travel through
+ShmRing shared-memory ring buffers, so no data is pickled. The safety trip
+is a SharedFlag any process may set; the control process turns it into a
+latched motor trip, which stays until the mission clears it.
+The Supervisor restarts workers that exit or stop sending heartbeats, and
+losing the control or lidar process trips the motors first.
+
+On the fake backend each process simulates its own World, so the lidar
+does not see the robot move; the layout is then only for exercising the
+plumbing.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+from L2.L2_blackboard import BLACKBOARD
+from L2.L2_track_target import TrackResult
+from utils.lidar_scan import LidarScan
+from utils.logger import setup_logger
+from utils.scheduler import Rate
+from utils.shm_ring import ShmRing
+
+logger = logging.getLogger(__name__)
+
+# Command ring messages: (kind, linear, angular)
+COMMAND_VELOCITY, COMMAND_STOP, COMMAND_CLEAR = 0.0, 1.0, 2.0
+SECTORS = 8
+
+
+def _beat(heartbeats, index):
+    heartbeats[index] = time.monotonic()
+
+
+class SharedFlag:
+    """
+    Cross-process boolean that any process can set, clear or test
+
+    multiprocessing.Event guards its state with a lock that a killed
+    process can leave held, blocking every other process on its next
+    set(); this flag is a raw shared byte plus a semaphore that wakes a
+    waiter, neither of which a killed process can wedge.
+    """
+
+    def __init__(self, context):
+        self._value = context.RawValue('b', 0)
+        self._wake = context.Semaphore(0)
+
+    def set(self):
+        self._value.value = 1
+        self._wake.release()
+
+    def clear(self):
+        self._value.value = 0
+
+    def is_set(self):
+        return bool(self._value.value)
+
+    def wait(self, timeout=None):
+        """
+        Wait for a set() call (meant for a single waiting process)
+
+        Returns:
+            Whether the flag is set when the wait ends
+        """
+        self._wake.acquire(timeout=timeout)
+        return self.is_set()
+
+
+# -- workers (run in their own processes) -------------------------------------
+
+def control_worker(shared, heartbeats, index):
+    """Drive loop process: executes commands and owns the motor latch"""
+    setup_logger()
+    log = logging.getLogger('control_worker')
+    from L2.L2_odometry import OdometryService
+    from L3.L3_drive_mt import DriveSystem
+
+    commands = ShmRing.attach(shared['rings']['commands'])
+    trip_event, stop_event = shared['trip'], shared['stop']
+    odometry = OdometryService()
+    odometry.start()
+    drive_system = DriveSystem(odometry=odometry)
+    drive_system.start()
+    if trip_event.is_set():
+        drive_system.trip("tripped before the control process started")
+
+    def watch_trip():
+        # Woken by every set() of the shared flag, so a trip from any
+        # process reaches the motors without waiting for the command loop
+        while not stop_event.is_set():
+            if trip_event.wait(0.2) and not drive_system.tripped:
+                drive_system.trip("safety trip")
+
+    threading.Thread(target=watch_trip, name="TripWatch", daemon=True).start()
+    log.info("Control process running")
+    last = commands.head
+    try:
+        while not stop_event.is_set():
+            _beat(heartbeats, index)
+            shared['command_ready'].acquire(timeout=0.1)
+            head = commands.head
+            for seq in range(max(last + 1, head - commands.slots + 1), head + 1):
+                message = commands.read(seq)
+                if message is None:
+                    continue
+                kind, linear, angular = message.data
+                if kind == COMMAND_VELOCITY:
+                    drive_system.set_velocity(float(linear), float(angular))
+                elif kind == COMMAND_STOP:
+                    drive_system.stop()
+                elif kind == COMMAND_CLEAR and not trip_event.is_set():
+                    drive_system.clear_trip()
+            last = head
+    finally:
+        drive_system.emergency_stop()
+        odometry.stop()
+        commands.close()
+
+
+def lidar_worker(shared, heartbeats, index):
+    """Lidar process: publishes scans and obstacle summaries, trips on obstacles"""
+    setup_logger()
+    log = logging.getLogger('lidar_worker')
+    from L1.L1_lidar import Lidar
+    from L2.L2_obstacle import ObstacleDetector
+
+    scans = ShmRing.attach(shared['rings']['scans'])
+    obstacles = ShmRing.attach(shared['rings']['obstacles'])
+    trip_event, stop_event = shared['trip'], shared['stop']
+    lidar = Lidar(stream=True)
+    detector = ObstacleDetector(lidar)
+    max_points = scans.shape[-1]
+    log.info("Lidar process running")
+    last = 0
+    try:
+        while not stop_event.is_set():
+            _beat(heartbeats, index)
+            scan = lidar.wait_for_scan(newer_than=last, timeout=0.2)
+            if scan is None:
+                continue
+            last = scan.seq
+            scans.write(scan.data[:, :max_points], scan.timestamp)
+            min_dist = detector.get_min_distance(scan)
+            if min_dist < shared['safety_distance'] and not trip_event.is_set():
+                trip_event.set()
+                log.warning(f"Obstacle at {min_dist:.2f}m, motors tripped")
+            obstacles.write(np.concatenate(([min_dist], detector.get_obstacle_map(scan, SECTORS))),
+                            scan.timestamp)
+    finally:
+        lidar.stop()
+        scans.close()
+        obstacles.close()
+
+
+def vision_worker(shared, heartbeats, index):
+    """Vision process: publishes camera frames and tracking results"""
+    setup_logger()
+    log = logging.getLogger('vision_worker')
+    from L1.L1_camera import Camera
+    from L2.L2_track_target import TargetTracker
+
+    frames = ShmRing.attach(shared['rings']['frames'])
+    targets = ShmRing.attach(shared['rings']['targets'])
+    stop_event = shared['stop']
+    height, width = frames.shape[:2]
+    camera = Camera(width=width, height=height, grab=True)
+    tracker = TargetTracker()
+    log.info("Vision process running")
+    last = 0
+    warned = False
+    try:
+        while not stop_event.is_set():
+            _beat(heartbeats, index)
+            frame = camera.wait_for_frame(newer_than=last, timeout=0.2)
+            if frame is None:
+                continue
+            last = frame.seq
+            if frame.image.shape != frames.shape:
+                if not warned:
+                    log.error(f"Frame shape {frame.image.shape} does not match the ring {frames.shape}")
+                    warned = True
+                continue
+            frames.write(frame.image, frame.timestamp)
+            result = tracker.track(frame.image, frame.timestamp)
+            # (found, x, y, size, confidence, processing_time)
+            targets.write(np.array((1.0,) + tuple(result)) if result else np.zeros(6), frame.timestamp)
+    finally:
+        camera.stop()
+        frames.close()
+        targets.close()
+
+
+# -- supervision --------------------------------------------------------------
+
+class Worker:
+    """Bookkeeping for one supervised process"""
+
+    def __init__(self, name, target, args, critical, index):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.critical = critical
+        self.index = index
+        self.process = None
+        self.started = None
+        self.failures = deque()   # monotonic times of recent failures
+        self.restarts = 0
+        self.given_up = False
+
+
+class Supervisor:
+    """
+    Starts worker processes and restarts the ones that fail
+
+    A worker fails when its process exits or its heartbeat is older than
+    heartbeat_timeout (a worker gets startup_grace for its first beat). A
+    critical worker's failure calls on_failure(name, reason) before the
+    restart, which is where the runtime stops the motors. More than
+    max_restarts failures within restart_window leaves the worker down.
+    """
+
+    def __init__(self, context, stop_event, on_failure=None, heartbeat_timeout=1.0,
+                 startup_grace=15.0, max_restarts=5, restart_window=60.0, check_rate=10, max_workers=8):
+        self.context = context
+        self.stop_event = stop_event
+        self.on_failure = on_failure
+        self.heartbeat_timeout = heartbeat_timeout
+        self.startup_grace = startup_grace
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.check_rate = check_rate
+        self.heartbeats = context.Array('d', max_workers, lock=False)
+        self.workers = {}
+        self._thread = None
+        self._running = False
+
+    def add(self, name, target, args=(), critical=False):
+        """Register a worker; target is called as target(*args, heartbeats, index)"""
+        if len(self.workers) >= len(self.heartbeats):
+            raise ValueError("Too many workers")
+        self.workers[name] = Worker(name, target, args, critical, len(self.workers))
+
+    def _spawn(self, worker):
+        self.heartbeats[worker.index] = 0.0
+        worker.process = self.context.Process(
+            target=worker.target, args=worker.args + (self.heartbeats, worker.index),
+            name=worker.name, daemon=True)
+        worker.started = time.monotonic()
+        worker.process.start()
+        logger.info(f"Worker {worker.name} started (pid {worker.process.pid})")
+
+    def start(self):
+        self._running = True
+        for worker in self.workers.values():
+            self._spawn(worker)
+        self._thread = threading.Thread(target=self._monitor, name="Supervisor", daemon=True)
+        self._thread.start()
+
+    def _monitor(self):
+        rate = Rate(self.check_rate, name="Supervisor")
+        while self._running and not self.stop_event.is_set():
+            self.check()
+            rate.sleep()
+
+    def check(self):
+        """Detect and handle failed workers once"""
+        now = time.monotonic()
+        for worker in self.workers.values():
+            if worker.given_up or worker.process is None:
+                continue
+            beat = self.heartbeats[worker.index]
+            if not worker.process.is_alive():
+                self._fail(worker, f"exited with code {worker.process.exitcode}")
+            elif beat == 0.0 and now - worker.started > self.startup_grace:
+                self._fail(worker, f"no heartbeat within {self.startup_grace:.0f}s of starting")
+            elif beat and now - beat > self.heartbeat_timeout:
+                self._fail(worker, f"heartbeat {now - beat:.2f}s old")
+
+    def _fail(self, worker, reason):
+        logger.error(f"Worker {worker.name} failed: {reason}")
+        if worker.critical and self.on_failure is not None:
+            try:
+                self.on_failure(worker.name, reason)
+            except Exception as e:
+                logger.critical(f"Fail-safe for {worker.name} failed: {e}")
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(timeout=1.0)
+
+        now = time.monotonic()
+        worker.failures.append(now)
+        while worker.failures and now - worker.failures[0] > self.restart_window:
+            worker.failures.popleft()
+        if len(worker.failures) > self.max_restarts:
+            worker.given_up = True
+            logger.critical(f"Worker {worker.name} failed {len(worker.failures)} times "
+                            f"in {self.restart_window:.0f}s, not restarting")
+            return
+        worker.restarts += 1
+        self._spawn(worker)
+
+    def stop(self, timeout=2.0):
+        self._running = False
+        self.stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        for worker in self.workers.values():
+            if worker.process is not None:
+                worker.process.join(timeout=timeout)
+                if worker.process.is_alive():
+                    logger.warning(f"Worker {worker.name} did not stop, killing it")
+                    worker.process.kill()
+                    worker.process.join(timeout=timeout)
+
+    def status(self):
+        now = time.monotonic()
+        return {
+            worker.name: {
+                "pid": worker.process.pid if worker.process else None,
+                "alive": bool(worker.process and worker.process.is_alive()),
+                "restarts": worker.restarts,
+                "given_up": worker.given_up,
+                "heartbeat_age": now - self.heartbeats[worker.index] if self.heartbeats[worker.index] else None,
+            }
+            for worker in self.workers.values()
+        }
+
+
+# -- main-process side --------------------------------------------------------
+
+class RemoteDrive:
+    """DriveSystem stand-in forwarding commands to the control process"""
+
+    def __init__(self, commands, command_ready, trip_event, blackboard=BLACKBOARD):
+        self.commands = commands
+        self._command_ready = command_ready
+        self._trip = trip_event
+        self.blackboard = blackboard   # of this process; the drive loop's own is in control
+        self._lock = threading.Lock()   # the ring has a single writer
+
+    def _send(self, kind, linear=0.0, angular=0.0):
+        with self._lock:
+            self.commands.write(np.array((kind, linear, angular)))
+            if self.blackboard is not None:
+                self.blackboard.publish(command=(linear, angular))
+        self._command_ready.release()
+
+    def start(self):
+        pass
+
+    def set_velocity(self, linear: float, angular: float):
+        self._send(COMMAND_VELOCITY, linear, angular)
+
+    def stop(self):
+        self._send(COMMAND_STOP)
+
+    def emergency_stop(self):
+        self.trip("emergency stop")
+
+    def trip(self, reason="safety trip"):
+        """Trip the motors in the control process and latch them off"""
+        self._trip.set()
+
+    def clear_trip(self):
+        # Cleared here first so the control process does not re-trip on it
+        self._trip.clear()
+        self._send(COMMAND_CLEAR)
+
+    @property
+    def tripped(self):
+        return self._trip.is_set()
+
+
+class RemoteTracker:
+    """TargetTracker stand-in returning the vision process's latest result"""
+
+    def __init__(self, targets):
+        self.targets = targets
+        self.target_position = None
+        self.last_result = None
+
+    def track(self, frame=None, timestamp=None):
+        message = self.targets.latest()
+        if message is None:
+            return self.last_result
+        found, x, y, size, confidence, processing_time = message.data.tolist()
+        self.last_result = TrackResult(x, y, size, confidence, processing_time) if found else None
+        self.target_position = (x, y) if found else None
+        return self.last_result
+
+    def track_target(self, frame=None):
+        self.track(frame)
+        return self.target_position
+
+    def reset(self):
+        self.target_position = None
+        self.last_result = None
+
+
+class MultiprocessRuntime:
+    def __init__(self, frame_shape=(480, 640, 3), max_scan_points=1024, safety_distance=0.5,
+                 poll_rate=200, prefix=None):
+        """
+        Args:
+            frame_shape: Camera frame shape (height, width, 3)
+            max_scan_points: Largest scan the scan ring holds
+            safety_distance: Obstacle distance (m) at which the lidar process trips
+            poll_rate: Rate (Hz) at which the main process polls the rings
+            prefix: Shared memory name prefix (default unique per process)
+        """
+        prefix = prefix or f"scuttle{os.getpid()}"
+        self.poll_rate = poll_rate
+        self.context = multiprocessing.get_context('spawn')
+        self.rings = {
+            'commands': ShmRing(f"{prefix}_commands", (3,), np.float64, slots=32, create=True),
+            'scans': ShmRing(f"{prefix}_scans", (3, max_scan_points), np.float32, slots=8,
+                             variable=True, create=True),
+            'obstacles': ShmRing(f"{prefix}_obstacles", (1 + SECTORS,), np.float64, create=True),
+            'frames': ShmRing(f"{prefix}_frames", frame_shape, np.uint8, slots=4, create=True),
+            'targets': ShmRing(f"{prefix}_targets", (6,), np.float64, create=True),
+        }
+        self.trip_event = SharedFlag(self.context)
+        self.stop_event = SharedFlag(self.context)
+        self.command_ready = self.context.Semaphore(0)
+        shared = {
+            "rings": {name: ring.spec() for name, ring in self.rings.items()},
+            "trip": self.trip_event,
+            "stop": self.stop_event,
+            "command_ready": self.command_ready,
+            "safety_distance": safety_distance,
+        }
+        self.supervisor = Supervisor(self.context, self.stop_event, on_failure=self._fail_safe)
+        self.supervisor.add('control', control_worker, (shared,), critical=True)
+        self.supervisor.add('lidar', lidar_worker, (shared,), critical=True)
+        self.supervisor.add('vision', vision_worker, (shared,))
+        self.drive_system = RemoteDrive(self.rings['commands'], self.command_ready, self.trip_event)
+        self._motor = None
+
+    def _fail_safe(self, name, reason):
+        """A critical worker failed: latch the trip, and stop the motors here if control is gone"""
+        self.trip_event.set()
+        if name == 'control':
+            from L1.L1_motor import MotorController
+            if self._motor is None:
+                self._motor = MotorController()
+            self._motor.stop(emergency=True)
+        logger.critical(f"Motors tripped: {name} worker {reason}")
+
+    def start(self):
+        self.supervisor.start()
+
+    def stop(self):
+        self.supervisor.stop()
+        for ring in self.rings.values():
+            ring.close()
+
+    def tracker(self):
+        return RemoteTracker(self.rings['targets'])
+
+    def attach(self, hub):
+        """Publish the worker rings on a SensorHub as 'lidar', 'camera' and 'obstacles'"""
+        hub.add_source('lidar', self._reader('scans', lambda m: LidarScan(m.data, m.timestamp, m.seq)),
+                       self.poll_rate)
+        hub.add_source('camera', self._reader('frames', lambda m: m.data), self.poll_rate)
+        hub.add_source('obstacles', self._reader('obstacles', lambda m: m.data), self.poll_rate)
+
+    def _reader(self, ring_name, decode):
+        ring = self.rings[ring_name]
+        last = [0]
+
+        def read():
+            message = ring.latest(newer_than=last[0])
+            if message is None:
+                return None
+            last[0] = message.seq
+            return decode(message)
+        return read
+
+
+def run_multiprocess():
+    """Run the robot with the multi-process layout until interrupted"""
+    from L1.L1_gamepad import Gamepad
+    from L2.L2_sensor_hub import SensorHub
+    from L3.L3_mission_control import MissionControl
+    from L3.L3_startup import Startup
+
+    runtime = MultiprocessRuntime()
+    # The gamepad is optional, as in main.py: it joins whenever it comes up
+    startup = Startup()
+    startup.add('gamepad', lambda: Gamepad(deadzone=0.1), timeout=1.0)
+    try:
+        runtime.start()
+        startup.start()
+        with SensorHub() as hub:
+            runtime.attach(hub)
+            mission = MissionControl(runtime.drive_system, sensor_hub=hub, open_gamepad=False)
+            mission.follow_target.tracker = runtime.tracker()
+            startup.on_ready('gamepad', mission.attach_gamepad)
+            mission.start_mission()
+            try:
+                while True:
+                    # A trip from a worker puts the mission into safety hold,
+                    # which is where it gets cleared
+                    if runtime.trip_event.is_set() and not mission.in_safety_hold:
+                        mission._trigger_safety_hold("tripped by a worker process")
+                    time.sleep(0.05)
+            finally:
+                mission.stop_mission()
+    finally:
+        runtime.stop()
@@ -0,0 +1,218 @@
+"""
+Parallel robot bring-up.
+
+Each device is opened by a factory running on its own thread, started as
+soon as the devices it requires are ready, so a slow device (a gamepad
+that is still pairing, a camera driver loading cv2) does not hold up the
+others. Critical devices (motors, lidar) must be ready within their
+timeout or startup fails; non-critical ones that miss their timeout are
+reported late and handed over through on_ready() whenever they do come
+up. Startup also times named phases and reports both.
+
+Example:
+    startup = Startup()
+    startup.add('lidar', lambda: Lidar(stream=True), critical=True, timeout=5)
+    startup.add('camera', Camera, timeout=3)
+    startup.start()
+    startup.wait_critical()
+    lidar = startup.get('lidar')
+    startup.on_ready('camera', hub.add_camera)
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from utils.lazy_import import IMPORT_TIMES
+
+PENDING, READY, FAILED = 'pending', 'ready', 'failed'
+
+
+class StartupError(RuntimeError):
+    """A critical device failed or missed its timeout"""
+
+
+class DeviceTask:
+    """One device being brought up"""
+
+    def __init__(self, name, factory, requires=(), critical=False, timeout=5.0):
+        self.name = name
+        self.factory = factory
+        self.requires = tuple(requires)
+        self.critical = critical
+        self.timeout = timeout
+        self.status = PENDING
+        self.late = False          # missed its timeout (non-critical only)
+        self.value = None
+        self.error = None
+        self.started = None        # monotonic times
+        self.finished = None
+        self.done = threading.Event()
+        self.callbacks = []
+
+
+class Startup:
+    def __init__(self, name='startup'):
+        self.logger = logging.getLogger(name)
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._origin = time.monotonic()
+        self._started = None
+        self.phases = {}   # phase name -> (start, end) offsets from creation, seconds
+
+    def add(self, name, factory, requires=(), critical=False, timeout=5.0):
+        """
+        Register a device
+
+        Args:
+            name: Device name, used for requires and lookups
+            factory: Callable opening the device; the values of the
+                required devices are passed as keyword arguments
+            requires: Names of devices that must be ready first
+            critical: Startup fails if this device is not ready in time
+            timeout: Seconds from start() for the device to be ready
+        """
+        if name in self._tasks:
+            raise ValueError(f"Device {name} already added")
+        self._tasks[name] = DeviceTask(name, factory, requires, critical, timeout)
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block of the startup sequence"""
+        start = time.monotonic() - self._origin
+        try:
+            yield
+        finally:
+            self.phases[name] = (start, time.monotonic() - self._origin)
+
+    def start(self):
+        """Start bringing every registered device up concurrently"""
+        self._started = time.monotonic()
+        for task in self._tasks.values():
+            unknown = [r for r in task.requires if r not in self._tasks]
+            if unknown:
+                raise ValueError(f"Device {task.name} requires unknown {unknown}")
+        for task in self._tasks.values():
+            threading.Thread(target=self._bring_up, args=(task,), name=f"Startup-{task.name}",
+                             daemon=True).start()
+
+    def _bring_up(self, task):
+        kwargs = {}
+        for name in task.requires:
+            required = self._tasks[name]
+            required.done.wait()
+            if required.status != READY:
+                self._finish(task, FAILED, error=f"requires {name}, which failed")
+                return
+            kwargs[name] = required.value
+        task.started = time.monotonic()
+        try:
+            value = task.factory(**kwargs)
+        except Exception as e:
+            self._finish(task, FAILED, error=e)
+            return
+        self._finish(task, READY, value=value)
+
+    def _finish(self, task, status, value=None, error=None):
+        with self._lock:
+            task.finished = time.monotonic()
+            task.late = task.finished > self._started + task.timeout
+            task.status = status
+            task.value = value
+            task.error = error
+            callbacks = task.callbacks if status == READY else []
+            task.callbacks = []
+        task.done.set()
+        elapsed = task.finished - self._started
+        if status == READY:
+            note = " (late)" if task.late else ""
+            self.logger.info(f"{task.name} ready after {elapsed:.2f}s{note}")
+        else:
+            log = self.logger.critical if task.critical else self.logger.warning
+            log(f"{task.name} failed after {elapsed:.2f}s: {error}")
+        for callback in callbacks:
+            self._call(task, callback)
+
+    def _call(self, task, callback):
+        try:
+            callback(task.value)
+        except Exception as e:
+            self.logger.error(f"{task.name} ready callback failed: {e}")
+
+    def wait_critical(self):
+        """
+        Wait for the critical devices, each until its own deadline
+
+        Non-critical devices still pending at their deadline by then are
+        marked late and keep coming up in the background.
+
+        Raises:
+            StartupError: If a critical device failed or timed out
+        """
+        failures = []
+        for task in sorted(self._tasks.values(), key=lambda t: t.timeout):
+            if not task.critical:
+                continue
+            if not task.done.wait(max(0.0, self._started + task.timeout - time.monotonic())):
+                failures.append(f"{task.name} not ready after {task.timeout:.1f}s")
+            elif task.status != READY:
+                failures.append(f"{task.name}: {task.error}")
+        now = time.monotonic()
+        for task in self._tasks.values():
+            if not task.critical and not task.done.is_set() and now >= self._started + task.timeout:
+                task.late = True
+                self.logger.warning(f"{task.name} not ready after {task.timeout:.1f}s, continuing without it")
+        if failures:
+            raise StartupError("; ".join(failures))
+
+    def get(self, name, timeout=0.0):
+        """Device value if ready (waiting up to timeout), else None"""
+        task = self._tasks[name]
+        task.done.wait(timeout)
+        return task.value if task.status == READY else None
+
+    def on_ready(self, name, callback):
+        """Call callback(device) once name is ready (now, if it already is)"""
+        task = self._tasks[name]
+        with self._lock:
+            if task.status == PENDING:
+                task.callbacks.append(callback)
+                return
+        if task.status == READY:
+            self._call(task, callback)
+
+    def report(self):
+        """Timings of every phase and device, in milliseconds"""
+        def ms(t):
+            return None if t is None or self._started is None else round((t - self._started) * 1e3, 1)
+        devices = {}
+        for task in self._tasks.values():
+            devices[task.name] = {
+                "status": task.status,
+                "critical": task.critical,
+                "late": task.late,
+                "start_ms": ms(task.started),
+                "ready_ms": ms(task.finished),
+                "elapsed_ms": None if task.started is None or task.finished is None
+                else round((task.finished - task.started) * 1e3, 1),
+                "error": None if task.error is None else str(task.error),
+            }
+        return {
+            "phases": {name: {"start_ms": round(s * 1e3, 1), "elapsed_ms": round((e - s) * 1e3, 1)}
+                       for name, (s, e) in self.phases.items()},
+            "devices": devices,
+            "deferred_imports_ms": {name: round(t * 1e3, 1) for name, t in IMPORT_TIMES.items()},
+        }
+
+    def log_report(self):
+        report = self.report()
+        lines = [f"  phase {name}: {p['elapsed_ms']:.1f} ms (at {p['start_ms']:.1f} ms)"
+                 for name, p in report["phases"].items()]
+        for name, d in report["devices"].items():
+            timing = f"{d['elapsed_ms']} ms, ready at {d['ready_ms']} ms" if d['ready_ms'] is not None else "pending"
+            flags = " critical" if d["critical"] else ""
+            flags += " late" if d["late"] else ""
+            lines.append(f"  device {name}: {d['status']}{flags} ({timing})")
+        for name, t in report["deferred_imports_ms"].items():
+            lines.append(f"  import {name}: {t:.1f} ms")
+        self.logger.info("Startup report:\n" + "\n".join(lines))
+        return report
@@ -0,0 +1,167 @@
+"""
+Control-loop timing benchmark.
+
+Runs DriveController.driving_thread (50 Hz) and MissionControl._control_step
+(20 Hz behaviour arbitration, on a RateScheduler) headless on the fake
+backend while the lidar, camera and gamepad threads and optional GIL-bound
+load threads compete with them. Reports period, jitter and overruns of both
+loops, the latency from DriveSystem.set_velocity to the motor write and
+the number of PWM pin writes issued and skipped.
+
+Usage (from the repository root):
+    python -m bench.bench_control_loops --duration 10 --load-threads 2
+    python -m bench.bench_control_loops --compare bench_baseline.json
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+from utils.scheduler import RateScheduler
+from bench.bench_utils import (
+    use_fake_backend, summarize, summarize_periods, GilLoad,
+    write_results, compare, print_results
+)
+
+
+class ActuationProbe:
+    """
+    Wraps the drive controller to timestamp its ticks and motor writes
+
+    Ticks are the fixed-rate deadlines of DriveController.rate (early
+    wake-ups for new commands are not ticks); command latency is measured
+    from set_velocity to the set_speed call carrying that command.
+    """
+
+    def __init__(self, controller):
+        self.motor = controller.motor
+        self.ticks = []
+        self.latencies = []
+        self._pending = {}
+        self._set_speed = self.motor.set_speed
+        self.motor.set_speed = self.set_speed
+        self._wait = controller.rate.wait
+        controller.rate.wait = self.wait
+
+    def wait(self, event):
+        woken = self._wait(event)
+        if not woken:
+            self.ticks.append(time.perf_counter())
+        return woken
+
+    def expect(self, left_speed, issued):
+        self._pending[round(left_speed, 6)] = issued
+
+    def set_speed(self, speeds):
+        now = time.perf_counter()
+        self._set_speed(speeds)
+        issued = self._pending.pop(round(speeds[0], 6), None)
+        if issued is not None:
+            self.latencies.append(now - issued)
+
+
+class NullDrive:
+    """Drive system stand-in that ignores velocity commands"""
+
+    def set_velocity(self, linear=0.0, angular=0.0):
+        pass
+
+
+def run(duration, load_threads, command_interval):
+    world = use_fake_backend(time_scale=1.0)
+    from L1.L1_lidar import Lidar
+    from L1.L1_camera import Camera
+    from L2.L2_sensor_hub import SensorHub
+    from L3.L3_drive_mt import DriveSystem
+    from L3.L3_mission_control import MissionControl
+
+    lidar = Lidar(stream=True)
+    camera = Camera()
+    hub = SensorHub()
+    hub.add_lidar(lidar)
+    hub.add_camera(camera)
+    drive_system = DriveSystem()
+    mission = MissionControl(drive_system, sensor_hub=hub)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    probe = ActuationProbe(drive_system.controller)
+    mission_ticks = []
+    # The arbiter does its full work each tick but its commands are
+    # discarded, so the commander alone drives the latency measurement
+    mission.arbiter.drive_system = NullDrive()
+
+    def control_step():
+        mission._control_step()
+        mission_ticks.append(time.perf_counter())
+
+    running = True
+
+    def commander():
+        k = 0
+        while running:
+            k += 1
+            linear = 0.2 + (k % 500) * 1e-4
+            left, _ = drive_system.controller.kinematics.compute_wheel_speeds(linear, 0.0)
+            probe.expect(left, time.perf_counter())
+            drive_system.set_velocity(linear, 0.0)
+            time.sleep(random.uniform(0.5, 1.5) * command_interval)
+
+    scheduler = RateScheduler("Bench")
+    scheduler.add_task(mission._gamepad_step, mission.monitor_rate, "GamepadMonitor")
+    scheduler.add_task(control_step, mission.control_rate, "BehaviorControl")
+
+    hub.start()
+    mission.gamepad.start()
+    drive_system.start()
+    scheduler.start()
+    threads = [
+        threading.Thread(target=commander, daemon=True),
+    ]
+    with GilLoad(load_threads):
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        running = False
+        scheduler.stop()
+        drive_system.controller._running = False
+        for thread in threads:
+            thread.join(timeout=1.0)
+
+    mission.gamepad.stop()
+    hub.stop()
+    camera.stop()
+    lidar.stop()
+    world.close()
+    return {
+        "drive_loop": summarize_periods(probe.ticks, 1.0 / 50),
+        "mission_loop": summarize_periods(mission_ticks, 1.0 / mission.control_rate),
+        "command_latency_ms": summarize(probe.latencies),
+        "motor_writes": probe.motor.write_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to run')
+    parser.add_argument('--load-threads', type=int, default=2,
+                        help='pure-Python threads competing for the GIL')
+    parser.add_argument('--command-interval', type=float, default=0.05,
+                        help='mean seconds between velocity commands')
+    parser.add_argument('--output', default='bench_control_loops.json',
+                        help='where to write the JSON results')
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    args = parser.parse_args()
+
+    params = vars(args).copy()
+    params.pop('output')
+    params.pop('compare')
+    results = run(args.duration, args.load_threads, args.command_interval)
+    document = write_results(args.output, 'control_loops', params, results)
+    print_results(results)
+    if args.compare:
+        compare(document, args.compare)
+
+
+if __name__ == "__main__":
+    main()
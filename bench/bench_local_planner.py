@@ -0,0 +1,126 @@
+"""
+Local planner benchmark.
+
+Times DWAPlanner.plan on fake-backend lidar scans (the target is under
+5 ms per cycle on the Pi with ~500 scan points and several hundred
+candidates), then drives the simulated robot around the default room
+in lock-step for a deterministic closed-loop check: a constant cruise
+command, overridden by ObstacleAvoidance whenever it engages. Reports
+planning and avoidance tick time (including the obstacle-memory grid),
+collisions, distance driven and the closest approach to a wall.
+
+Usage (from the repository root):
+    python -m bench.bench_local_planner --points 500 --cycles 500
+    python -m bench.bench_local_planner --compare bench_baseline.json
+"""
+import argparse
+import logging
+import time
+import numpy as np
+from bench.bench_utils import use_fake_backend, summarize, write_results, compare, print_results
+
+
+def time_planner(points_per_scan, cycles):
+    world = use_fake_backend(time_scale=None)
+    from L1.L1_fake import FakeRPLidar
+    from L2.L2_obstacle import ObstacleDetector
+    from L2.L2_local_planner import DWAPlanner
+
+    lidar = FakeRPLidar(world, points_per_scan=points_per_scan)
+    detector = ObstacleDetector(None)
+    planner = DWAPlanner()
+    rng = np.random.default_rng(0)
+    timings, admissible = [], []
+    for _ in range(cycles):
+        world.x, world.y = rng.uniform(-1.5, 1.5), rng.uniform(-1.0, 1.0)
+        world.theta = rng.uniform(-np.pi, np.pi)
+        points = detector.get_points(lidar.scan())
+        velocity = (rng.uniform(0, planner.max_speed), rng.uniform(-1, 1))
+        started = time.perf_counter()
+        plan = planner.plan(points, velocity)
+        timings.append(time.perf_counter() - started)
+        admissible.append(plan.admissible)
+    world.close()
+    return {
+        "plan_ms": summarize(timings),
+        "candidates": planner.v_samples * planner.omega_samples,
+        "mean_admissible": float(np.mean(admissible)),
+    }
+
+
+def closed_loop(duration, cruise, control_rate=20):
+    world = use_fake_backend(time_scale=None, pose=(-1.0, 0.0, 0.0))
+    from utils.constants import MAX_SPEED
+    from utils.lidar_scan import LidarScan
+    from L1.L1_fake import FakeRPLidar
+    from L2.L2_kinematics import Kinematics
+    from L2.L2_odometry import OdometryService
+    from L2.L2_sensor_hub import SensorHub
+    from L3.L3_avoid_obstacles import ObstacleAvoidance
+    from L3.L3_behavior import Command, RobotState
+
+    lidar = FakeRPLidar(world)
+    kinematics = Kinematics()
+    # Sampled once per tick, so the avoidance grid maps scans at the odometry pose
+    odometry = OdometryService(blackboard=None)
+    avoidance = ObstacleAvoidance(None, SensorHub(), odometry=odometry)
+    logging.getLogger().setLevel(logging.ERROR)
+    dt = 1.0 / control_rate
+    command = Command(0.0, 0.0)
+    engaged = 0
+    clearances = []
+    tick_times = []
+    travelled = 0.0
+    for k in range(int(duration * control_rate)):
+        odometry.sample()
+        scan = LidarScan.from_points(lidar.scan(), world.time, k + 1)
+        state = RobotState(time=world.time, scan=scan, velocity=command)
+        started = time.perf_counter()
+        command = avoidance.tick(state) or Command(cruise / MAX_SPEED, 0.0, 'cruise')
+        tick_times.append(time.perf_counter() - started)
+        engaged += command.source == 'avoidance'
+        left, right = kinematics.compute_wheel_speeds(command.linear, command.angular)
+        world.set_duty(0, left)
+        world.set_duty(1, right)
+        x, y = world.x, world.y
+        world.step(dt)
+        travelled += float(np.hypot(world.x - x, world.y - y))
+        clearances.append(world._clearance(world.x, world.y) - world.robot_radius)
+    world.close()
+    return {
+        "ticks": int(duration * control_rate),
+        "tick_ms": summarize(tick_times),
+        "avoidance_ticks": int(engaged),
+        "collisions": world.collisions,
+        "min_clearance_m": float(min(clearances)),
+        "distance_driven_m": travelled,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=500, help='lidar points per scan')
+    parser.add_argument('--cycles', type=int, default=500, help='planning cycles to time')
+    parser.add_argument('--duration', type=float, default=60.0, help='simulated seconds of driving')
+    parser.add_argument('--cruise', type=float, default=0.3, help='cruise speed in m/s')
+    parser.add_argument('--output', default='bench_local_planner.json',
+                        help='where to write the JSON results')
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    args = parser.parse_args()
+
+    params = vars(args).copy()
+    params.pop('output')
+    params.pop('compare')
+    results = {
+        "planner": time_planner(args.points, args.cycles),
+        "closed_loop": closed_loop(args.duration, args.cruise),
+    }
+    document = write_results(args.output, 'local_planner', params, results)
+    print_results(results)
+    if args.compare:
+        compare(document, args.compare)
+
+
+if __name__ == "__main__":
+    main()
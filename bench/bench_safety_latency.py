@@ -0,0 +1,164 @@
+"""
+Safety stop latency benchmark.
+
+Runs the drive system and mission control on the fake backend while a
+commander thread keeps sending velocity commands and GIL-bound load
+threads compete for the interpreter, then repeatedly trips the safety
+hold and measures the time from the trip to every PWM pin reading zero.
+
+Two paths are measured:
+    fast:    MissionControl._trigger_safety_hold on the detecting thread,
+             which zeroes the motors and latches them off itself
+    monitor: only the safety hold event is set, and the motors stop when
+             the safety monitor task next runs (the path before the fast
+             path existed)
+
+After each fast trip the pins are watched for the hold time; any command
+that reaches a pin while latched counts as a leak.
+
+Usage (from the repository root):
+    python -m bench.bench_safety_latency --trials 200 --load-threads 4
+    python -m bench.bench_safety_latency --compare bench_baseline.json
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+from bench.bench_utils import use_fake_backend, summarize, GilLoad, write_results, compare, print_results
+
+
+class PinProbe:
+    """Wraps a PWM output device to timestamp the writes reaching it"""
+
+    def __init__(self, device):
+        self.device = device
+        self.zeroed_at = None      # perf_counter of the latest write of 0
+        self.nonzero_writes = 0
+
+    @property
+    def value(self):
+        return self.device.value
+
+    @value.setter
+    def value(self, value):
+        self.device.value = value
+        if value == 0:
+            self.zeroed_at = time.perf_counter()
+        else:
+            self.nonzero_writes += 1
+
+    def close(self):
+        self.device.close()
+
+
+def wait_for(condition, timeout, poll=0.0005):
+    end = time.perf_counter() + timeout
+    while time.perf_counter() < end:
+        if condition():
+            return True
+        time.sleep(poll)
+    return condition()
+
+
+def run(trials, monitor_trials, load_threads, command_rate, hold):
+    world = use_fake_backend(time_scale=1.0)
+    from L3.L3_drive_mt import DriveSystem
+    from L3.L3_mission_control import MissionControl, ControlMode
+
+    drive_system = DriveSystem()
+    motor = drive_system.controller.motor
+    probes = [PinProbe(device) for device in motor.motors]
+    motor.motors = probes
+    mission = MissionControl(drive_system, open_gamepad=False)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    running = True
+
+    def commander():
+        while running:
+            drive_system.set_velocity(0.3, 0.2)
+            time.sleep(1.0 / command_rate)
+
+    def moving():
+        return any(p.value != 0 for p in probes)
+
+    def zeroed_since(started):
+        return all(p.zeroed_at is not None and p.zeroed_at >= started for p in probes)
+
+    fast, monitor = [], []
+    leaks = stuck = missed = 0
+    drive_system.start()
+    mission.start_mission()
+    command_thread = threading.Thread(target=commander, name="Commander", daemon=True)
+    with GilLoad(load_threads):
+        command_thread.start()
+        for trial in range(trials + monitor_trials):
+            mission.clear_safety_hold(ControlMode.MANUAL)
+            if not wait_for(moving, 1.0):
+                missed += 1
+                continue
+            time.sleep(random.uniform(0.0, 0.02))
+            if trial < trials:
+                before = sum(p.nonzero_writes for p in probes)
+                started = time.perf_counter()
+                mission._trigger_safety_hold("bench")
+                if not zeroed_since(started) or moving():
+                    missed += 1
+                    continue
+                fast.append(max(p.zeroed_at for p in probes) - started)
+                # The latch must hold while the commander keeps sending
+                time.sleep(hold)
+                leaks += sum(p.nonzero_writes for p in probes) - before
+                stuck += moving()
+            else:
+                started = time.perf_counter()
+                mission._emergency_stop.set()
+                # Without the latch the commander may restart the motors
+                # right after, so only the zero writes are waited for
+                if wait_for(lambda: zeroed_since(started), 2.0):
+                    monitor.append(max(p.zeroed_at for p in probes) - started)
+                else:
+                    missed += 1
+        running = False
+        command_thread.join(timeout=1.0)
+
+    mission.stop_mission()
+    drive_system.controller._running = False
+    world.close()
+    return {
+        "fast_path_ms": summarize(fast),
+        "monitor_path_ms": summarize(monitor),
+        "latch": {"leaked_writes": leaks, "moving_after_hold": stuck, "missed_trials": missed},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trials', type=int, default=200, help='fast-path trips')
+    parser.add_argument('--monitor-trials', type=int, default=10,
+                        help='trips stopped by the safety monitor alone')
+    parser.add_argument('--load-threads', type=int, default=4,
+                        help='pure-Python threads competing for the GIL')
+    parser.add_argument('--command-rate', type=float, default=200.0,
+                        help='velocity commands per second from the commander thread')
+    parser.add_argument('--hold', type=float, default=0.05,
+                        help='seconds the latch is watched after each trip')
+    parser.add_argument('--output', default='bench_safety_latency.json',
+                        help='where to write the JSON results')
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    args = parser.parse_args()
+
+    params = vars(args).copy()
+    params.pop('output')
+    params.pop('compare')
+    results = run(args.trials, args.monitor_trials, args.load_threads, args.command_rate, args.hold)
+    document = write_results(args.output, 'safety_latency', params, results)
+    print_results(results)
+    if args.compare:
+        compare(document, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Wheel speed step-response benchmark.
+
+Drives a simulated motor pair through a speed step, once open loop (duty
+scaled from MAX_SPEED, as DriveController does without odometry) and
+once through SpeedControl. The motor model is deliberately not what the
+feedforward assumes: each wheel has its own gain (a sagging battery, a
+stiffer gearbox), a static-friction deadband and a first-order lag, and
+half-way through a load step slows both wheels. Wheel speeds are measured
+the way the robot measures them, as 16-bit encoder counts sampled at
+100 Hz through OdometryService.
+
+Reports rise time (10-90 %), overshoot, settling time (within --band of
+the target after the step), steady-state error and the speed lost to the
+load step, per controller and averaged over both wheels.
+
+Usage (from the repository root):
+    python -m bench.bench_speed_step --target 0.3
+    python -m bench.bench_speed_step --compare bench_baseline.json
+"""
+import argparse
+import logging
+import math
+import numpy as np
+from bench.bench_utils import write_results, compare, print_results
+
+
+class MotorModel:
+    """First-order DC motor pair with per-wheel gain, deadband and load"""
+
+    def __init__(self, gains=(0.44, 0.52), deadband=0.06, tau=0.08):
+        """
+        Args:
+            gains: Steady-state wheel speed (m/s) at full duty, per wheel
+            deadband: Duty below which static friction holds the wheel
+            tau: Time constant (s)
+        """
+        self.gains = np.asarray(gains, dtype=np.float64)
+        self.deadband = deadband
+        self.tau = tau
+        self.load = 0.0             # fraction of speed lost to load
+        self.duty = np.zeros(2)
+        self.speed = np.zeros(2)    # m/s at the rim
+        self.distance = np.zeros(2)
+
+    def step(self, dt):
+        effective = np.sign(self.duty) * np.maximum(np.abs(self.duty) - self.deadband, 0.0) \
+            / (1.0 - self.deadband)
+        target = effective * self.gains * (1.0 - self.load)
+        self.speed += (target - self.speed) * (1.0 - math.exp(-dt / self.tau))
+        self.distance += self.speed * dt
+
+
+def step_metrics(times, speeds, target, step_time, band):
+    """Rise time, overshoot, settling time and steady-state error of one wheel"""
+    after = times >= step_time
+    t, v = times[after] - step_time, speeds[after]
+    rise = None
+    above10, above90 = np.flatnonzero(v >= 0.1 * target), np.flatnonzero(v >= 0.9 * target)
+    if len(above10) and len(above90):
+        rise = float(t[above90[0]] - t[above10[0]])
+    outside = np.flatnonzero(np.abs(v - target) > band * target)
+    settling = None
+    if not len(outside):
+        settling = 0.0
+    elif outside[-1] < len(t) - 1:
+        settling = float(t[outside[-1] + 1])
+    tail = t >= t[-1] - 0.5
+    return {
+        "rise_time_s": rise,
+        "overshoot_pct": float(max(v.max() - target, 0.0) / target * 100),
+        "settling_time_s": settling,
+        "steady_state_error_pct": float(abs(v[tail].mean() - target) / target * 100),
+    }
+
+
+def run(closed_loop, target, duration, load, band, control_rate=50, odometry_rate=100, sim_dt=0.001):
+    from utils.constants import MAX_SPEED, WHEEL_RADIUS, ENCODER_RESOLUTION
+    from L2.L2_odometry import OdometryService
+    from L2.L2_speed_control import SpeedControl
+
+    motors = MotorModel()
+    odometry = OdometryService(rate_hz=odometry_rate, encoders=(None, None))
+    control = SpeedControl(rate_hz=control_rate)
+    counts_per_meter = ENCODER_RESOLUTION / (2 * math.pi * WHEEL_RADIUS)
+    step_time, load_time = 0.2, duration / 2
+    control_every = int(round(1.0 / (control_rate * sim_dt)))
+    odometry_every = int(round(1.0 / (odometry_rate * sim_dt)))
+
+    def measure(k):
+        # Encoder counts in 16 bits, as the robot reads them
+        counts = np.round(motors.distance * counts_per_meter).astype(np.int64) % ENCODER_RESOLUTION
+        odometry.update(k * sim_dt, counts.tolist())
+
+    times, speeds = [], []
+    load_speed = None
+    for k in range(int(duration / sim_dt)):
+        now = k * sim_dt
+        if k % odometry_every == 0:
+            measure(k)
+        if k % control_every == 0:
+            wheel_target = target if now >= step_time else 0.0
+            if closed_loop:
+                snapshot = odometry.snapshot()
+                motors.duty[:] = control.update((snapshot.left_speed, snapshot.right_speed),
+                                                wheel_target)
+            else:
+                motors.duty[:] = wheel_target / MAX_SPEED
+        if now >= load_time and load_speed is None:
+            motors.load = load
+            load_speed = motors.speed.copy()
+        motors.step(sim_dt)
+        times.append(now)
+        speeds.append(motors.speed.copy())
+
+    times, speeds = np.array(times), np.array(speeds)
+    before_load = times < load_time
+    per_wheel = [step_metrics(times[before_load], speeds[before_load, i], target, step_time, band)
+                 for i in (0, 1)]
+    result = {}
+    for key in per_wheel[0]:
+        values = [m[key] for m in per_wheel]
+        result[key] = None if None in values else float(np.mean(values))
+    # Speed lost to the load step, averaged over the last 0.5 s
+    tail = times >= times[-1] - 0.5
+    result["load_drop_pct"] = float((target - speeds[tail].mean()) / target * 100)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', type=float, default=0.3, help='step target wheel speed (m/s)')
+    parser.add_argument('--duration', type=float, default=4.0, help='simulated seconds per run')
+    parser.add_argument('--load', type=float, default=0.2, help='fraction of speed lost to the load step')
+    parser.add_argument('--band', type=float, default=0.05, help='settling band, fraction of target')
+    parser.add_argument('--output', default='bench_speed_step.json',
+                        help='where to write the JSON results')
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    params = vars(args).copy()
+    params.pop('output')
+    params.pop('compare')
+    results = {
+        "open_loop": run(False, args.target, args.duration, args.load, args.band),
+        "pid": run(True, args.target, args.duration, args.load, args.band),
+    }
+    document = write_results(args.output, 'speed_step', params, results)
+    print_results(results)
+    if args.compare:
+        compare(document, args.compare)
+
+
+if __name__ == "__main__":
+    main()
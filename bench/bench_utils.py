@@ -0,0 +1,139 @@
+"""
+Shared helpers for the benchmark scripts: statistics, synthetic load and
+machine-readable result files that can be compared between commits.
+"""
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+import numpy as np
+
+
+def use_fake_backend(time_scale=1.0, **world_args):
+    """Route every L1 driver to the fake backend and install a fresh World"""
+    os.environ['SCUTTLE_BACKEND'] = 'fake'
+    from L1.L1_fake import World, set_world
+    return set_world(World(time_scale=time_scale, **world_args))
+
+
+def summarize(values, scale=1e3):
+    """mean/p50/p99/max of values, scaled (seconds to ms by default)"""
+    values = np.asarray(values, dtype=np.float64) * scale
+    if values.size == 0:
+        return {"count": 0}
+    return {
+        "count": int(values.size),
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+    }
+
+
+def summarize_periods(timestamps, nominal_period, overrun_factor=1.5):
+    """
+    Timing statistics of a periodic loop from its tick timestamps
+
+    Jitter is the absolute deviation of each period from nominal; a period
+    longer than overrun_factor * nominal counts as an overrun.
+    """
+    periods = np.diff(np.asarray(timestamps, dtype=np.float64))
+    if periods.size == 0:
+        return {"ticks": len(timestamps)}
+    jitter = np.abs(periods - nominal_period) * 1e3
+    return {
+        "ticks": len(timestamps),
+        "nominal_ms": nominal_period * 1e3,
+        "period_mean_ms": float(periods.mean() * 1e3),
+        "rate_hz": float(1.0 / periods.mean()),
+        "jitter_p50_ms": float(np.percentile(jitter, 50)),
+        "jitter_p99_ms": float(np.percentile(jitter, 99)),
+        "jitter_max_ms": float(jitter.max()),
+        "overruns": int((periods > overrun_factor * nominal_period).sum()),
+    }
+
+
+class GilLoad:
+    """Threads running pure-Python busy work to compete for the GIL"""
+
+    def __init__(self, threads=2, duty=1.0):
+        """
+        Args:
+            threads: Number of load threads
+            duty: Fraction of each 10 ms slot spent busy (0-1)
+        """
+        self.count = threads
+        self.duty = duty
+        self._running = False
+        self._threads = []
+
+    def _run(self):
+        while self._running:
+            end = time.perf_counter() + 0.01 * self.duty
+            x = 0
+            while time.perf_counter() < end:
+                x += 1
+            if self.duty < 1.0:
+                time.sleep(0.01 * (1.0 - self.duty))
+
+    def __enter__(self):
+        self._running = True
+        for i in range(self.count):
+            thread = threading.Thread(target=self._run, name=f"GilLoad-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._running = False
+        for thread in self._threads:
+            thread.join()
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, name, params, results):
+    """Write a benchmark result file tagged with commit and platform"""
+    document = {
+        "benchmark": name,
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": params,
+        "results": results,
+    }
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2)
+    return document
+
+
+def compare(current, baseline_path):
+    """Print the relative change of every numeric result against a baseline file"""
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    print(f"Compared with {baseline.get('commit')} ({baseline_path}):")
+    for section, values in current["results"].items():
+        for key, value in values.items():
+            old = baseline["results"].get(section, {}).get(key)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            change = (value - old) / old * 100 if old else float('inf') if value else 0.0
+            print(f"  {section}.{key}: {old:.3f} -> {value:.3f} ({change:+.1f}%)")
+
+
+def print_results(results):
+    for section, values in results.items():
+        print(f"[{section}]")
+        for key, value in values.items():
+            print(f"  {key}: {value:.3f}" if isinstance(value, float) else f"  {key}: {value}")
@@ -1,11 +1,12 @@
-import time
+import os
 import signal
 import logging
-from L3.L3_drive_mt import DriveSystem
-from L3.L3_mission_control import MissionControl
-from L1.L1_lidar import Lidar
-from L2.L2_obstacle import ObstacleDetector
 from utils.logger import setup_logger
+from L3.L3_startup import Startup
+from utils.lazy_import import lazy_import, preload
+from utils.metrics import MetricsServer, SnapshotWriter
+from utils import tracing
+from utils.constants import MULTIPROCESS_ENV
 
 def shutdown_handler(signum, frame):
     logging.warning("Shutdown signal received")
@@ -13,6 +14,12 @@ def shutdown_handler(signum, frame):
         mission.stop_mission()
     exit(0)
 
+def stop_devices(startup):
+    """Stop every device that came up, and any that are still coming up once ready"""
+    startup.on_ready('drive', lambda drive_system: drive_system.emergency_stop())
+    for name in ('odometry', 'lidar', 'camera', 'gamepad'):
+        startup.on_ready(name, lambda device: device.stop())
+
 if __name__ == "__main__":
     # Initialize systems
     setup_logger()
@@ -21,36 +28,103 @@ if __name__ == "__main__":
     # Register shutdown handlers
     signal.signal(signal.SIGINT, shutdown_handler)
     signal.signal(signal.SIGTERM, shutdown_handler)
+
+    if os.environ.get(MULTIPROCESS_ENV) == '1':
+        # Control, lidar and vision in their own processes
+        from L3.L3_multiprocess import run_multiprocess
+        run_multiprocess()
+        exit(0)
+
+    # Prometheus metrics on localhost, and a snapshot on disk every 10 s
+    try:
+        MetricsServer(port=9108).start()
+    except OSError as e:
+        logger.warning(f"Metrics endpoint unavailable: {e}")
+    snapshots = SnapshotWriter('metrics.json', interval=10.0).start()
     
+    startup = Startup()
     try:
         logger.info("Starting SCUTTLE robot systems")
-        
-        # Hardware layer
-        with Lidar() as lidar:
-            # Logic layer
-            obstacle_detector = ObstacleDetector(lidar)
-            
-            # Mission control layer
-            drive_system = DriveSystem()
-            mission = MissionControl(drive_system)
-            
-            # Start systems
-            drive_system.start()
-            mission.start_mission()
-            
-            # Main monitoring loop
-            while True:
-                scan = lidar.get_scan()
-                if scan:
-                    min_dist = obstacle_detector.get_min_distance(scan)
-                    if min_dist < 0.5:  # Safety threshold
-                        logger.warning(f"Obstacle detected at {min_dist:.2f}m")
-                        mission._trigger_safety_hold()
-                
-                time.sleep(0.1)  # Monitoring rate
-                
+
+        # Layers are imported here so the import cost shows in the startup report
+        with startup.phase('imports'):
+            from L1.L1_lidar import Lidar
+            from L1.L1_camera import Camera
+            from L1.L1_gamepad import Gamepad
+            from L2.L2_blackboard import BLACKBOARD, ScanSummary
+            from L2.L2_obstacle import ObstacleDetector
+            from L2.L2_odometry import OdometryService
+            from L2.L2_sensor_hub import SensorHub
+            from L3.L3_drive_mt import DriveSystem
+            from L3.L3_mission_control import MissionControl
+
+        with SensorHub() as hub:
+            def open_odometry():
+                odometry = OdometryService(sensor_hub=hub)
+                odometry.start()
+                return odometry
+
+            def open_drive(odometry):
+                # Wheel speeds are closed-loop on the encoders
+                drive_system = DriveSystem(odometry=odometry)
+                drive_system.start()
+                return drive_system
+
+            # Hardware layer: devices come up concurrently, each opened once
+            # and shared via the hub. Motion and lidar are required; the
+            # camera and gamepad join whenever they are ready.
+            startup.add('lidar', lambda: Lidar(stream=True), critical=True, timeout=5.0)
+            startup.add('odometry', open_odometry, critical=True, timeout=2.0)
+            startup.add('drive', open_drive, requires=('odometry',), critical=True, timeout=3.0)
+            startup.add('camera', lambda: Camera(width=640, height=480, fps=30), timeout=3.0)
+            startup.add('gamepad', lambda: Gamepad(deadzone=0.1), timeout=1.0)
+            startup.add('vision', lambda: preload(lazy_import('cv2')), timeout=3.0)
+            try:
+                with startup.phase('devices'):
+                    startup.start()
+                    startup.wait_critical()
+                lidar = startup.get('lidar')
+                drive_system = startup.get('drive')
+
+                hub.add_lidar(lidar)
+                safety_scans = hub.subscribe('lidar', mode='latest')
+                startup.on_ready('camera', hub.add_camera)
+
+                # Logic and mission control layers
+                with startup.phase('mission'):
+                    obstacle_detector = ObstacleDetector(lidar)
+                    mission = MissionControl(drive_system, sensor_hub=hub, open_gamepad=False)
+                    startup.on_ready('gamepad', mission.attach_gamepad)
+                    mission.start_mission()
+                with startup.phase('first_scan'):
+                    sample = safety_scans.get(timeout=2.0)
+                startup.log_report()
+
+                # Main monitoring loop: wakes on every new scan
+                while True:
+                    if sample:
+                        scan = sample.value
+                        # Trace each scan through the safety chain to the motors
+                        with tracing.activate(scan.seq):
+                            tracing.hop('scan', timestamp=scan.timestamp)
+                            tracing.hop('scan_received')
+                            min_dist = obstacle_detector.get_min_distance(scan)
+                            if min_dist < 0.5:  # Safety threshold
+                                logger.warning(f"Obstacle detected at {min_dist:.2f}m")
+                                mission._trigger_safety_hold(f"obstacle at {min_dist:.2f}m")
+                        BLACKBOARD.publish(scan=ScanSummary(scan.seq, scan.timestamp, len(scan), min_dist))
+                    sample = safety_scans.get(timeout=1.0)
+            finally:
+                if 'mission' in locals():
+                    mission.stop_mission()
+                # Also runs when startup fails, so devices already up are stopped
+                stop_devices(startup)
+                snapshots.stop()
+                tracing.TRACER.export('trace.json')
+                logger.info(f"Obstacle-to-stop latency (ms): {tracing.TRACER.latency_report('scan', 'motor_stop')}")
+
     except Exception as e:
         logger.critical(f"Fatal error: {e}", exc_info=True)
         if 'mission' in locals():
             mission.stop_mission()
-        exit(1)
\ No newline at end of file
+        exit(1)
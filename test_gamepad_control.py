@@ -19,8 +19,7 @@ def main():
         
         while True:
             # Check for exit button
-            pygame.event.pump()
-            if any(gamepad.joystick.get_button(i) for i in range(gamepad.joystick.get_numbuttons())):
+            if any(gamepad.state().buttons):
                 logger.info("Stop button pressed")
                 break
             
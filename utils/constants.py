@@ -6,3 +6,13 @@ MAX_SPEED = 0.5    # Maximum speed in m/s
 MOTOR_PINS = [17, 18, 22, 23]  # GPIO pins for motors 1-4
 PWM_FREQUENCY = 500            # PWM frequency in Hz
 
+# Wheel and encoder geometry
+WHEEL_RADIUS = 0.041           # Wheel radius in meters
+ENCODER_ADDRESSES = (0x40, 0x41)  # I2C addresses of left/right wheel encoders
+ENCODER_RESOLUTION = 2 ** 16   # Encoder counts per wheel revolution
+
+# Hardware backend ('hardware' or 'fake'), overridable per driver
+BACKEND_ENV = 'SCUTTLE_BACKEND'
+
+# Set to 1 to run control, lidar and vision in separate processes (L3_multiprocess)
+MULTIPROCESS_ENV = 'SCUTTLE_MULTIPROCESS'
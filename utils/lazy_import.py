@@ -0,0 +1,62 @@
+"""
+Deferred imports for heavy optional dependencies.
+
+lazy_import('cv2') returns a stand-in module that performs the real import
+on first attribute access, so importing a module that only needs cv2 on
+some code paths does not pay for it up front. The time spent in each
+deferred import is kept in IMPORT_TIMES for the startup report.
+"""
+import importlib
+import sys
+import threading
+import time
+import types
+
+IMPORT_TIMES = {}   # module name -> seconds spent importing it
+
+
+class LazyModule(types.ModuleType):
+    """Module stand-in that imports the real module on first use"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_lazy_lock'] = threading.Lock()
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is not None:
+            return module
+        with self.__dict__['_lazy_lock']:
+            module = self.__dict__['_lazy_module']
+            if module is None:
+                started = time.monotonic()
+                module = importlib.import_module(self.__name__)
+                IMPORT_TIMES.setdefault(self.__name__, time.monotonic() - started)
+                self.__dict__['_lazy_module'] = module
+        return module
+
+    @property
+    def loaded(self):
+        return self.__dict__['_lazy_module'] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name):
+    """The module if it is already imported, otherwise a LazyModule for it"""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+def preload(module):
+    """Import a lazy module now (e.g. on a startup thread); returns the real module"""
+    return module._load() if isinstance(module, LazyModule) else module
@@ -0,0 +1,91 @@
+import time
+import numpy as np
+
+# Column order of LidarScan.data
+ANGLE, RANGE, QUALITY = 0, 1, 2
+
+
+class LidarScan:
+    """
+    Compact column-store for one 360° lidar scan.
+
+    Angles are wrapped to [-180, 180) degrees so that 0° is straight ahead
+    and the front cone never straddles the 0/360° seam. Ranges are in mm,
+    as delivered by the RPLIDAR. The underlying (3, N) float32 array is
+    read-only so a scan can be shared between threads without copying.
+    """
+
+    __slots__ = ('data', 'timestamp', 'seq', '_cache')
+
+    def __init__(self, data, timestamp=None, seq=0):
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        if data.ndim != 2 or data.shape[0] != 3:
+            raise ValueError(f"Scan data must have shape (3, N), got {data.shape}")
+        data.flags.writeable = False
+        self.data = data
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+        self.seq = seq
+        self._cache = {}
+
+    @classmethod
+    def from_points(cls, points, timestamp=None, seq=0):
+        """
+        Build a scan from rplidar (quality, angle, distance) tuples
+
+        Args:
+            points: Iterable of (quality, angle_deg, distance_mm)
+            timestamp: Acquisition time (time.monotonic), defaults to now
+            seq: Scan sequence number
+        """
+        raw = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+        data = np.empty((3, raw.shape[0]), dtype=np.float32)
+        data[ANGLE] = raw[:, 1]
+        data[RANGE] = raw[:, 2]
+        data[QUALITY] = raw[:, 0]
+        wrap_angles(data[ANGLE], out=data[ANGLE])
+        return cls(data, timestamp, seq)
+
+    @property
+    def angles(self):
+        """Beam angles in degrees, wrapped to [-180, 180)"""
+        return self.data[ANGLE]
+
+    @property
+    def ranges(self):
+        """Beam ranges in mm"""
+        return self.data[RANGE]
+
+    @property
+    def qualities(self):
+        """Beam return quality"""
+        return self.data[QUALITY]
+
+    def memoize(self, key, compute):
+        """Return the cached result for key, computing it on first use"""
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = compute()
+            return value
+
+    def to_points(self):
+        """Convert back to a list of rplidar-style (quality, angle, distance) tuples"""
+        angles = np.remainder(self.angles, 360.0)
+        return list(zip(self.qualities.tolist(), angles.tolist(), self.ranges.tolist()))
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    def __bool__(self):
+        return self.data.shape[1] > 0
+
+    def __repr__(self):
+        return f"LidarScan(seq={self.seq}, points={len(self)}, timestamp={self.timestamp:.3f})"
+
+
+def wrap_angles(angles, out=None):
+    """Wrap angles in degrees to [-180, 180)"""
+    out = np.add(angles, 180.0, out=out)
+    np.remainder(out, 360.0, out=out)
+    out -= 180.0
+    return out
@@ -1,18 +1,60 @@
+import atexit
 import csv
 from datetime import datetime
 import logging
+import threading
+import time
+
 class Logger:
-    def __init__(self, filename="log.csv"):
+    """
+    CSV row logger
+
+    Rows are buffered in memory with a raw time.time() stamp and written
+    through one open file every flush_rows rows (and on flush/close/exit),
+    instead of opening the file and formatting a datetime per row. The file
+    contents are unchanged: a datetime column followed by the data.
+    """
+
+    def __init__(self, filename="log.csv", flush_rows=100):
         self.filename = filename
+        self.flush_rows = flush_rows
+        self._rows = []
+        self._file = None
+        self._writer = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
 
     def log_data(self, data):
-        with open(self.filename, "a") as file:
-            writer = csv.writer(file)
-            writer.writerow([datetime.now()] + data)
+        with self._lock:
+            self._rows.append((time.time(), data))
+            if len(self._rows) >= self.flush_rows:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._rows:
+            return
+        if self._file is None:
+            self._file = open(self.filename, "a", newline="")
+            self._writer = csv.writer(self._file)
+        self._writer.writerows([datetime.fromtimestamp(t)] + list(data) for t, data in self._rows)
+        self._file.flush()
+        self._rows = []
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._writer = None
 
 
 def setup_logger():
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
\ No newline at end of file
+    )
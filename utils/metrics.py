@@ -0,0 +1,331 @@
+"""
+Runtime metrics: counters, gauges and fixed-bucket histograms.
+
+Recording is cheap enough for hot paths and takes no lock: each thread
+that records into a metric gets its own shard (a small list only that
+thread writes), and a scrape sums the shards. Metrics live in a Registry
+(REGISTRY by default) and are created once, typically at module or
+constructor level:
+
+    SCANS = metrics.counter('lidar_scans_total', 'Scans received')
+    SCANS.inc()
+
+The registry renders the Prometheus text format, served on localhost by
+MetricsServer, and SnapshotWriter periodically writes the same values to
+a JSON file.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import get_ident
+
+logger = logging.getLogger(__name__)
+
+# Seconds; suits loop periods, I/O and reaction latencies on the Pi
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class _Sharded:
+    """Per-thread value shards of one metric"""
+
+    def __init__(self, size):
+        self._size = size
+        # Keyed by thread ident: a dead thread's shard is inherited by the
+        # next thread given its ident, so the totals keep its counts
+        self._by_thread = {}
+        self._shards_lock = threading.Lock()   # only taken when a thread first records
+
+    def _new_shard(self):
+        shard = [0] * self._size
+        with self._shards_lock:
+            self._by_thread[get_ident()] = shard
+        return shard
+
+    def _totals(self):
+        with self._shards_lock:
+            shards = list(self._by_thread.values())
+        totals = [0] * self._size
+        for shard in shards:
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help='', labels=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(sorted((labels or {}).items()))
+
+
+class Counter(Metric, _Sharded):
+    """Monotonically increasing count"""
+    kind = 'counter'
+
+    def __init__(self, name, help='', labels=None):
+        Metric.__init__(self, name, help, labels)
+        _Sharded.__init__(self, 1)
+
+    def inc(self, amount=1):
+        shard = self._by_thread.get(get_ident()) or self._new_shard()
+        shard[0] += amount
+
+    @property
+    def value(self):
+        return self._totals()[0]
+
+
+class Gauge(Metric):
+    """Value that goes up and down; set() or computed at scrape time"""
+    kind = 'gauge'
+
+    def __init__(self, name, help='', labels=None):
+        super().__init__(name, help, labels)
+        self._value = 0.0
+        self._function = None
+
+    def set(self, value):
+        self._value = value
+
+    def set_function(self, function):
+        """Read the value from function() whenever the gauge is collected"""
+        self._function = function
+
+    @property
+    def value(self):
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return float('nan')
+        return self._value
+
+
+class Histogram(Metric, _Sharded):
+    """Counts of observations in fixed buckets, plus their sum"""
+    kind = 'histogram'
+
+    def __init__(self, name, help='', labels=None, buckets=DEFAULT_BUCKETS):
+        Metric.__init__(self, name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Shard layout: one count per bucket, the +Inf count, then the sum
+        _Sharded.__init__(self, len(self.buckets) + 2)
+
+    def observe(self, value):
+        shard = self._by_thread.get(get_ident()) or self._new_shard()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of a with block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    @property
+    def value(self):
+        """dict with cumulative bucket counts, count and sum"""
+        totals = self._totals()
+        cumulative, running = [], 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return {
+            "buckets": dict(zip([str(b) for b in self.buckets] + ['+Inf'], cumulative)),
+            "count": running,
+            "sum": totals[-1],
+        }
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}   # (name, labels) -> Metric
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = cls(name, help, labels, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help='', labels=None):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help='', labels=None):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help='', labels=None, buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def collect(self):
+        """Registered metrics, grouped by name in registration order"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        groups = {}
+        for metric in metrics:
+            groups.setdefault(metric.name, []).append(metric)
+        return groups
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for name, metrics in self.collect().items():
+            first = metrics[0]
+            if first.help:
+                lines.append(f"# HELP {name} {_escape_help(first.help)}")
+            lines.append(f"# TYPE {name} {first.kind}")
+            for metric in metrics:
+                value = metric.value
+                if metric.kind == 'histogram':
+                    for le, count in value["buckets"].items():
+                        lines.append(f"{name}_bucket{_labels(metric.labels, ('le', le))} {count}")
+                    lines.append(f"{name}_sum{_labels(metric.labels)} {_number(value['sum'])}")
+                    lines.append(f"{name}_count{_labels(metric.labels)} {value['count']}")
+                else:
+                    lines.append(f"{name}{_labels(metric.labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Every metric's current value, keyed by name with labels"""
+        return {
+            f"{metric.name}{_labels(metric.labels)}": metric.value
+            for metrics in self.collect().values()
+            for metric in metrics
+        }
+
+
+def _escape_help(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _number(value):
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help='', labels=None):
+    return REGISTRY.counter(name, help, labels)
+
+
+def gauge(name, help='', labels=None):
+    return REGISTRY.gauge(name, help, labels)
+
+
+def histogram(name, help='', labels=None, buckets=DEFAULT_BUCKETS):
+    return REGISTRY.histogram(name, help, labels, buckets)
+
+
+class MetricsServer:
+    """Serves /metrics in Prometheus text format on a background thread"""
+
+    def __init__(self, registry=REGISTRY, host='127.0.0.1', port=9108):
+        """
+        Args:
+            registry: Registry to expose
+            host: Interface to bind; localhost keeps it off the network
+            port: TCP port (0 picks a free one, see .port after start())
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics at http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class SnapshotWriter:
+    """Writes registry snapshots to a JSON file at a fixed interval"""
+
+    def __init__(self, path='metrics.json', interval=10.0, registry=REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="MetricsSnapshot", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.write()
+
+    def write(self):
+        """Write one snapshot, replacing the file atomically"""
+        document = {"timestamp": time.time(), "metrics": self.registry.snapshot()}
+        temp = f"{self.path}.tmp"
+        try:
+            with open(temp, 'w') as file:
+                json.dump(document, file, indent=1)
+            os.replace(temp, self.path)
+        except OSError as e:
+            logger.error(f"Metrics snapshot failed: {e}")
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.write()
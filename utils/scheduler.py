@@ -0,0 +1,241 @@
+import logging
+import os
+import threading
+import time
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+OVERRUN_POLICIES = ('catch_up', 'skip')
+
+
+class TaskStats:
+    """Timing statistics for one periodic task"""
+
+    def __init__(self, name, rate_hz):
+        self.name = name
+        self.rate_hz = rate_hz
+        self.runs = 0
+        self.errors = 0
+        self.overruns = 0        # missed deadlines (Rate) or runs longer than a period (task)
+        self.skipped = 0         # ticks dropped by the 'skip' policy
+        self.max_lateness = 0.0  # seconds a tick started after its deadline
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.overrun_metric = metrics.counter('task_overruns_total', 'Missed deadlines and over-period runs',
+                                              {'task': name})
+        self.duration_metric = None   # registered on the first record(); Rate stats never record
+
+    def record(self, duration):
+        self.runs += 1
+        self.total_duration += duration
+        if duration > self.max_duration:
+            self.max_duration = duration
+        if self.duration_metric is None:
+            self.duration_metric = metrics.histogram('task_duration_seconds', 'Run time of periodic tasks',
+                                                     {'task': self.name})
+        self.duration_metric.observe(duration)
+        if duration > 1.0 / self.rate_hz:
+            self.overruns += 1
+            self.overrun_metric.inc()
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "rate_hz": self.rate_hz,
+            "runs": self.runs,
+            "errors": self.errors,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "max_lateness_ms": self.max_lateness * 1e3,
+            "mean_duration_ms": self.total_duration / self.runs * 1e3 if self.runs else 0.0,
+            "max_duration_ms": self.max_duration * 1e3,
+        }
+
+
+class Rate:
+    """
+    Drift-free loop pacing on the monotonic clock
+
+    Deadlines are kept on a fixed grid (start + k * period), so time spent
+    in the loop body does not accumulate as drift. When a tick is missed,
+    'catch_up' runs the missed ticks back to back (at most max_catch_up of
+    them) and 'skip' drops them and realigns to the next grid point.
+    """
+
+    def __init__(self, rate_hz, name=None, overrun='skip', max_catch_up=5):
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"Unknown overrun policy: {overrun}")
+        self.period = 1.0 / rate_hz
+        self.overrun = overrun
+        self.max_catch_up = max_catch_up
+        self.stats = TaskStats(name or f"{rate_hz:g}Hz", rate_hz)
+        self._next = time.monotonic() + self.period
+
+    def reset(self):
+        """Restart the grid from now"""
+        self._next = time.monotonic() + self.period
+
+    def remaining(self):
+        """Seconds until the next deadline (negative if already late)"""
+        return self._next - time.monotonic()
+
+    def sleep(self):
+        """
+        Sleep until the next deadline
+
+        Returns:
+            True if the deadline was met, False on overrun
+        """
+        self.stats.runs += 1
+        now = time.monotonic()
+        lateness = now - self._next
+        if lateness <= 0:
+            time.sleep(-lateness)
+            self._next += self.period
+            return True
+        self._late(lateness)
+        return False
+
+    def _late(self, lateness):
+        """Account for a missed deadline and move the grid on"""
+        stats = self.stats
+        stats.overruns += 1
+        stats.overrun_metric.inc()
+        if lateness > stats.max_lateness:
+            stats.max_lateness = lateness
+        missed = int(lateness // self.period)
+        if self.overrun == 'catch_up' and missed < self.max_catch_up:
+            self._next += self.period
+        else:
+            stats.skipped += missed
+            self._next += (missed + 1) * self.period
+
+    def wait(self, event):
+        """
+        Wait for the next deadline or until event is set, whichever is first
+
+        Returns:
+            True if woken by the event (the deadline is not consumed),
+            False when the deadline was reached
+        """
+        remaining = self._next - time.monotonic()
+        if remaining > 0 and event.wait(remaining):
+            return True
+        self.sleep()
+        return False
+
+
+def set_thread_priority(priority):
+    """
+    Give the calling thread SCHED_FIFO real-time priority (Linux only)
+
+    Needs CAP_SYS_NICE or root; failure is logged and ignored.
+    """
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        return True
+    except (AttributeError, OSError) as e:
+        logger.warning(f"Could not set real-time priority {priority}: {e}")
+        return False
+
+
+class RateScheduler:
+    """
+    Runs periodic tasks in rate groups
+
+    Tasks with the same rate share one thread and run in the order they
+    were added; each group is paced by a Rate. Exceptions from a task are
+    logged and counted, and do not stop the group.
+    """
+
+    def __init__(self, name='scheduler', priority=None):
+        """
+        Args:
+            name: Prefix for the group thread names
+            priority: Optional SCHED_FIFO priority for the group threads
+        """
+        self.name = name
+        self.priority = priority
+        self._groups = {}   # rate_hz -> (overrun policy, [(fn, TaskStats)])
+        self._threads = []
+        self._running = False
+        self._stop_event = threading.Event()
+
+    def add_task(self, fn, rate_hz, name=None, overrun='skip'):
+        """
+        Register fn to be called at rate_hz
+
+        The overrun policy of the first task added at a rate applies to
+        its whole group.
+        """
+        stats = TaskStats(name or getattr(fn, '__name__', 'task'), rate_hz)
+        policy, tasks = self._groups.setdefault(rate_hz, (overrun, []))
+        tasks.append((fn, stats))
+        if self._running:
+            logger.warning(f"Task {stats.name} added while running; starts on next start()")
+        return stats
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._stop_event = threading.Event()
+        for rate_hz, (policy, tasks) in sorted(self._groups.items(), reverse=True):
+            thread = threading.Thread(
+                target=self._run_group,
+                args=(rate_hz, policy, tasks),
+                name=f"{self.name}-{rate_hz:g}Hz",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        self._stop_event.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=timeout)
+                if thread.is_alive():
+                    logger.warning(f"Thread {thread.name} failed to stop")
+        self._threads = []
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def threads(self):
+        return list(self._threads)
+
+    def _run_group(self, rate_hz, policy, tasks):
+        if self.priority is not None:
+            set_thread_priority(self.priority)
+        stop_event = self._stop_event
+        rate = Rate(rate_hz, name=f"{self.name}-{rate_hz:g}Hz", overrun=policy)
+        while not stop_event.is_set():
+            for fn, stats in tasks:
+                started = time.monotonic()
+                try:
+                    fn()
+                except Exception as e:
+                    stats.errors += 1
+                    logger.error(f"Task {stats.name} failed: {e}")
+                stats.record(time.monotonic() - started)
+            overruns = rate.stats.overruns
+            if rate.wait(stop_event):
+                break
+            if rate.stats.overruns != overruns:
+                # The whole group was late: charge it to every task in it
+                for _, stats in tasks:
+                    stats.skipped = rate.stats.skipped
+                    stats.max_lateness = max(stats.max_lateness, rate.stats.max_lateness)
+
+    def stats(self):
+        """Per-task statistics as a list of dicts"""
+        return [
+            stats.as_dict()
+            for _, tasks in self._groups.values()
+            for _, stats in tasks
+        ]
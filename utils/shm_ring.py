@@ -0,0 +1,177 @@
+"""
+Shared-memory ring buffer for passing arrays between processes.
+
+One writer appends fixed-shape numpy messages to a ring of slots in a
+multiprocessing.shared_memory block; readers in other processes attach to
+the block by name and copy messages out, so nothing is pickled. Every
+message gets a sequence number (1, 2, ...), kept in the block so a
+restarted writer carries on from where the old one stopped.
+
+Slots are guarded seqlock-style: the writer invalidates a slot's sequence
+number before overwriting it and publishes the new number afterwards, and
+a reader keeps its copy only if the slot held the same number before and
+after copying. A reader that falls more than one ring behind loses the
+overwritten messages.
+
+Example:
+    ring = ShmRing('scuttle_cmd', (3,), np.float64, create=True)
+    ring.write(np.array([0.0, 0.2, 0.1]))
+    # in another process
+    ring = ShmRing.attach(spec)        # spec = ring.spec()
+    message = ring.latest(newer_than=last_seq)
+"""
+import time
+from multiprocessing import shared_memory
+from typing import NamedTuple
+import numpy as np
+
+_ALIGN = 64
+
+
+class Message(NamedTuple):
+    seq: int
+    timestamp: float     # time.monotonic() from the writer (system-wide on Linux)
+    data: np.ndarray     # private copy
+
+
+def _open(name, create, size=0):
+    """
+    SharedMemory block; only the creator is tracked for cleanup
+
+    Before Python 3.13 attaching always registers the block with the
+    resource tracker, which multiprocessing children share with their
+    parent, so the repeated registration is harmless there.
+    """
+    if create:
+        return shared_memory.SharedMemory(name=name, create=True, size=size)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class ShmRing:
+    def __init__(self, name, shape, dtype=np.float32, slots=8, variable=False, create=False):
+        """
+        Args:
+            name: Shared memory block name, unique on the machine
+            shape: Shape of one message
+            dtype: numpy dtype of the messages
+            slots: Messages kept before the oldest is overwritten
+            variable: Messages may be shorter than shape along the last
+                axis (e.g. scans with fewer points); the length is stored
+            create: Create the block (the owner) rather than attach to it
+        """
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        self.variable = variable
+        self._owner = create
+
+        # Header: head seq, then per slot its seq, length and timestamp
+        header = 8 * (1 + 3 * slots)
+        offset = -(-header // _ALIGN) * _ALIGN
+        size = offset + slots * int(np.prod(self.shape)) * self.dtype.itemsize
+        if create:
+            try:
+                self._shm = _open(name, True, size)
+            except FileExistsError:
+                # Left behind by a process that died without unlinking it
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+                self._shm = _open(name, True, size)
+        else:
+            self._shm = _open(name, False)
+        buf = self._shm.buf
+        self._head = np.ndarray((1,), np.int64, buf, 0)
+        self._seq = np.ndarray((slots,), np.int64, buf, 8)
+        self._length = np.ndarray((slots,), np.int64, buf, 8 + 8 * slots)
+        self._stamp = np.ndarray((slots,), np.float64, buf, 8 + 16 * slots)
+        self._data = np.ndarray((slots,) + self.shape, self.dtype, buf, offset)
+        if create:
+            self._head[0] = 0
+            self._seq[:] = 0
+
+    def spec(self):
+        """Picklable arguments for attach() in another process"""
+        return {"name": self.name, "shape": self.shape, "dtype": self.dtype.str,
+                "slots": self.slots, "variable": self.variable}
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(create=False, **spec)
+
+    @property
+    def head(self):
+        """Sequence number of the newest message (0 before the first)"""
+        return int(self._head[0])
+
+    def write(self, array, timestamp=None):
+        """
+        Append one message (single writer only)
+
+        Returns:
+            Its sequence number
+        """
+        seq = int(self._head[0]) + 1
+        i = seq % self.slots
+        self._seq[i] = 0
+        if self.variable:
+            length = array.shape[-1]
+            self._data[i][..., :length] = array
+            self._length[i] = length
+        else:
+            self._data[i][...] = array
+        self._stamp[i] = time.monotonic() if timestamp is None else timestamp
+        self._seq[i] = seq
+        self._head[0] = seq
+        return seq
+
+    def read(self, seq):
+        """Message seq, or None if it is not written yet or already overwritten"""
+        i = seq % self.slots
+        if seq <= 0 or self._seq[i] != seq:
+            return None
+        timestamp = float(self._stamp[i])
+        if self.variable:
+            data = self._data[i][..., :int(self._length[i])].copy()
+        else:
+            data = self._data[i].copy()
+        if self._seq[i] != seq:
+            return None   # overwritten while copying
+        return Message(seq, timestamp, data)
+
+    def latest(self, newer_than=0):
+        """Newest message if it is newer than newer_than, else None"""
+        for _ in range(3):
+            seq = int(self._head[0])
+            if seq <= newer_than:
+                return None
+            message = self.read(seq)
+            if message is not None:
+                return message
+        return None
+
+    def wait(self, newer_than=0, timeout=None, poll=0.001):
+        """Poll for a message newer than newer_than (None on timeout)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            message = self.latest(newer_than)
+            if message is not None or (deadline is not None and time.monotonic() >= deadline):
+                return message
+            time.sleep(poll)
+
+    def close(self):
+        # The numpy views must go before the buffer can be released
+        self._head = self._seq = self._length = self._stamp = self._data = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
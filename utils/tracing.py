@@ -0,0 +1,214 @@
+"""
+Lightweight hop tracing for the reaction chain.
+
+A trace id (the lidar scan's seq) is made current on a thread with
+activate(); hop() and span() then record the time each stage was reached,
+and code that hands work to another thread passes the id along (e.g. the
+safety hold keeps it for the safety monitor). Events go into a fixed-size
+ring per thread, written only by that thread, so recording takes no lock.
+Stages reached with no trace active record nothing.
+
+Events export to Chrome trace-event JSON (chrome://tracing, Perfetto),
+with each trace drawn as a flow across threads, and latency_report() gives
+the distribution of time from one stage to another, e.g. scan to motor
+stop:
+
+    with tracing.activate(scan.seq):
+        tracing.hop('scan', timestamp=scan.timestamp)
+        ...
+    tracing.TRACER.latency_report('scan', 'motor_stop')
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from threading import get_ident
+import numpy as np
+
+
+class _Buffer:
+    """Ring of (trace_id, name, start, duration) written by one thread"""
+
+    __slots__ = ('events', 'count', 'thread_name', 'thread_id')
+
+    def __init__(self, capacity):
+        self.events = [None] * capacity
+        self.count = 0
+        thread = threading.current_thread()
+        self.thread_name = thread.name
+        self.thread_id = get_ident()
+
+    def append(self, event):
+        self.events[self.count % len(self.events)] = event
+        self.count += 1
+
+    def snapshot(self):
+        events = list(self.events)   # one atomic copy; the writer may keep going
+        return [e for e in events if e is not None]
+
+
+class Tracer:
+    def __init__(self, capacity=4096, enabled=True):
+        """
+        Args:
+            capacity: Events kept per thread (oldest are overwritten)
+            enabled: Record events; when False hop() and span() do nothing
+        """
+        self.capacity = capacity
+        self.enabled = enabled
+        self._buffers = {}   # thread ident -> _Buffer
+        self._buffers_lock = threading.Lock()   # only taken when a thread first records
+        self._local = threading.local()
+
+    def _buffer(self):
+        buffer = self._buffers.get(get_ident())
+        if buffer is None:
+            buffer = _Buffer(self.capacity)
+            with self._buffers_lock:
+                self._buffers[buffer.thread_id] = buffer
+        return buffer
+
+    # -- recording ---------------------------------------------------------
+
+    def current(self):
+        """Trace id active on this thread, or None"""
+        return getattr(self._local, 'trace_id', None)
+
+    @contextmanager
+    def activate(self, trace_id):
+        """Make trace_id current on this thread for the with block (None is a no-op)"""
+        previous = self.current()
+        self._local.trace_id = trace_id if trace_id is not None else previous
+        try:
+            yield
+        finally:
+            self._local.trace_id = previous
+
+    def hop(self, name, trace_id=None, timestamp=None):
+        """
+        Record that the active trace reached stage name
+
+        Args:
+            name: Stage name
+            trace_id: Trace to record for instead of the current one
+            timestamp: time.monotonic() of the hop, defaults to now
+        """
+        if not self.enabled:
+            return
+        trace_id = self.current() if trace_id is None else trace_id
+        if trace_id is None:
+            return
+        self._buffer().append((trace_id, name, time.monotonic() if timestamp is None else timestamp, None))
+
+    @contextmanager
+    def span(self, name):
+        """Record the duration of a with block under the current trace"""
+        trace_id = self.current() if self.enabled else None
+        if trace_id is None:
+            yield
+            return
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._buffer().append((trace_id, name, started, time.monotonic() - started))
+
+    def clear(self):
+        with self._buffers_lock:
+            self._buffers = {}
+
+    # -- reading -----------------------------------------------------------
+
+    def events(self):
+        """All buffered events as (trace_id, name, start, duration, thread ident), by start time"""
+        with self._buffers_lock:
+            buffers = list(self._buffers.values())
+        events = [event + (buffer.thread_id,) for buffer in buffers for event in buffer.snapshot()]
+        events.sort(key=lambda e: e[2])
+        return events
+
+    def traces(self):
+        """Events grouped by trace id, each list in time order"""
+        traces = {}
+        for event in self.events():
+            traces.setdefault(event[0], []).append(event)
+        return traces
+
+    def chrome_trace(self):
+        """Chrome trace-event document; each trace is also drawn as a flow"""
+        with self._buffers_lock:
+            names = {ident: buffer.thread_name for ident, buffer in self._buffers.items()}
+        trace_events = [
+            {"ph": "M", "name": "thread_name", "pid": 1, "tid": ident, "args": {"name": name}}
+            for ident, name in names.items()
+        ]
+        for trace_id, events in self.traces().items():
+            for i, (_, name, start, duration, tid) in enumerate(events):
+                base = {"name": name, "cat": "trace", "pid": 1, "tid": tid, "ts": start * 1e6,
+                        "args": {"trace": trace_id}}
+                if duration is None:
+                    trace_events.append(dict(base, ph="i", s="t"))
+                else:
+                    trace_events.append(dict(base, ph="X", dur=duration * 1e6))
+                if len(events) > 1:
+                    phase = "s" if i == 0 else "f" if i == len(events) - 1 else "t"
+                    trace_events.append({"ph": phase, "name": "trace", "cat": "flow", "id": trace_id,
+                                         "pid": 1, "tid": tid, "ts": start * 1e6, "bp": "e"})
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def export(self, path):
+        """Write chrome_trace() to path"""
+        with open(path, 'w') as file:
+            json.dump(self.chrome_trace(), file)
+
+    def latency_report(self, start='scan', end='motor_stop'):
+        """
+        Time from stage start to the first stage end after it, per trace
+
+        Returns:
+            dict with count, p50/p99/max in ms, and the median time (ms)
+            from start to each stage seen in those traces
+        """
+        totals = []
+        stages = {}
+        for events in self.traces().values():
+            begin = next((e[2] for e in events if e[1] == start), None)
+            if begin is None:
+                continue
+            finish = next((e[2] for e in events if e[1] == end and e[2] >= begin), None)
+            if finish is None:
+                continue
+            totals.append(finish - begin)
+            for _, name, at, _, _ in events:
+                if begin <= at <= finish:
+                    stages.setdefault(name, []).append(at - begin)
+        if not totals:
+            return {"count": 0}
+        totals = np.array(totals) * 1e3
+        return {
+            "count": int(totals.size),
+            "p50": float(np.percentile(totals, 50)),
+            "p99": float(np.percentile(totals, 99)),
+            "max": float(totals.max()),
+            "stages_p50": {name: float(np.median(offsets) * 1e3) for name, offsets in
+                           sorted(stages.items(), key=lambda item: np.median(item[1]))},
+        }
+
+
+TRACER = Tracer()
+
+
+def current():
+    return TRACER.current()
+
+
+def activate(trace_id):
+    return TRACER.activate(trace_id)
+
+
+def hop(name, trace_id=None, timestamp=None):
+    TRACER.hop(name, trace_id, timestamp)
+
+
+def span(name):
+    return TRACER.span(name)